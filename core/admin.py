@@ -1,7 +1,12 @@
 from django.contrib import admin
+from . import search
 from .models import VisitorLog, PageView, BlogPost, Author
 
 
+# Most blog posts matched by an admin search
+ADMIN_SEARCH_LIMIT = 500
+
+
 @admin.register(VisitorLog)
 class VisitorLogAdmin(admin.ModelAdmin):
     """Admin configuration for VisitorLog model"""
@@ -94,6 +99,16 @@ class BlogPostAdmin(admin.ModelAdmin):
             'fields': ('is_published',)
         }),
     )
+    
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Search through the full-text index instead of icontains scans over
+        content, where the database has one.
+        """
+        if not search_term.strip() or search.get_index() is None:
+            return super().get_search_results(request, queryset, search_term)
+        matches = search.search(search_term, limit=ADMIN_SEARCH_LIMIT, include_unpublished=True)
+        return queryset.filter(pk__in=[post.pk for post, _ in matches]), False
 
 
 @admin.register(Author)
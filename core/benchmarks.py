@@ -0,0 +1,215 @@
+"""
+FairPayCheck Scoring Benchmarks
+Micro-benchmarks for the scoring engine, with stored baselines for
+regression checks. Runs entirely in-process: no database or network.
+"""
+
+import json
+import random
+import statistics
+import time
+
+from . import scoring
+from .snapshots import market_data as data
+
+
+BASELINE_FORMAT_VERSION = 1
+
+TITLE_TEMPLATES = ['{}', 'Senior {}', '{} II', 'Lead {} (Remote)', 'Junior {}']
+
+
+def generate_corpus(size=2000, seed=42):
+    """
+    Generate synthetic scoring inputs.
+    Every country, industry, company size, experience level and role keyword
+    appears at least once; the corpus grows past `size` if needed for that.
+    """
+    rng = random.Random(seed)
+    countries = [c['value'] for c in data.COUNTRIES]
+    industries = [i['value'] for i in data.INDUSTRIES]
+    sizes = [s['value'] for s in data.COMPANY_SIZES]
+    levels = list(data.EXPERIENCE_LEVELS.values())
+    keywords = [k for ks in data.ROLE_KEYWORDS.values() for k in ks]
+    skills = list(data.SKILL_PREMIUMS)
+
+    count = max(size, len(countries), len(industries), len(sizes), len(levels), len(keywords))
+    corpus = []
+
+    for i in range(count):
+        country = countries[i % len(countries)]
+        industry = industries[i % len(industries)]
+        min_years, max_years = levels[i % len(levels)]
+        years = rng.randint(min_years, min(max_years, 40))
+        title = rng.choice(TITLE_TEMPLATES).format(keywords[i % len(keywords)].title())
+
+        # Mix exact skills, partial tokens and unknown ones
+        tokens = []
+        for _ in range(rng.randint(0, 8)):
+            skill = rng.choice(skills)
+            kind = rng.random()
+            if kind < 0.6:
+                tokens.append(skill)
+            elif kind < 0.85:
+                tokens.append(skill[:max(2, len(skill) - 2)])
+            else:
+                tokens.append(f'{skill} expert')
+
+        # Salary around the local market median, sometimes omitted
+        salary = None
+        if rng.random() > 0.1:
+            role_category = scoring.categorize_role(title)
+            level = scoring.get_experience_level(years)
+            median, _ = scoring.get_market_median(role_category, level, country, industry)
+            salary = round(median * rng.uniform(0.5, 1.6))
+
+        corpus.append({
+            'job_title': title,
+            'country': country,
+            'industry': industry,
+            'years_experience': years,
+            'company_size': sizes[i % len(sizes)],
+            'skills': ', '.join(tokens),
+            'salary': salary,
+            'years_in_role': rng.randint(0, min(years, 10)),
+            'promotion_received': rng.random() < 0.4,
+        })
+
+    return corpus
+
+
+def build_cases(corpus):
+    """
+    Derive per-function argument lists from the corpus.
+    Returns {name: (function, argument tuples, batched)}; batched functions
+    take a list of inputs in one call.
+    """
+    market, experience, confidence, salary_range = [], [], [], []
+    company, progression, timing, skill = [], [], [], []
+
+    for inputs in corpus:
+        parsed = scoring.parse_inputs(inputs)
+        country = parsed.country
+        salary = parsed.salary
+        role_category = scoring.categorize_role(parsed.job_title)
+        level = scoring.get_experience_level(parsed.years_experience)
+        median, currency_code = scoring.get_market_median(
+            role_category, level, country, parsed.industry
+        )
+
+        market.append((salary, median, country))
+        experience.append((parsed.years_experience, salary, median, country))
+        skill.append((parsed.skills,))
+        company.append((parsed.company_size, country))
+        progression.append((parsed.years_in_role, parsed.promotion_received))
+        timing.append((role_category,))
+        confidence.append((salary is not None, country, role_category))
+        salary_range.append((median, currency_code))
+
+    return {
+        'calculate_market_score': (scoring.calculate_market_score, market, False),
+        'calculate_experience_score': (scoring.calculate_experience_score, experience, False),
+        'calculate_skill_score': (scoring.calculate_skill_score, skill, False),
+        'calculate_company_score': (scoring.calculate_company_score, company, False),
+        'calculate_progression_score': (scoring.calculate_progression_score, progression, False),
+        'calculate_timing_score': (scoring.calculate_timing_score, timing, False),
+        'calculate_confidence': (scoring.calculate_confidence, confidence, False),
+        'calculate_salary_range': (scoring.calculate_salary_range, salary_range, False),
+        'calculate_full_score': (scoring.calculate_full_score, [(p,) for p in corpus], False),
+        # Scoring alone, without input parsing or the result cache
+        'calculate_result': (scoring.calculate_result, [(scoring.parse_inputs(p),) for p in corpus], False),
+        'calculate_salary_sweep': (scoring.calculate_salary_sweep, [(p,) for p in corpus], False),
+        'calculate_batch_scores': (scoring.calculate_batch_scores, corpus, True),
+    }
+
+
+def time_function(func, arg_list, repeat=5, chunk=100, batched=False):
+    """
+    Time func over arg_list in chunks, `repeat` times.
+    Each chunk gives one per-call sample; returns ops/sec and per-call
+    latency percentiles in microseconds.
+    """
+    samples = []
+    calls = 0
+    total_ns = 0
+
+    for _ in range(repeat):
+        for start in range(0, len(arg_list), chunk):
+            part = arg_list[start:start + chunk]
+            begin = time.perf_counter_ns()
+            if batched:
+                func(part)
+            else:
+                for args in part:
+                    func(*args)
+            elapsed = time.perf_counter_ns() - begin
+
+            samples.append(elapsed / len(part) / 1000)
+            calls += len(part)
+            total_ns += elapsed
+
+    if len(samples) > 1:
+        cuts = statistics.quantiles(samples, n=100, method='inclusive')
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = samples[0]
+
+    return {
+        'calls': calls,
+        'ops_per_sec': calls / (total_ns / 1e9) if total_ns else 0.0,
+        'mean_us': total_ns / calls / 1000,
+        'p50_us': p50,
+        'p95_us': p95,
+        'p99_us': p99,
+    }
+
+
+def run_benchmarks(size=2000, seed=42, repeat=5, only=None):
+    """Run the benchmark suite and return {name: stats}."""
+    cases = build_cases(generate_corpus(size, seed))
+    results = {}
+
+    for name, (func, arg_list, batched) in cases.items():
+        if only and name not in only:
+            continue
+        # Warm-up pass so one-off costs (table builds, caches) are not measured
+        time_function(func, arg_list[:100], repeat=1, batched=batched)
+        results[name] = time_function(func, arg_list, repeat=repeat, batched=batched)
+
+    return results
+
+
+def load_baseline(path):
+    """Load stored benchmark results, or None if there is no baseline yet."""
+    try:
+        with open(path) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        return None
+    return baseline.get('results', {})
+
+
+def save_baseline(path, results):
+    """Store benchmark results as the new baseline."""
+    with open(path, 'w') as f:
+        json.dump({
+            'format': BASELINE_FORMAT_VERSION,
+            'data_version': data.DATA_VERSION,
+            'results': results,
+        }, f, indent=2, sort_keys=True)
+
+
+def find_regressions(results, baseline, threshold=0.25):
+    """
+    Compare median per-call latency against the baseline.
+    Returns (name, baseline_p50, current_p50, ratio) for every function
+    slower than baseline by more than `threshold` (a fraction, 0.25 = 25%).
+    """
+    regressions = []
+    for name, stats in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous.get('p50_us'):
+            continue
+        ratio = stats['p50_us'] / previous['p50_us']
+        if ratio > 1 + threshold:
+            regressions.append((name, previous['p50_us'], stats['p50_us'], ratio))
+    return regressions
@@ -0,0 +1,173 @@
+"""
+FairPayCheck Bulk Scoring
+Streams CSV / NDJSON rows through the batch scoring engine in chunks and
+yields NDJSON result lines, so memory use stays flat regardless of file size.
+Under ASGI use ascore_rows: Django reads a sync iterator into a list before
+sending it there.
+"""
+
+import codecs
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from . import schema
+from . import scoring
+from . import snapshots
+
+
+# Rows scored per batch, and the most rows accepted in one upload
+BULK_CHUNK_SIZE = 500
+BULK_MAX_ROWS = 100000
+
+CSV_CONTENT_TYPES = ('text/csv', 'application/csv')
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/x-jsonlines')
+
+
+def detect_format(content_type, filename=''):
+    """Return 'csv', 'ndjson' or None from a content type or file name."""
+    filename = filename.lower()
+    if content_type in CSV_CONTENT_TYPES or filename.endswith('.csv'):
+        return 'csv'
+    if content_type in NDJSON_CONTENT_TYPES or filename.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return None
+
+
+def coerce_csv_row(row):
+    """
+    Turn a CSV row (all strings) into a scoring payload: blank cells are
+    treated as absent. The schema coerces the remaining strings.
+    """
+    return {
+        key.strip(): value.strip()
+        for key, value in row.items()
+        if key and isinstance(value, str) and value.strip()
+    }
+
+
+def read_csv(byte_lines):
+    """Yield (row_number, profile, error) for each data row of a CSV stream with a header row."""
+    reader = csv.DictReader(codecs.iterdecode(byte_lines, 'utf-8-sig'))
+    for number, row in enumerate(reader, 1):
+        yield number, coerce_csv_row(row), None
+
+
+def read_ndjson(byte_lines):
+    """Yield (row_number, profile, error) for each non-blank line of an NDJSON stream."""
+    number = 0
+    for line in codecs.iterdecode(byte_lines, 'utf-8-sig'):
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            profile = json.loads(line)
+        except json.JSONDecodeError:
+            yield number, None, 'Invalid JSON'
+            continue
+        if not isinstance(profile, dict):
+            yield number, None, 'Row must be a JSON object'
+            continue
+        yield number, profile, None
+
+
+def _error_line(number, error, errors=None):
+    line = {'row': number, 'error': error}
+    if errors:
+        line['errors'] = errors
+    return json.dumps(line) + '\n'
+
+
+def _result_line(number, result):
+    return f'{{"row": {number}, "result": {result.to_json()}}}\n'
+
+
+def _score_chunk(chunk, fields):
+    """Score one chunk of rows, returning its NDJSON lines in row order."""
+    lines = [None] * len(chunk)
+    positions = []
+    parsed_rows = []
+    decode = schema.get_schema().decode
+
+    for position, (number, profile, error) in enumerate(chunk):
+        if error is not None:
+            lines[position] = _error_line(number, error)
+            continue
+        parsed, errors = decode(profile)
+        if errors:
+            lines[position] = _error_line(number, schema.error_message(errors), errors)
+            continue
+        parsed_rows.append(parsed)
+        positions.append(position)
+
+    try:
+        results = scoring.calculate_batch_results(parsed_rows, fields)
+    except Exception:
+        # Fall back to row by row so one bad row does not fail its chunk
+        results = []
+        for parsed in parsed_rows:
+            try:
+                results.append(scoring.calculate_result(parsed, fields))
+            except Exception:
+                results.append(None)
+
+    for position, result in zip(positions, results):
+        number = chunk[position][0]
+        if result is None:
+            lines[position] = _error_line(number, 'An error occurred while scoring this row.')
+        else:
+            lines[position] = _result_line(number, result)
+
+    return lines
+
+
+def score_rows(rows, fields=None, snapshot=None):
+    """
+    Score (row_number, profile, error) tuples in chunks, yielding NDJSON.
+    Each output line is {"row": n, "result": {...}} or {"row": n, "error": "..."},
+    with per-field "errors" for rows that fail validation.
+    Reading errors end the stream with a final {"error": "..."} line.
+    All chunks are scored against one market data snapshot (default: the
+    active one when streaming starts).
+    """
+    snapshot = snapshot or snapshots.current()
+    rows = iter(rows)
+    total = 0
+
+    while True:
+        try:
+            chunk = list(islice(rows, BULK_CHUNK_SIZE))
+        except (csv.Error, UnicodeDecodeError) as e:
+            yield json.dumps({'error': f'Could not read input: {e}'}) + '\n'
+            return
+
+        if not chunk:
+            return
+
+        total += len(chunk)
+        if total > BULK_MAX_ROWS:
+            chunk = chunk[:len(chunk) - (total - BULK_MAX_ROWS)]
+
+        with snapshots.pinned(snapshot):
+            lines = _score_chunk(chunk, fields)
+        yield ''.join(lines)
+
+        if total > BULK_MAX_ROWS:
+            yield json.dumps({'error': f'Row limit of {BULK_MAX_ROWS} exceeded; remaining rows were not scored'}) + '\n'
+            return
+
+
+async def ascore_rows(rows, fields=None, snapshot=None):
+    """
+    Async iterator over score_rows, for ASGI responses. Each chunk is read
+    and scored in a worker thread and sent before the next one is read.
+    """
+    lines = score_rows(rows, fields, snapshot)
+    next_lines = sync_to_async(next, thread_sensitive=False)
+    try:
+        while (chunk := await next_lines(lines, None)) is not None:
+            yield chunk
+    finally:
+        lines.close()
@@ -0,0 +1,252 @@
+"""
+FairPayCheck IP Geolocation
+Offline lookups in a binary IP range database, memory-mapped from disk
+and searched by bisection, so a lookup costs microseconds and no network
+round-trip. Build the file from a CSV range dump with
+`python manage.py build_geoip_database`.
+
+File layout (little-endian):
+    header    magic, IPv4 range count, IPv6 range count, record count
+    ranges    IPv4 then IPv6, sorted by start and non-overlapping; each is
+              start, end (big-endian, 4 or 16 bytes) and a record number
+    offsets   record_count + 1 offsets into the record blob
+    records   JSON arrays [country, country_code, city, region, lat, lon]
+"""
+
+import bisect
+import csv
+import ipaddress
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+
+MAGIC = b'FPGEOIP1'
+HEADER = struct.Struct('<8sIII')
+RECORD_NUMBER = struct.Struct('<I')
+LOCATION_FIELDS = ('country', 'country_code', 'city', 'region', 'latitude', 'longitude')
+
+# Default CSV layout (IP2Location LITE DB5 order); ips are integers or addresses
+DEFAULT_COLUMNS = ('start', 'end', 'country_code', 'country', 'region', 'city', 'latitude', 'longitude')
+UNKNOWN_VALUES = frozenset(('', '-'))
+
+# How often workers check the database file for a new version, in seconds
+CHECK_INTERVAL = 60
+
+
+class RangeKeys:
+    """Sequence view of the range starts in one table, for bisect."""
+
+    def __init__(self, buffer, offset, count, width):
+        self.buffer = buffer
+        self.offset = offset
+        self.count = count
+        self.width = width
+        self.stride = 2 * width + RECORD_NUMBER.size
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        start = self.offset + index * self.stride
+        return self.buffer[start:start + self.width]
+
+    def entry(self, index):
+        """(end, record number) of a range."""
+        start = self.offset + index * self.stride + self.width
+        end = self.buffer[start:start + self.width]
+        (record,) = RECORD_NUMBER.unpack_from(self.buffer, start + self.width)
+        return end, record
+
+
+class GeoIPDatabase:
+    """A database file opened read-only and memory-mapped."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, v4_count, v6_count, record_count = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a geolocation database')
+
+        self.ipv4 = RangeKeys(self._map, HEADER.size, v4_count, 4)
+        self.ipv6 = RangeKeys(self._map, self.ipv4.offset + v4_count * self.ipv4.stride, v6_count, 16)
+        self._offsets = self.ipv6.offset + v6_count * self.ipv6.stride
+        self._records = self._offsets + (record_count + 1) * 4
+
+    def record(self, number):
+        start, end = struct.unpack_from('<2I', self._map, self._offsets + number * 4)
+        values = json.loads(self._map[self._records + start:self._records + end])
+        return dict(zip(LOCATION_FIELDS, values))
+
+    def lookup(self, ip_address):
+        """Location fields for an IP address string, or None if it is not covered or not public."""
+        try:
+            address = ipaddress.ip_address(ip_address)
+        except ValueError:
+            return None
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global:
+            return None
+
+        table = self.ipv4 if address.version == 4 else self.ipv6
+        key = address.packed
+        index = bisect.bisect_right(table, key) - 1
+        if index < 0:
+            return None
+        end, record = table.entry(index)
+        if key > end:
+            return None
+        return self.record(record)
+
+
+def _parse_ip(value):
+    value = value.strip()
+    if value.isdigit():
+        number = int(value)
+        return ipaddress.ip_address(number) if number < 2 ** 32 else ipaddress.IPv6Address(number)
+    return ipaddress.ip_address(value)
+
+
+def _coordinate(value):
+    try:
+        return round(float(value), 4)
+    except ValueError:
+        return None
+
+
+def read_ranges(lines, columns=DEFAULT_COLUMNS):
+    """
+    Parse CSV rows into (start, end, record) tuples, skipping rows without
+    a country. Raises ValueError for a row whose addresses do not parse.
+    """
+    for line_number, row in enumerate(csv.reader(lines), 1):
+        if not row:
+            continue
+        values = dict(zip(columns, row))
+        try:
+            start, end = _parse_ip(values['start']), _parse_ip(values['end'])
+        except (KeyError, ValueError) as e:
+            raise ValueError(f'Line {line_number}: invalid address range ({e})') from None
+        if start.version != end.version or start > end:
+            raise ValueError(f'Line {line_number}: invalid address range')
+        if start.version == 6 and start.ipv4_mapped and end.ipv4_mapped:
+            start, end = start.ipv4_mapped, end.ipv4_mapped
+
+        country_code = values.get('country_code', '').strip()
+        if country_code in UNKNOWN_VALUES:
+            continue
+        record = (
+            values.get('country', '').strip() or None,
+            country_code,
+            values.get('city', '').strip() or None,
+            values.get('region', '').strip() or None,
+            _coordinate(values.get('latitude', '')),
+            _coordinate(values.get('longitude', '')),
+        )
+        yield start, end, tuple(None if value in UNKNOWN_VALUES else value for value in record)
+
+
+def write_database(path, ranges):
+    """
+    Write a database file atomically from (start, end, record) tuples.
+    Overlapping ranges keep the first one by start address. Returns
+    (range count, record count, skipped overlaps).
+    """
+    # Records are numbered as they are read, so each distinct location is held once
+    records = {}
+    tables = {4: [], 6: []}
+    for start, end, record in ranges:
+        number = records.setdefault(record, len(records))
+        tables[start.version].append((int(start), int(end), number))
+
+    encoded = {}
+    skipped = 0
+    for version, width in ((4, 4), (6, 16)):
+        table = tables[version]
+        table.sort(key=lambda entry: entry[0])
+        out = bytearray()
+        previous_end = -1
+        for start, end, number in table:
+            if start <= previous_end:
+                skipped += 1
+                continue
+            previous_end = end
+            out += start.to_bytes(width, 'big') + end.to_bytes(width, 'big') + RECORD_NUMBER.pack(number)
+        encoded[version] = (out, len(out) // (2 * width + RECORD_NUMBER.size))
+
+    blob = bytearray()
+    offsets = [0]
+    for record in records:
+        blob += json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode()
+        offsets.append(len(blob))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, encoded[4][1], encoded[6][1], len(records)))
+            f.write(encoded[4][0])
+            f.write(encoded[6][0])
+            f.write(struct.pack(f'<{len(offsets)}I', *offsets))
+            f.write(blob)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return encoded[4][1] + encoded[6][1], len(records), skipped
+
+
+_database = None
+_signature = None
+_next_check = 0
+_lock = threading.Lock()
+
+
+def database_path():
+    return getattr(settings, 'GEOIP_DATABASE', None) or os.path.join(settings.BASE_DIR, 'geoip.bin')
+
+
+def get_database():
+    """
+    The database for settings.GEOIP_DATABASE, or None if there is no file.
+    A rebuilt file is picked up within CHECK_INTERVAL seconds.
+    """
+    global _database, _signature, _next_check
+    now = time.monotonic()
+    if now < _next_check:
+        return _database
+    with _lock:
+        if now < _next_check:
+            return _database
+        _next_check = now + CHECK_INTERVAL
+        path = database_path()
+        try:
+            stat = os.stat(path)
+        except OSError:
+            _database = _signature = None
+            return None
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if signature != _signature:
+            try:
+                _database = GeoIPDatabase(path)
+                _signature = signature
+            except (OSError, ValueError, struct.error) as e:
+                print(f"Could not load geolocation database {path}: {e}")
+        return _database
+
+
+def lookup(ip_address):
+    """VisitorLog location fields for an IP address, or None."""
+    database = get_database()
+    if database is None:
+        return None
+    return database.lookup(ip_address)
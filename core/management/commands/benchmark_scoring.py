@@ -0,0 +1,71 @@
+"""
+Run the scoring engine micro-benchmarks and check them against a baseline.
+
+Usage:
+    python manage.py benchmark_scoring
+    python manage.py benchmark_scoring --save-baseline
+    python manage.py benchmark_scoring --threshold 0.1 --only calculate_full_score
+"""
+
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the scoring engine and fail on regressions against a stored baseline.'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=2000, help='Number of synthetic profiles')
+        parser.add_argument('--seed', type=int, default=42, help='Corpus random seed')
+        parser.add_argument('--repeat', type=int, default=5, help='Passes over the corpus per function')
+        parser.add_argument('--only', nargs='+', help='Benchmark only these functions')
+        parser.add_argument(
+            '--baseline',
+            default=str(Path(settings.BASE_DIR) / 'core' / 'benchmark_baseline.json'),
+            help='Baseline file to compare against (and write with --save-baseline)',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.25,
+            help='Allowed slowdown of median latency before failing, as a fraction (default 0.25)',
+        )
+        parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline')
+
+    def handle(self, *args, **options):
+        results = benchmarks.run_benchmarks(
+            size=options['size'],
+            seed=options['seed'],
+            repeat=options['repeat'],
+            only=options['only'],
+        )
+
+        self.stdout.write(
+            f"{'function':<30} {'ops/sec':>12} {'mean us':>9} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9}"
+        )
+        for name, stats in results.items():
+            self.stdout.write(
+                f"{name:<30} {stats['ops_per_sec']:>12,.0f} {stats['mean_us']:>9.2f} "
+                f"{stats['p50_us']:>9.2f} {stats['p95_us']:>9.2f} {stats['p99_us']:>9.2f}"
+            )
+
+        if options['save_baseline']:
+            benchmarks.save_baseline(options['baseline'], results)
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {options['baseline']}"))
+            return
+
+        baseline = benchmarks.load_baseline(options['baseline'])
+        if baseline is None:
+            self.stdout.write(self.style.WARNING('No baseline found; run with --save-baseline to create one.'))
+            return
+
+        regressions = benchmarks.find_regressions(results, baseline, options['threshold'])
+        if regressions:
+            for name, before, after, ratio in regressions:
+                self.stderr.write(f'{name}: p50 {before:.2f}us -> {after:.2f}us ({ratio:.2f}x)')
+            raise CommandError(f'{len(regressions)} function(s) regressed past the {options["threshold"]:.0%} threshold')
+
+        self.stdout.write(self.style.SUCCESS('No regressions against baseline.'))
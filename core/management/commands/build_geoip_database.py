@@ -0,0 +1,59 @@
+"""
+Build the offline IP geolocation database from a CSV range dump.
+
+Usage:
+    python manage.py build_geoip_database IP2LOCATION-LITE-DB5.CSV
+    python manage.py build_geoip_database dbip-city-lite.csv.gz --header \
+        --columns start,end,,country_code,region,city,latitude,longitude
+
+Each row is an address range (dotted/colon notation or integers) and its
+location. The file is written to GEOIP_DATABASE, replaced atomically;
+workers pick it up within a minute.
+"""
+
+import gzip
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import geoip
+
+
+class Command(BaseCommand):
+    help = 'Build the memory-mapped IP geolocation database from a CSV of address ranges.'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help='CSV file of ranges (.gz is decompressed)')
+        parser.add_argument('--output', help='Database file to write (default: GEOIP_DATABASE)')
+        parser.add_argument(
+            '--columns', default=','.join(geoip.DEFAULT_COLUMNS),
+            help=(
+                'Comma-separated CSV column names; start and end are required, '
+                f'leave unused columns empty. Known: {", ".join(geoip.DEFAULT_COLUMNS)}'
+            ),
+        )
+        parser.add_argument('--header', action='store_true', help='Skip the first row')
+
+    def handle(self, *args, **options):
+        columns = tuple(name.strip() for name in options['columns'].split(','))
+        if 'start' not in columns or 'end' not in columns:
+            raise CommandError('--columns must name the start and end columns')
+        output = options['output'] or geoip.database_path()
+
+        path = options['csv_path']
+        opener = gzip.open if path.endswith('.gz') else open
+        try:
+            with opener(path, 'rt', encoding='utf-8', newline='') as f:
+                if options['header']:
+                    next(f, None)
+                ranges, records, skipped = geoip.write_database(output, geoip.read_ranges(f, columns))
+        except ValueError as e:
+            raise CommandError(str(e))
+        except OSError as e:
+            raise CommandError(f'Could not build {output}: {e}')
+
+        if skipped:
+            self.stderr.write(f'Skipped {skipped} ranges overlapping an earlier one')
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {ranges} ranges ({records} locations) to {output}'
+        ))
@@ -0,0 +1,36 @@
+"""
+Write the market data tables to a snapshot file.
+
+Usage:
+    python manage.py export_market_data snapshots/market-2025-01.json
+    python manage.py export_market_data $MARKET_DATA_SNAPSHOT --data-version 2025-02
+
+Workers watching MARKET_DATA_SNAPSHOT pick up the new version on their next check.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import snapshots
+
+
+class Command(BaseCommand):
+    help = 'Export the built-in market data (core/data.py) as a versioned snapshot file.'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Snapshot file to write (replaced atomically)')
+        parser.add_argument('--data-version', help='Version to stamp on the snapshot (default: DATA_VERSION)')
+
+    def handle(self, *args, **options):
+        snapshot = snapshots.builtin_snapshot()
+        if options['data_version']:
+            snapshot.DATA_VERSION = options['data_version']
+
+        try:
+            snapshots.write_snapshot(options['path'], snapshot)
+        except OSError as e:
+            raise CommandError(f"Could not write {options['path']}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote market data {snapshot.DATA_VERSION} to {options['path']}"
+        ))
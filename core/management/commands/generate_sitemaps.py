@@ -0,0 +1,27 @@
+"""
+Regenerate the sitemap files in SITEMAP_DIR.
+
+Usage:
+    python manage.py generate_sitemaps
+
+Saving a post or author in the admin updates the files automatically; run
+this after deploys, bulk imports or raw SQL changes.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import sitemaps
+
+
+class Command(BaseCommand):
+    help = 'Regenerate sitemap.xml and its gzip-compressed parts from the database.'
+
+    def handle(self, *args, **options):
+        try:
+            total = sitemaps.write_sitemaps()
+        except OSError as e:
+            raise CommandError(f'Could not write sitemaps to {sitemaps.sitemap_dir()}: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {total} URLs to {sitemaps.sitemap_dir()}'
+        ))
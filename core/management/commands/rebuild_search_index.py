@@ -0,0 +1,25 @@
+"""
+Rebuild the blog full-text search index.
+
+Usage:
+    python manage.py rebuild_search_index
+
+The index table is created by the core migrations and kept up to date as
+posts are saved; run this once after migrating, and after bulk imports or
+raw SQL changes.
+"""
+
+from django.core.management.base import BaseCommand
+
+from core import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index over blog posts.'
+
+    def handle(self, *args, **options):
+        count = search.rebuild()
+        if count is None:
+            self.stdout.write(self.style.WARNING('This database has no full-text index; search uses icontains'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} blog posts'))
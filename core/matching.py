@@ -0,0 +1,122 @@
+"""
+FairPayCheck Keyword Matching
+Aho-Corasick automaton for finding many keywords in a string in one pass.
+"""
+
+from collections import deque
+
+
+class KeywordMatcher:
+    """
+    Multi-pattern substring matcher (Aho-Corasick).
+
+    Built once from (keyword, rank) pairs, where rank is a non-negative
+    integer. Scanning a text visits each character once, regardless of
+    how many keywords are registered.
+    When a keyword is registered more than once, the lowest rank is kept.
+    """
+
+    def __init__(self, keywords):
+        # State 0 is the root. Each state has a goto table, a failure link and
+        # the lowest rank of any keyword ending at it (directly or via failure links).
+        self._goto = [{}]
+        self._fail = [0]
+        self._rank = [None]
+
+        for keyword, rank in keywords:
+            if not keyword:
+                continue
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._rank.append(None)
+                state = next_state
+            self._rank[state] = self._min_rank(self._rank[state], rank)
+
+        self._build_failure_links()
+
+    @staticmethod
+    def _min_rank(a, b):
+        if a is None:
+            return b
+        if b is None:
+            return a
+        return min(a, b)
+
+    def _build_failure_links(self):
+        """Breadth-first pass linking each state to its longest proper suffix state."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                # Fold suffix matches into this state so scanning never walks the chain
+                self._rank[next_state] = self._min_rank(
+                    self._rank[next_state], self._rank[self._fail[next_state]]
+                )
+
+    def best_rank(self, text):
+        """
+        Return the lowest rank among all keywords occurring in text,
+        or None if no keyword occurs.
+        """
+        goto = self._goto
+        fail = self._fail
+        ranks = self._rank
+        best = None
+        state = 0
+
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            rank = ranks[state]
+            if rank is not None and (best is None or rank < best):
+                best = rank
+                if best == 0:
+                    break
+
+        return best
+
+    def search(self, text):
+        """Return True if any keyword occurs in text."""
+        return self.best_rank(text) is not None
+
+
+class SubstringIndex:
+    """
+    Reverse substring lookup: which keywords contain a given string.
+
+    Every substring of every keyword is indexed up front, so a lookup is a
+    single dict probe. This is sized for short vocabularies (a keyword of
+    length L contributes at most L*(L+1)/2 entries). As with KeywordMatcher,
+    the lowest rank is kept when several keywords contain the same string.
+    """
+
+    def __init__(self, keywords):
+        self._ranks = {}
+        for keyword, rank in keywords:
+            length = len(keyword)
+            for start in range(length):
+                for end in range(start + 1, length + 1):
+                    fragment = keyword[start:end]
+                    current = self._ranks.get(fragment)
+                    if current is None or rank < current:
+                        self._ranks[fragment] = rank
+
+    def best_rank(self, text):
+        """
+        Return the lowest rank among keywords containing text,
+        or None if no keyword contains it.
+        """
+        return self._ranks.get(text)
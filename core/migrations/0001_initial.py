@@ -0,0 +1,111 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Author',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+                ('bio', models.TextField(help_text='Human-written bio describing real experience')),
+                ('expertise', models.TextField(help_text="Comma-separated expertise areas (e.g., 'Software Engineering, Data Analysis')")),
+                ('linkedin_url', models.URLField(help_text='LinkedIn profile URL (mandatory for E-E-A-T)')),
+                ('github_url', models.URLField(blank=True, help_text='GitHub profile URL (recommended)')),
+                ('profile_image', models.URLField(blank=True, help_text='Profile image URL (use GitHub raw URL, recommended 400x400)')),
+            ],
+            options={
+                'verbose_name': 'Author',
+                'verbose_name_plural': 'Authors',
+            },
+        ),
+        migrations.CreateModel(
+            name='VisitorLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ip_address', models.CharField(db_index=True, max_length=45, unique=True)),
+                ('session_key', models.CharField(blank=True, max_length=40, null=True)),
+                ('user_agent', models.TextField(blank=True, null=True)),
+                ('browser', models.CharField(blank=True, max_length=100, null=True)),
+                ('browser_version', models.CharField(blank=True, max_length=50, null=True)),
+                ('device_type', models.CharField(blank=True, max_length=20, null=True)),
+                ('os', models.CharField(blank=True, max_length=100, null=True)),
+                ('os_version', models.CharField(blank=True, max_length=50, null=True)),
+                ('is_bot', models.BooleanField(default=False)),
+                ('is_mobile', models.BooleanField(default=False)),
+                ('country', models.CharField(blank=True, max_length=100, null=True)),
+                ('country_code', models.CharField(blank=True, max_length=10, null=True)),
+                ('city', models.CharField(blank=True, max_length=100, null=True)),
+                ('region', models.CharField(blank=True, max_length=100, null=True)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('referrer', models.URLField(blank=True, max_length=2000, null=True)),
+                ('landing_page', models.CharField(blank=True, max_length=500, null=True)),
+                ('first_visit', models.DateTimeField(auto_now_add=True)),
+                ('last_visit', models.DateTimeField(auto_now=True)),
+                ('total_visits', models.PositiveIntegerField(default=1)),
+                ('total_page_views', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Visitor Log',
+                'verbose_name_plural': 'Visitor Logs',
+                'ordering': ['-last_visit'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BlogPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=300)),
+                ('slug', models.SlugField(max_length=200, unique=True)),
+                ('excerpt', models.TextField(help_text='Short summary for Discover & listings')),
+                ('content', models.TextField(help_text='HTML content only, no Markdown')),
+                ('featured_image', models.URLField(help_text='Full URL to featured image (1200x630, use GitHub raw URL)', max_length=500)),
+                ('published_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('meta_title', models.CharField(max_length=300)),
+                ('meta_description', models.CharField(max_length=160)),
+                ('is_published', models.BooleanField(default=True)),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='blog_posts', to='core.author')),
+            ],
+            options={
+                'verbose_name': 'Blog Post',
+                'verbose_name_plural': 'Blog Posts',
+                'ordering': ['-published_at'],
+                'indexes': [models.Index(fields=['is_published', '-published_at', '-id'], name='blogpost_listing_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PageView',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.CharField(max_length=500)),
+                ('page_title', models.CharField(blank=True, max_length=200, null=True)),
+                ('method', models.CharField(default='GET', max_length=10)),
+                ('timestamp', models.DateTimeField(auto_now_add=True)),
+                ('ip_address', models.CharField(blank=True, max_length=45, null=True)),
+                ('user_agent', models.TextField(blank=True, null=True)),
+                ('referrer', models.URLField(blank=True, max_length=2000, null=True)),
+                ('session_key', models.CharField(blank=True, max_length=40, null=True)),
+                ('country_code', models.CharField(blank=True, max_length=10, null=True)),
+                ('device_type', models.CharField(blank=True, max_length=20, null=True)),
+                ('visitor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='page_views', to='core.visitorlog')),
+            ],
+            options={
+                'verbose_name': 'Page View',
+                'verbose_name_plural': 'Page Views',
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['timestamp'], name='core_pagevi_timesta_757ebb_idx'), models.Index(fields=['url'], name='core_pagevi_url_1e4370_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Full-text search index over blog posts (see core/search.py). Fill it with
+# `python manage.py rebuild_search_index` after migrating.
+
+from django.db import migrations
+
+from core import search
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(search.create_index, search.drop_index),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_blogpost_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pageview',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
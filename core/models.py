@@ -75,8 +75,8 @@ class PageView(models.Model):
     page_title = models.CharField(max_length=200, blank=True, null=True)
     method = models.CharField(max_length=10, default='GET')
     
-    # Request details
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Request details (timestamp is the request time; rows are written later in batches)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     ip_address = models.CharField(max_length=45, blank=True, null=True)
     user_agent = models.TextField(blank=True, null=True)
     referrer = models.URLField(max_length=2000, blank=True, null=True)
@@ -182,6 +182,10 @@ class BlogPost(models.Model):
         verbose_name = 'Blog Post'
         verbose_name_plural = 'Blog Posts'
         ordering = ['-published_at']
+        indexes = [
+            # Keyset pagination of the blog listing
+            models.Index(fields=['is_published', '-published_at', '-id'], name='blogpost_listing_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -0,0 +1,75 @@
+"""
+FairPayCheck Page Cache
+Rendered blog and author pages, stored in Django's cache and invalidated
+per page by model signals (see core/signals.py).
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+PAGE_CACHE_PREFIX = 'page:'
+PAGE_CACHE_CONTROL = 'public, max-age=300'
+
+# Stands in for a cached 404, so unknown slugs are not looked up on every hit
+NOT_FOUND = 'not-found'
+
+
+def blog_list_key():
+    return f'{PAGE_CACHE_PREFIX}blog'
+
+
+def blog_post_key(slug):
+    return f'{PAGE_CACHE_PREFIX}blog:{slug}'
+
+
+def author_key(slug):
+    return f'{PAGE_CACHE_PREFIX}author:{slug}'
+
+
+def build_page(html, last_modified):
+    """Cache entry for a rendered page; last_modified is a datetime."""
+    body = html.encode()
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    return (body, etag, last_modified.timestamp())
+
+
+def cached_page(request, key, render_page):
+    """
+    Serve the page cached under key, calling render_page() on a miss.
+    render_page returns a build_page() entry, or raises Http404 (which is
+    cached too). Conditional GETs are answered from the cache.
+    """
+    page = cache.get(key)
+    if page is None:
+        try:
+            page = render_page()
+        except Http404:
+            page = NOT_FOUND
+        cache.set(key, page, getattr(settings, 'PAGE_CACHE_TIMEOUT', 600))
+
+    if page == NOT_FOUND:
+        raise Http404
+    return page_response(request, page)
+
+
+def page_response(request, page):
+    """Response for a build_page() entry, answering conditional GETs."""
+    body, etag, last_modified = page
+    response = HttpResponse(body)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = PAGE_CACHE_CONTROL
+    return get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified), response=response
+    )
+
+
+def invalidate(keys):
+    """Drop cached pages."""
+    cache.delete_many(list(keys))
@@ -0,0 +1,448 @@
+"""
+FairPayCheck Rate Limiting
+Sliding-window-counter limiters with O(1) work per request and a fixed
+ceiling on the number of clients they track. Three backends:
+
+    memory   per-process state (each worker enforces the limit on its own)
+    shared   a shared-memory table in a file, for all workers on one host
+    cache    counters in a Django cache (e.g. Redis), for several hosts
+
+Every limiter has hit(key) and, for use on an event loop, ahit(key).
+get_limiter() returns the process's limiter for the RATE_LIMIT settings,
+and stats() its counters.
+"""
+
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+
+# Idle clients removed per request, so eviction work stays constant
+EXPIRE_BATCH = 8
+
+CACHE_KEY_PREFIX = 'ratelimit:'
+
+# Shared table file header: magic, bucket count, slot size
+SHARED_MAGIC = b'FPRLIM01'
+SHARED_HEADER = struct.Struct('<8sII')
+# Shared table slot: key hash, window number, current count, previous count
+SLOT = struct.Struct('<QIII4x')
+# Slots per shared table bucket; a key may use any slot of its bucket
+BUCKET_WAYS = 4
+
+
+def key_hash(key):
+    """64-bit hash of a client key, never 0 (0 marks an empty shared slot)."""
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') or 1
+
+
+def sliding_count(current, previous, now, window):
+    """Estimated requests in the sliding window ending at now."""
+    return current + previous * (1 - (now % window) / window)
+
+
+class SlidingWindowLimiter:
+    """
+    Thread-safe per-key rate limiter.
+
+    Each key keeps the request counts of the current and the previous fixed
+    window; the rate is estimated as the current count plus the previous
+    count weighted by how much of the previous window still overlaps the
+    sliding window. Keys are held in least-recently-seen order: idle keys
+    (no requests for a full window) are dropped a few at a time as requests
+    come in, and past `max_keys` the least recently seen key is evicted.
+    """
+
+    def __init__(self, limit, window, max_keys, clock=time.time):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._keys = OrderedDict()  # key -> [window number, current count, previous count]
+
+        self.allowed = 0
+        self.rejections = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expire(self, current):
+        """Drop up to EXPIRE_BATCH keys whose counts have left the sliding window."""
+        keys = self._keys
+        for _ in range(EXPIRE_BATCH):
+            if not keys:
+                return
+            oldest = next(iter(keys))
+            if keys[oldest][0] >= current - 1:
+                return
+            del keys[oldest]
+            self.expirations += 1
+
+    def hit(self, key):
+        """Record a request for key. Returns False (and records nothing) if it is over the limit."""
+        now = self._clock()
+        current = int(now // self.window)
+
+        with self._lock:
+            self._expire(current)
+
+            entry = self._keys.get(key)
+            if entry is None:
+                entry = self._keys[key] = [current, 0, 0]
+                if len(self._keys) > self.max_keys:
+                    self._keys.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._keys.move_to_end(key)
+                if entry[0] != current:
+                    previous = entry[1] if entry[0] == current - 1 else 0
+                    entry[0], entry[1], entry[2] = current, 0, previous
+
+            if sliding_count(entry[1], entry[2], now, self.window) >= self.limit:
+                self.rejections += 1
+                return False
+
+            entry[1] += 1
+            self.allowed += 1
+            return True
+
+    async def ahit(self, key):
+        """Async version of hit; it does no I/O, so it runs directly on the event loop."""
+        return self.hit(key)
+
+    def clear(self):
+        """Forget all keys (counters are kept)."""
+        with self._lock:
+            self._keys.clear()
+
+    def stats(self):
+        """Return a snapshot of the limiter counters."""
+        with self._lock:
+            return {
+                'tracked_keys': len(self._keys),
+                'max_keys': self.max_keys,
+                'allowed': self.allowed,
+                'rejections': self.rejections,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+class SharedMemoryLimiter:
+    """
+    Sliding-window-counter limiter whose state is a fixed-size table in a
+    memory-mapped file, shared by every process that maps the same path.
+
+    Keys hash to a bucket of BUCKET_WAYS slots, so a request touches one
+    bucket, guarded by an fcntl lock on that bucket's bytes. A new key takes
+    an empty slot or one of an idle client; if every slot in the bucket is
+    active, the least recently used one is evicted. The file is a header
+    and max_keys slots of SLOT.size bytes, which is the memory ceiling.
+
+    The file is sized once, by the process that creates it, and never
+    resized: workers still running with another table size map another
+    file (see shared_table_path), and a file whose header does not match
+    this table raises ValueError.
+    """
+
+    def __init__(self, limit, window, max_keys, path, clock=time.time):
+        self.limit = limit
+        self.window = window
+        self.buckets = max(1, max_keys // BUCKET_WAYS)
+        self.max_keys = self.buckets * BUCKET_WAYS
+        self.path = path
+        self._clock = clock
+        # fcntl locks are held per process, so threads also need a lock of their own
+        self._lock = threading.Lock()
+
+        size = SHARED_HEADER.size + self.max_keys * SLOT.size
+        header = SHARED_HEADER.pack(SHARED_MAGIC, self.buckets, SLOT.size)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            # Whoever takes the lock first on a new (empty) file creates the table
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                existing_size = os.fstat(self._fd).st_size
+                if existing_size == 0:
+                    os.ftruncate(self._fd, size)
+                    os.pwrite(self._fd, header, 0)
+                elif existing_size != size or os.pread(self._fd, len(header), 0) != header:
+                    raise ValueError(f'{path} is not a rate limit table of {self.max_keys} slots')
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+            self._map = mmap.mmap(self._fd, size)
+        except BaseException:
+            os.close(self._fd)
+            raise
+        self._table = memoryview(self._map)[SHARED_HEADER.size:]
+
+        self.allowed = 0
+        self.rejections = 0
+        self.evictions = 0
+
+    def _find_slot(self, bucket, hashed, current):
+        """Offset of the slot for hashed in the bucket at offset bucket, and the slot's values."""
+        victim = None
+        for way in range(BUCKET_WAYS):
+            offset = bucket + way * SLOT.size
+            slot = SLOT.unpack_from(self._map, offset)
+            slot_key, slot_window = slot[0], slot[1]
+            if slot_key == hashed:
+                return offset, slot
+            if not slot_key or slot_window < current - 1:
+                victim_key = (0, 0)
+            else:
+                victim_key = (1, slot_window)
+            if victim is None or victim_key < victim[0]:
+                victim = (victim_key, offset)
+
+        if victim[0][0]:
+            self.evictions += 1
+        return victim[1], (hashed, current, 0, 0)
+
+    def hit(self, key):
+        """Record a request for key. Returns False (and records nothing) if it is over the limit."""
+        now = self._clock()
+        current = int(now // self.window)
+        hashed = key_hash(key)
+        bucket_size = BUCKET_WAYS * SLOT.size
+        bucket = SHARED_HEADER.size + (hashed % self.buckets) * bucket_size
+
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, bucket_size, bucket)
+            try:
+                offset, (_, slot_window, count, previous) = self._find_slot(bucket, hashed, current)
+                if slot_window != current:
+                    previous = count if slot_window == current - 1 else 0
+                    slot_window, count = current, 0
+
+                if sliding_count(count, previous, now, self.window) >= self.limit:
+                    self.rejections += 1
+                    allowed = False
+                else:
+                    count += 1
+                    self.allowed += 1
+                    allowed = True
+                SLOT.pack_into(self._map, offset, hashed, slot_window, count, previous)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, bucket_size, bucket)
+        return allowed
+
+    async def ahit(self, key):
+        """Async version of hit, run in a worker thread since the bucket lock may block."""
+        return await sync_to_async(self.hit, thread_sensitive=False)(key)
+
+    def clear(self):
+        """Forget all keys, for every process sharing the table (counters are kept)."""
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                self._table[:] = bytes(len(self._table))
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def stats(self):
+        """
+        Return a snapshot of the limiter counters. tracked_keys counts active
+        slots across all processes; the other counters are this process's.
+        """
+        current = int(self._clock() // self.window)
+        tracked = sum(
+            1 for slot_key, slot_window, _, _ in SLOT.iter_unpack(self._table)
+            if slot_key and slot_window >= current - 1
+        )
+        with self._lock:
+            return {
+                'tracked_keys': tracked,
+                'max_keys': self.max_keys,
+                'allowed': self.allowed,
+                'rejections': self.rejections,
+                'evictions': self.evictions,
+                'expirations': None,
+            }
+
+
+class CacheLimiter:
+    """
+    Sliding-window-counter limiter keeping one counter per key and window
+    in a Django cache, for limits shared between hosts. A request costs one
+    atomic cache.incr() (use a backend where incr is atomic: Redis or
+    memcached, not the database cache). A finished window's count no
+    longer changes, so each process reads it once per key and window and
+    keeps it in memory. Counters expire with the cache timeout, so idle
+    clients need no eviction.
+    """
+
+    def __init__(self, limit, window, max_keys, alias='default', clock=time.time):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self.cache = caches[alias]
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._previous = {}  # hashed key -> its count in window _previous_window
+        self._previous_window = None
+
+        self.allowed = 0
+        self.rejections = 0
+
+    def _counter_key(self, hashed, window):
+        return f'{CACHE_KEY_PREFIX}{hashed:x}:{window}'
+
+    def _remembered_previous(self, hashed, current):
+        """The remembered count of hashed in the window before current, or None."""
+        with self._lock:
+            if self._previous_window != current - 1:
+                self._previous.clear()
+                self._previous_window = current - 1
+            return self._previous.get(hashed)
+
+    def _remember_previous(self, hashed, previous):
+        with self._lock:
+            if len(self._previous) < self.max_keys:
+                self._previous[hashed] = previous
+
+    def _allows(self, count, previous, now):
+        """Whether the request that brought the current window to count is within the limit."""
+        allowed = sliding_count(count - 1, previous, now, self.window) < self.limit
+        with self._lock:
+            if allowed:
+                self.allowed += 1
+            else:
+                self.rejections += 1
+        return allowed
+
+    def hit(self, key):
+        """Record a request for key. Returns False (and records nothing) if it is over the limit."""
+        now = self._clock()
+        current = int(now // self.window)
+        hashed = key_hash(key)
+        counter = self._counter_key(hashed, current)
+
+        try:
+            count = self.cache.incr(counter)
+        except ValueError:
+            # First request in this window; another process may create it first
+            if self.cache.add(counter, 1, timeout=2 * self.window + 1):
+                count = 1
+            else:
+                count = self.cache.incr(counter)
+
+        previous = self._remembered_previous(hashed, current)
+        if previous is None:
+            previous = self.cache.get(self._counter_key(hashed, current - 1), 0)
+            self._remember_previous(hashed, previous)
+
+        if self._allows(count, previous, now):
+            return True
+        # Rejected requests do not count against the client
+        self.cache.decr(counter)
+        return False
+
+    async def ahit(self, key):
+        """Async version of hit, using the cache's async API."""
+        now = self._clock()
+        current = int(now // self.window)
+        hashed = key_hash(key)
+        counter = self._counter_key(hashed, current)
+
+        try:
+            count = await self.cache.aincr(counter)
+        except ValueError:
+            if await self.cache.aadd(counter, 1, timeout=2 * self.window + 1):
+                count = 1
+            else:
+                count = await self.cache.aincr(counter)
+
+        previous = self._remembered_previous(hashed, current)
+        if previous is None:
+            previous = await self.cache.aget(self._counter_key(hashed, current - 1), 0)
+            self._remember_previous(hashed, previous)
+
+        if self._allows(count, previous, now):
+            return True
+        await self.cache.adecr(counter)
+        return False
+
+    def clear(self):
+        """Forget the remembered previous-window counts (cache entries expire on their own)."""
+        with self._lock:
+            self._previous.clear()
+
+    def stats(self):
+        """Return a snapshot of the limiter counters; keys live in the cache and are not counted."""
+        with self._lock:
+            return {
+                'tracked_keys': None,
+                'max_keys': self.max_keys,
+                'allowed': self.allowed,
+                'rejections': self.rejections,
+                'evictions': None,
+                'expirations': None,
+            }
+
+
+def default_shared_path():
+    """Shared table path prefix: in /dev/shm (RAM-backed) where it exists, else the temp directory."""
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, 'fairpaycheck-ratelimit')
+
+
+def shared_table_path(prefix, max_keys):
+    """
+    File for a shared table of max_keys slots: the geometry is part of the
+    name, so a deploy that changes RATE_LIMIT_MAX_CLIENTS starts a new table
+    instead of resizing one that running workers have mapped.
+    """
+    buckets = max(1, max_keys // BUCKET_WAYS)
+    return f'{prefix}-{buckets * BUCKET_WAYS}x{SLOT.size}'
+
+
+def create_limiter(backend, limit, window, max_keys, options=None):
+    """Build the limiter for a RATE_LIMIT_BACKEND name ('memory', 'shared' or 'cache')."""
+    options = options or {}
+    if backend == 'memory':
+        return SlidingWindowLimiter(limit, window, max_keys)
+    if backend == 'shared':
+        prefix = options.get('path') or default_shared_path()
+        return SharedMemoryLimiter(limit, window, max_keys, shared_table_path(prefix, max_keys))
+    if backend == 'cache':
+        return CacheLimiter(limit, window, max_keys, options.get('alias', 'default'))
+    raise ValueError(f'Unknown rate limit backend: {backend!r}')
+
+
+_limiter = None
+_lock = threading.Lock()
+
+
+def get_limiter():
+    """The limiter for the RATE_LIMIT settings, created on first use and shared by the process."""
+    global _limiter
+    if _limiter is None:
+        with _lock:
+            if _limiter is None:
+                _limiter = create_limiter(
+                    getattr(settings, 'RATE_LIMIT_BACKEND', 'memory'),
+                    getattr(settings, 'RATE_LIMIT', 30),
+                    getattr(settings, 'RATE_LIMIT_WINDOW', 60),
+                    getattr(settings, 'RATE_LIMIT_MAX_CLIENTS', 100000),
+                    getattr(settings, 'RATE_LIMIT_OPTIONS', None),
+                )
+    return _limiter
+
+
+def stats():
+    """Counters of this process's limiter (tracked_keys, allowed, rejections, evictions...) and its backend."""
+    limiter = get_limiter()
+    return {'backend': type(limiter).__name__, **limiter.stats()}
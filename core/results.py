@@ -0,0 +1,219 @@
+"""
+FairPayCheck Score Types
+Compact input/result objects for the scoring engine and a JSON serializer
+specialised to the fixed result shape.
+"""
+
+from functools import lru_cache
+from json.encoder import encode_basestring_ascii
+
+
+# Top-level keys of a scoring result, in response order
+RESULT_FIELDS = (
+    'version', 'score', 'verdict', 'verdict_code', 'confidence', 'salary_range', 'reasons',
+    'data_updated', 'disclaimer', 'job_recommendations', 'score_breakdown', 'debug',
+)
+
+SALARY_RANGE_KEYS = ('min', 'max', 'currency', 'formatted_min', 'formatted_max')
+SCORE_BREAKDOWN_KEYS = ('market', 'experience', 'skills', 'company', 'progression', 'timing', 'baseline')
+DEBUG_KEYS = ('role_category', 'experience_level', 'market_median')
+
+
+class ScoreInputs:
+    """
+    Parsed scoring inputs. `raw` keeps the request values the reason texts
+    quote from: the original body, or the coerced values when the payload
+    went through core.schema.
+    """
+
+    __slots__ = (
+        'job_title', 'country', 'industry', 'years_experience', 'company_size',
+        'skills', 'salary', 'years_in_role', 'promotion_received', 'raw',
+    )
+
+    def __init__(self, job_title, country, industry, years_experience, company_size,
+                 skills, salary, years_in_role, promotion_received, raw):
+        self.job_title = job_title
+        self.country = country
+        self.industry = industry
+        self.years_experience = years_experience
+        self.company_size = company_size
+        self.skills = skills
+        self.salary = salary
+        self.years_in_role = years_in_role
+        self.promotion_received = promotion_received
+        self.raw = raw
+
+    @classmethod
+    def from_body(cls, body):
+        """
+        Build inputs from a request body dict, applying the defaults and
+        coercions calculate_full_score has always used. Raises ValueError or
+        TypeError if years_experience is not an integer.
+        """
+        get = body.get
+        salary = get('salary')
+        years_in_role = get('years_in_role')
+
+        # Convert salary to float if provided
+        if salary:
+            try:
+                salary = float(salary)
+            except (ValueError, TypeError):
+                salary = None
+
+        if years_in_role:
+            try:
+                years_in_role = int(years_in_role)
+            except (ValueError, TypeError):
+                years_in_role = None
+
+        return cls(
+            get('job_title', ''),
+            get('country', 'USA'),
+            get('industry', 'other'),
+            int(get('years_experience', 0)),
+            get('company_size', 'medium'),
+            get('skills', ''),
+            salary,
+            years_in_role,
+            get('promotion_received', False),
+            body,
+        )
+
+
+class ScoreResult:
+    """
+    Result of scoring one profile. Only the top-level keys listed in `fields`
+    are populated. Nested parts are stored as tuples in the order of
+    SALARY_RANGE_KEYS, SCORE_BREAKDOWN_KEYS and DEBUG_KEYS.
+    Instances are shared through the result cache and must not be modified.
+    """
+
+    __slots__ = (
+        'fields', 'score', 'verdict', 'verdict_code', 'confidence', 'salary_range', 'reasons',
+        'data_updated', 'disclaimer', 'score_breakdown', 'debug', '_json',
+    )
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.score = None
+        self.verdict = None
+        self.verdict_code = None
+        self.confidence = None
+        self.salary_range = None
+        self.reasons = None
+        self.data_updated = None
+        self.disclaimer = None
+        self.score_breakdown = None
+        self.debug = None
+        self._json = None
+
+    def to_dict(self):
+        """Return the result in the API's dict shape."""
+        wanted = self.fields
+        if wanted is RESULT_FIELDS:
+            # Full result: build it in one go rather than key by key
+            return {
+                'version': '1.0',
+                'score': self.score,
+                'verdict': self.verdict,
+                'verdict_code': self.verdict_code,
+                'confidence': self.confidence,
+                'salary_range': dict(zip(SALARY_RANGE_KEYS, self.salary_range)),
+                'reasons': self.reasons,
+                'data_updated': self.data_updated,
+                'disclaimer': self.disclaimer,
+                'job_recommendations': None,  # Placeholder for future feature
+                'score_breakdown': dict(zip(SCORE_BREAKDOWN_KEYS, self.score_breakdown)),
+                'debug': dict(zip(DEBUG_KEYS, self.debug)),
+            }
+        result = {'version': '1.0'}
+        for name in RESULT_FIELDS[1:]:
+            if name not in wanted:
+                continue
+            if name == 'salary_range':
+                result[name] = dict(zip(SALARY_RANGE_KEYS, self.salary_range))
+            elif name == 'score_breakdown':
+                result[name] = dict(zip(SCORE_BREAKDOWN_KEYS, self.score_breakdown))
+            elif name == 'debug':
+                result[name] = dict(zip(DEBUG_KEYS, self.debug))
+            elif name == 'job_recommendations':
+                result[name] = None  # Placeholder for future feature
+            else:
+                result[name] = getattr(self, name)
+        return result
+
+    def to_json(self):
+        """
+        Return the result as a JSON string, byte-identical to JsonResponse's
+        encoding of to_dict(). Encoded once and memoised.
+        """
+        if self._json is None:
+            self._json = _encode_result(self)
+        return self._json
+
+
+# Labels, currency codes and data texts repeat across results; encode them once
+_encode_label = lru_cache(maxsize=512)(encode_basestring_ascii)
+
+
+def _encode_number(value):
+    return float.__repr__(value) if isinstance(value, float) else int.__repr__(value)
+
+
+def _encode_result(result):
+    """Serialize a ScoreResult; the key order and spacing follow json.dumps defaults."""
+    wanted = result.fields
+    parts = ['{"version": "1.0"']
+
+    if 'score' in wanted:
+        parts.append(', "score": ')
+        parts.append(_encode_number(result.score))
+    if 'verdict' in wanted:
+        parts.append(', "verdict": ')
+        parts.append(_encode_label(result.verdict))
+    if 'verdict_code' in wanted:
+        parts.append(', "verdict_code": ')
+        parts.append(_encode_label(result.verdict_code))
+    if 'confidence' in wanted:
+        parts.append(', "confidence": ')
+        parts.append(_encode_label(result.confidence))
+    if 'salary_range' in wanted:
+        min_salary, max_salary, currency_code, formatted_min, formatted_max = result.salary_range
+        parts.append(
+            f', "salary_range": {{"min": {_encode_number(min_salary)}, '
+            f'"max": {_encode_number(max_salary)}, '
+            f'"currency": {_encode_label(currency_code)}, '
+            f'"formatted_min": {encode_basestring_ascii(formatted_min)}, '
+            f'"formatted_max": {encode_basestring_ascii(formatted_max)}}}'
+        )
+    if 'reasons' in wanted:
+        parts.append(', "reasons": [')
+        parts.append(', '.join([_encode_label(reason) for reason in result.reasons]))
+        parts.append(']')
+    if 'data_updated' in wanted:
+        parts.append(', "data_updated": ')
+        parts.append(_encode_label(result.data_updated))
+    if 'disclaimer' in wanted:
+        parts.append(', "disclaimer": ')
+        parts.append(_encode_label(result.disclaimer))
+    if 'job_recommendations' in wanted:
+        parts.append(', "job_recommendations": null')
+    if 'score_breakdown' in wanted:
+        parts.append(', "score_breakdown": {')
+        parts.append(', '.join([
+            f'"{key}": {_encode_number(value)}'
+            for key, value in zip(SCORE_BREAKDOWN_KEYS, result.score_breakdown)
+        ]))
+        parts.append('}')
+    if 'debug' in wanted:
+        role_category, experience_level, market_median = result.debug
+        parts.append(
+            f', "debug": {{"role_category": {_encode_label(role_category)}, '
+            f'"experience_level": {_encode_label(experience_level)}, '
+            f'"market_median": {_encode_number(market_median)}}}'
+        )
+
+    parts.append('}')
+    return ''.join(parts)
@@ -0,0 +1,215 @@
+"""
+FairPayCheck Request Schema
+Validates and coerces scoring payloads in one pass. The schema is compiled
+once per market data snapshot into frozenset lookups and typed coercers.
+"""
+
+import math
+from urllib.parse import urlencode
+
+from .results import ScoreInputs
+from .snapshots import market_data as data
+
+
+MAX_YEARS = 60
+MAX_SALARY = 1e10
+MAX_JOB_TITLE_LENGTH = 200
+MAX_SKILLS_LENGTH = 2000
+
+BOOLEAN_TRUE = frozenset(('1', 'true', 'yes', 'y', 'on'))
+BOOLEAN_FALSE = frozenset(('0', 'false', 'no', 'n', 'off'))
+
+REQUIRED_MESSAGE = 'This field is required'
+
+
+class InvalidValue(ValueError):
+    """Raised by a coercer; the message is reported for the field."""
+
+
+def _choice(name, values):
+    allowed = frozenset(values)
+    message = f'Invalid {name}. Must be one of: {", ".join(values)}'
+
+    def coerce(value):
+        if type(value) is str:
+            value = value.strip()
+            if value in allowed:
+                return value
+        raise InvalidValue(message)
+    return coerce
+
+
+def _text(name, max_length):
+    message = f'Invalid {name}. Must be text of at most {max_length} characters'
+
+    def coerce(value):
+        if type(value) is not str or len(value) > max_length:
+            raise InvalidValue(message)
+        return value
+    return coerce
+
+
+def _whole_number(name, maximum):
+    message = f'Invalid {name}. Must be a whole number from 0 to {maximum}'
+    max_digits = len(str(maximum))
+
+    def coerce(value):
+        kind = type(value)
+        if kind is str:
+            value = value.strip()
+            if not value.isdecimal():
+                raise InvalidValue(message)
+            # int() refuses very long digit strings, so check the length first
+            value = value.lstrip('0') or '0'
+            if len(value) > max_digits:
+                raise InvalidValue(message)
+            value = int(value)
+        elif kind is float and value.is_integer():
+            value = int(value)
+        elif kind is not int:
+            raise InvalidValue(message)
+        if not 0 <= value <= maximum:
+            raise InvalidValue(message)
+        return value
+    return coerce
+
+
+def _amount(name, maximum):
+    message = f'Invalid {name}. Must be a positive number, or 0 if not given'
+
+    def coerce(value):
+        kind = type(value)
+        if kind is str or kind is int or kind is float:
+            try:
+                value = float(value)
+            except (ValueError, OverflowError):
+                raise InvalidValue(message) from None
+        else:
+            raise InvalidValue(message)
+        if not (math.isfinite(value) and 0 <= value <= maximum):
+            raise InvalidValue(message)
+        # Scoring has always treated a zero amount as not given
+        return value or None
+    return coerce
+
+
+def _flag(name):
+    message = f'Invalid {name}. Must be true or false'
+
+    def coerce(value):
+        kind = type(value)
+        if kind is bool:
+            return value
+        if kind is int and value in (0, 1):
+            return bool(value)
+        if kind is str:
+            value = value.strip().lower()
+            if value in BOOLEAN_TRUE:
+                return True
+            if value in BOOLEAN_FALSE:
+                return False
+        raise InvalidValue(message)
+    return coerce
+
+
+class ScoreSchema:
+    """
+    Compiled schema for one scoring payload. Built from the market data
+    tables, so obtain it through get_schema() rather than directly.
+    """
+
+    def __init__(self):
+        # (name, required, coercer, default), in ScoreInputs order
+        self.fields = (
+            ('job_title', True, _text('job_title', MAX_JOB_TITLE_LENGTH), None),
+            ('country', True, _choice('country', [c['value'] for c in data.COUNTRIES]), None),
+            ('industry', True, _choice('industry', [i['value'] for i in data.INDUSTRIES]), None),
+            ('years_experience', True, _whole_number('years_experience', MAX_YEARS), None),
+            ('company_size', True, _choice('company_size', [s['value'] for s in data.COMPANY_SIZES]), None),
+            ('skills', False, _text('skills', MAX_SKILLS_LENGTH), ''),
+            ('salary', False, _amount('salary', MAX_SALARY), None),
+            ('years_in_role', False, _whole_number('years_in_role', MAX_YEARS), None),
+            ('promotion_received', False, _flag('promotion_received'), False),
+        )
+
+    def decode(self, body):
+        """
+        Validate and coerce a payload dict.
+        Returns (inputs, errors): a ScoreInputs and None, or None and a dict
+        mapping each bad field to its error message.
+        """
+        if not isinstance(body, dict):
+            return None, {'': 'Request body must be a JSON object'}
+
+        get = body.get
+        values = {}
+        errors = None
+
+        for name, required, coerce, default in self.fields:
+            value = get(name)
+            if value is None or value == '':
+                if required:
+                    errors = errors or {}
+                    errors[name] = REQUIRED_MESSAGE
+                values[name] = default
+                continue
+            try:
+                values[name] = coerce(value)
+            except InvalidValue as e:
+                errors = errors or {}
+                errors[name] = str(e)
+
+        if errors:
+            return None, errors
+        # The reason texts quote from `raw`; give them the coerced values
+        return ScoreInputs(raw=values, **values), None
+
+    def encode(self, inputs):
+        """
+        Canonical (name, value) pairs for decoded inputs: sorted by name,
+        values written as decode() coerced them, defaults left out. Decoding
+        the pairs gives back the same inputs.
+        """
+        pairs = []
+        for name, _, _, default in self.fields:
+            value = getattr(inputs, name)
+            if value is None or value == default:
+                continue
+            if type(value) is bool:
+                value = 'true'
+            elif type(value) is float:
+                value = str(int(value)) if value.is_integer() else repr(value)
+            pairs.append((name, str(value)))
+        pairs.sort()
+        return pairs
+
+
+def get_schema():
+    """Return the schema compiled for the current market data snapshot."""
+    return data.derived('score_schema', ScoreSchema)
+
+
+def decode_score_inputs(body):
+    """Validate and coerce a scoring payload; see ScoreSchema.decode."""
+    return get_schema().decode(body)
+
+
+def canonical_query(inputs, fields=None):
+    """
+    Canonical query string for decoded inputs and an optional fields
+    projection, so equal requests share one URL (and one CDN cache entry).
+    """
+    pairs = get_schema().encode(inputs)
+    if fields:
+        pairs.append(('fields', ','.join(sorted(fields))))
+        pairs.sort()
+    return urlencode(pairs)
+
+
+def error_message(errors):
+    """Summarize per-field errors as one message."""
+    missing = [name for name, error in errors.items() if error == REQUIRED_MESSAGE]
+    messages = [error for error in errors.values() if error != REQUIRED_MESSAGE]
+    if missing:
+        messages.insert(0, f'Missing required fields: {", ".join(missing)}')
+    return '; '.join(messages)
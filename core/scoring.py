@@ -1,10 +1,24 @@
 """
 FairPayCheck Scoring Engine
 Implements all scoring formulas and calculations.
+
+Functions that read market data take an optional last argument `data`:
+the snapshot to read, by default the market_data proxy (see
+core/snapshots.py). The top-level scoring functions resolve the snapshot
+once and pass it down, so a score does not go through the proxy for
+every table lookup.
 """
 
+import hashlib
 import re
-from . import data
+from array import array
+from functools import partial
+
+from . import snapshots
+from .cache import LRUCache
+from .matching import KeywordMatcher, SubstringIndex
+from .results import RESULT_FIELDS, ScoreInputs, ScoreResult
+from .snapshots import market_data as data
 
 
 def clamp(value, min_val, max_val):
@@ -12,13 +26,13 @@ def clamp(value, min_val, max_val):
     return max(min_val, min(value, max_val))
 
 
-def round_salary(amount, currency):
+def round_salary(amount, currency, data=data):
     """Round salary to appropriate threshold based on currency."""
     threshold = data.SALARY_ROUNDING.get(currency, 1000)
     return round(amount / threshold) * threshold
 
 
-def get_experience_level(years):
+def get_experience_level(years, data=data):
     """Determine experience level based on years of experience."""
     for level, (min_years, max_years) in data.EXPERIENCE_LEVELS.items():
         if min_years <= years <= max_years:
@@ -26,19 +40,33 @@ def get_experience_level(years):
     return 'principal'  # Default for high experience
 
 
-def categorize_role(job_title):
+def _build_role_matcher():
+    """
+    Compile ROLE_KEYWORDS into a single automaton. Each keyword is ranked by
+    the position of its category, so the lowest-ranked hit is the first
+    matching category in dict order (e.g. 'architect' resolves to engineering).
+    """
+    categories = list(data.ROLE_KEYWORDS)
+    matcher = KeywordMatcher(
+        (keyword, rank)
+        for rank, category in enumerate(categories)
+        for keyword in data.ROLE_KEYWORDS[category]
+    )
+    return matcher, categories
+
+
+def categorize_role(job_title, data=data):
     """Categorize a job title into a role category."""
-    title_lower = job_title.lower()
+    matcher, categories = data.derived('role_matcher', _build_role_matcher)
+    rank = matcher.best_rank(job_title.lower())
     
-    for category, keywords in data.ROLE_KEYWORDS.items():
-        for keyword in keywords:
-            if keyword in title_lower:
-                return category
+    if rank is None:
+        return 'default'
     
-    return 'default'
+    return categories[rank]
 
 
-def get_market_median(role_category, experience_level, country, industry):
+def get_market_median(role_category, experience_level, country, industry, data=data):
     """
     Get the market median salary for a given role/experience/country combination.
     Returns the median in local currency.
@@ -82,7 +110,7 @@ def normalize_salary_to_usd(salary, country):
     return normalized_usd
 
 
-def calculate_market_score(salary, market_median, country):
+def calculate_market_score(salary, market_median, country, data=data):
     """
     Calculate the Market Score (max 30 points).
     Based on normalized salary vs market median.
@@ -117,7 +145,17 @@ def calculate_market_score(salary, market_median, country):
     return clamp(market_score, 0, MAX_SCORE)
 
 
-def calculate_experience_score(years_experience, salary, market_median, country):
+# Expected pay relative to the market median, by experience level
+EXPERIENCE_PAY_MULTIPLIERS = {
+    'junior': 0.7,
+    'mid': 0.9,
+    'senior': 1.1,
+    'lead': 1.25,
+    'principal': 1.4,
+}
+
+
+def calculate_experience_score(years_experience, salary, market_median, country, data=data):
     """
     Calculate the Experience Score (max 20 points).
     Based on mismatch between experience level and expected pay tier.
@@ -125,7 +163,7 @@ def calculate_experience_score(years_experience, salary, market_median, country)
     MAX_SCORE = data.SCORE_WEIGHTS['experience']
     
     # Determine expected level based on experience
-    exp_level = get_experience_level(years_experience)
+    exp_level = get_experience_level(years_experience, data)
     
     # If no salary provided, base only on experience years
     if salary is None or salary <= 0:
@@ -137,15 +175,7 @@ def calculate_experience_score(years_experience, salary, market_median, country)
     currency_code = data.COUNTRY_CURRENCIES.get(country, {}).get('code', 'USD')
     
     # For senior+ roles, expected pay should be higher
-    level_multipliers = {
-        'junior': 0.7,
-        'mid': 0.9,
-        'senior': 1.1,
-        'lead': 1.25,
-        'principal': 1.4,
-    }
-    
-    expected_multiplier = level_multipliers.get(exp_level, 1.0)
+    expected_multiplier = EXPERIENCE_PAY_MULTIPLIERS.get(exp_level, 1.0)
     expected_salary = market_median * expected_multiplier
     
     # Calculate gap
@@ -159,7 +189,42 @@ def calculate_experience_score(years_experience, salary, market_median, country)
     return clamp(gap_ratio * MAX_SCORE, 0, MAX_SCORE)
 
 
-def calculate_skill_score(skills_text):
+def _build_skill_index():
+    """
+    Index SKILL_PREMIUMS for partial matching in both directions: known
+    skills contained in a token (automaton over the token) and tokens
+    contained in a known skill (substring index). Ranks follow dict order.
+    """
+    skills = list(data.SKILL_PREMIUMS)
+    ranked = [(skill, rank) for rank, skill in enumerate(skills)]
+    return KeywordMatcher(ranked), SubstringIndex(ranked), skills
+
+
+def find_partial_skill(skill, data=data):
+    """
+    Return the first known skill (in SKILL_PREMIUMS order) that is contained
+    in, or contains, the given lowercased skill token. None if there is none.
+    """
+    matcher, substrings, names = data.derived('skill_index', _build_skill_index)
+    ranks = [
+        rank for rank in (matcher.best_rank(skill), substrings.best_rank(skill))
+        if rank is not None
+    ]
+    
+    if not ranks:
+        return None
+    
+    return names[min(ranks)]
+
+
+def parse_skills(skills_text):
+    """Split a skills string (comma or semicolon separated) into lowercased tokens."""
+    if not skills_text:
+        return []
+    return [s.strip().lower() for s in re.split(r'[,;]', skills_text) if s.strip()]
+
+
+def calculate_skill_score(skills_text, data=data):
     """
     Calculate the Skill Premium Score (max 15 points).
     Based on weighted demand of listed skills.
@@ -169,8 +234,7 @@ def calculate_skill_score(skills_text):
     if not skills_text or not skills_text.strip():
         return MAX_SCORE * 0.3  # Default low score for no skills listed
     
-    # Parse skills (comma or semicolon separated)
-    skills = [s.strip().lower() for s in re.split(r'[,;]', skills_text) if s.strip()]
+    skills = parse_skills(skills_text)
     
     if not skills:
         return MAX_SCORE * 0.3
@@ -186,11 +250,10 @@ def calculate_skill_score(skills_text):
             matched_skills += 1
         else:
             # Check partial match
-            for known_skill, premium in data.SKILL_PREMIUMS.items():
-                if known_skill in skill or skill in known_skill:
-                    total_premium += premium * 0.7  # Partial match penalty
-                    matched_skills += 1
-                    break
+            known_skill = find_partial_skill(skill, data)
+            if known_skill is not None:
+                total_premium += data.SKILL_PREMIUMS[known_skill] * 0.7  # Partial match penalty
+                matched_skills += 1
     
     if matched_skills == 0:
         return MAX_SCORE * 0.4  # Skills listed but not recognized
@@ -205,7 +268,7 @@ def calculate_skill_score(skills_text):
     return clamp(score, 0, MAX_SCORE)
 
 
-def calculate_company_score(company_size, country):
+def calculate_company_score(company_size, country, data=data):
     """
     Calculate the Company Score (max 10 points).
     Adjusted by Region Company Multiplier (RCM).
@@ -232,7 +295,7 @@ def calculate_company_score(company_size, country):
     return clamp(adjusted_score, 0, MAX_SCORE)
 
 
-def calculate_progression_score(years_in_role, promotion_received):
+def calculate_progression_score(years_in_role, promotion_received, data=data):
     """
     Calculate the Career Progression Score (max 10 points).
     Based on years in same role + promotion history.
@@ -257,7 +320,7 @@ def calculate_progression_score(years_in_role, promotion_received):
     return clamp(score, 0, MAX_SCORE)
 
 
-def calculate_timing_score(role_category):
+def calculate_timing_score(role_category, data=data):
     """
     Calculate the Market Timing Score (max 10 points).
     Based on role demand trends.
@@ -274,7 +337,7 @@ def calculate_timing_score(role_category):
     return clamp(score, 0, MAX_SCORE)
 
 
-def calculate_confidence(salary_provided, country, role_category):
+def calculate_confidence(salary_provided, country, role_category, data=data):
     """
     Calculate confidence level based on data quality.
     Returns: 'High', 'Medium', or 'Low'
@@ -306,7 +369,7 @@ def calculate_confidence(salary_provided, country, role_category):
     return base_confidence
 
 
-def get_verdict(score):
+def get_verdict(score, data=data):
     """Get the verdict label and code based on total score."""
     if score >= data.VERDICT_THRESHOLDS['likely_underpaid']:
         return 'Likely underpaid', 'likely_underpaid'
@@ -396,20 +459,20 @@ def generate_reasons(scores, inputs):
     return top_reasons[:3]
 
 
-def calculate_salary_range(market_median, currency_code):
+def calculate_salary_range(market_median, currency_code, data=data):
     """Calculate the fair salary range based on market median."""
     # Range is typically -10% to +10% of median
     min_salary = market_median * 0.9
     max_salary = market_median * 1.1
     
     # Round to appropriate threshold
-    min_salary = round_salary(min_salary, currency_code)
-    max_salary = round_salary(max_salary, currency_code)
+    min_salary = round_salary(min_salary, currency_code, data)
+    max_salary = round_salary(max_salary, currency_code, data)
     
     return min_salary, max_salary
 
 
-def format_salary(amount, currency_code, country):
+def format_salary(amount, currency_code, country, data=data):
     """Format salary amount with currency symbol."""
     currency_info = data.COUNTRY_CURRENCIES.get(country, {'symbol': '$'})
     symbol = currency_info['symbol']
@@ -420,9 +483,191 @@ def format_salary(amount, currency_code, country):
     return f"{symbol}{formatted}"
 
 
-def calculate_full_score(inputs):
+class CategoricalTable:
+    """
+    Dense, array-backed table of every score input that depends only on
+    categorical values: market median and currency, company score, timing
+    score and confidence.
+    
+    Each component is stored over just the dimensions it depends on
+    (e.g. the median over role x level x country x industry, the company
+    score over size x country), flattened into row-major arrays.
     """
-    Main scoring function - calculates all components and returns full result.
+    
+    def __init__(self):
+        self.roles = list(data.ROLE_KEYWORDS) + ['default']
+        self.levels = list(data.EXPERIENCE_LEVELS)
+        self.countries = [c['value'] for c in data.COUNTRIES]
+        self.industries = [i['value'] for i in data.INDUSTRIES]
+        self.sizes = [s['value'] for s in data.COMPANY_SIZES]
+        
+        self._role_index = {v: i for i, v in enumerate(self.roles)}
+        self._level_index = {v: i for i, v in enumerate(self.levels)}
+        self._country_index = {v: i for i, v in enumerate(self.countries)}
+        self._industry_index = {v: i for i, v in enumerate(self.industries)}
+        self._size_index = {v: i for i, v in enumerate(self.sizes)}
+        
+        self.medians = array('d')
+        self.currencies = [
+            data.COUNTRY_CURRENCIES.get(country, {}).get('code', 'USD') for country in self.countries
+        ]
+        for role in self.roles:
+            for level in self.levels:
+                for country in self.countries:
+                    for industry in self.industries:
+                        self.medians.append(get_market_median(role, level, country, industry)[0])
+        
+        self.company_scores = array('d', [
+            calculate_company_score(size, country)
+            for size in self.sizes
+            for country in self.countries
+        ])
+        self.timing_scores = array('d', [calculate_timing_score(role) for role in self.roles])
+        self.confidence = [
+            calculate_confidence(salary_provided, country, role)
+            for country in self.countries
+            for role in self.roles
+            for salary_provided in (False, True)
+        ]
+    
+    def lookup(self, role_category, experience_level, country, industry, company_size, salary_provided):
+        """
+        Return (market_median, currency_code, company_score, timing_score, confidence),
+        or None if any value falls outside the table.
+        """
+        try:
+            r = self._role_index[role_category]
+            e = self._level_index[experience_level]
+            c = self._country_index[country]
+            i = self._industry_index[industry]
+            s = self._size_index[company_size]
+        except (KeyError, TypeError):
+            return None
+        
+        n_countries = len(self.countries)
+        median_index = ((r * len(self.levels) + e) * n_countries + c) * len(self.industries) + i
+        
+        return (
+            self.medians[median_index],
+            self.currencies[c],
+            self.company_scores[s * n_countries + c],
+            self.timing_scores[r],
+            self.confidence[(c * len(self.roles) + r) * 2 + bool(salary_provided)],
+        )
+
+
+def get_categorical_table(data=data):
+    """
+    Return the categorical table for the current market data snapshot.
+    Each snapshot builds its own table on first use, so loading new data
+    rebuilds it automatically.
+    """
+    return data.derived('categorical_table', CategoricalTable)
+
+
+def resolve_categorical(role_category, experience_level, country, industry, company_size, salary_provided,
+                        data=data):
+    """
+    Resolve (market_median, currency_code, company_score, timing_score, confidence)
+    from the categorical table, computing directly for values outside it.
+    """
+    cell = get_categorical_table(data).lookup(
+        role_category, experience_level, country, industry, company_size, salary_provided
+    )
+    if cell is not None:
+        return cell
+    
+    market_median, currency_code = get_market_median(role_category, experience_level, country, industry, data)
+    return (
+        market_median,
+        currency_code,
+        calculate_company_score(company_size, country, data),
+        calculate_timing_score(role_category, data),
+        calculate_confidence(salary_provided, country, role_category, data),
+    )
+
+
+def parse_inputs(inputs):
+    """
+    Extract and coerce raw scoring inputs into a ScoreInputs, applying the
+    same defaults calculate_full_score has always used. Inputs that are
+    already a ScoreInputs (e.g. validated by core.schema) are used as is.
+    """
+    if isinstance(inputs, ScoreInputs):
+        return inputs
+    return ScoreInputs.from_body(inputs)
+
+
+def sum_scores(scores, data=data):
+    """
+    Total of the score components plus the baseline, before clamping.
+    Every total is summed here, in the same order, so equal components
+    always round to the same score.
+    """
+    return sum(scores.values()) + data.SCORE_WEIGHTS['baseline']
+
+
+def build_result(parsed, role_category, experience_level, market_median, currency_code,
+                 scores, confidence, fields=None, data=data):
+    """
+    Assemble the ScoreResult from the computed score components.
+    If fields is given, only those top-level keys (plus 'version') are
+    computed.
+    """
+    country = parsed.country
+    wanted = RESULT_FIELDS if fields is None else fields
+    result = ScoreResult(wanted)
+    
+    # Calculate total score with baseline
+    total_score = clamp(sum_scores(scores, data), 0, 100)
+    
+    result.score = round(total_score)
+    
+    if 'verdict' in wanted or 'verdict_code' in wanted:
+        result.verdict, result.verdict_code = get_verdict(total_score, data)
+    
+    result.confidence = confidence
+    
+    if 'salary_range' in wanted:
+        min_salary, max_salary = calculate_salary_range(market_median, currency_code, data)
+        result.salary_range = (
+            min_salary,
+            max_salary,
+            currency_code,
+            format_salary(min_salary, currency_code, country, data),
+            format_salary(max_salary, currency_code, country, data),
+        )
+    
+    if 'reasons' in wanted:
+        result.reasons = generate_reasons(scores, parsed.raw)
+    
+    if 'data_updated' in wanted:
+        result.data_updated = data.DATA_UPDATED_DISPLAY
+    
+    if 'disclaimer' in wanted:
+        result.disclaimer = data.DISCLAIMER_TEXT.strip()
+    
+    if 'score_breakdown' in wanted:
+        result.score_breakdown = (
+            round(scores['market'], 1),
+            round(scores['experience'], 1),
+            round(scores['skills'], 1),
+            round(scores['company'], 1),
+            round(scores['progression'], 1),
+            round(scores['timing'], 1),
+            data.SCORE_WEIGHTS['baseline'],
+        )
+    
+    if 'debug' in wanted:
+        result.debug = (role_category, experience_level, round(market_median))
+    
+    return result
+
+
+def calculate_full_score(inputs, fields=None):
+    """
+    Main scoring function - calculates all components and returns full result,
+    or only the top-level keys listed in fields (see build_result).
     
     Expected inputs:
     - job_title: str
@@ -437,97 +682,310 @@ def calculate_full_score(inputs):
     - years_in_role: int (optional)
     - promotion_received: bool (optional)
     """
-    # Extract inputs with defaults
-    job_title = inputs.get('job_title', '')
-    country = inputs.get('country', 'USA')
-    industry = inputs.get('industry', 'other')
-    years_experience = int(inputs.get('years_experience', 0))
-    company_size = inputs.get('company_size', 'medium')
-    skills = inputs.get('skills', '')
-    salary = inputs.get('salary')
-    years_in_role = inputs.get('years_in_role')
-    promotion_received = inputs.get('promotion_received', False)
-    
-    # Convert salary to float if provided
-    if salary:
-        try:
-            salary = float(salary)
-        except (ValueError, TypeError):
-            salary = None
-    
-    if years_in_role:
-        try:
-            years_in_role = int(years_in_role)
-        except (ValueError, TypeError):
-            years_in_role = None
+    return calculate_result(parse_inputs(inputs), fields).to_dict()
+
+
+def calculate_result(parsed, fields=None):
+    """Score parsed inputs and return the ScoreResult (see calculate_full_score)."""
+    data = snapshots.current()
+    country = parsed.country
+    salary = parsed.salary
+    years_experience = parsed.years_experience
     
     # Categorize role
-    role_category = categorize_role(job_title)
-    experience_level = get_experience_level(years_experience)
+    role_category = categorize_role(parsed.job_title, data)
+    experience_level = get_experience_level(years_experience, data)
     
-    # Get market median
-    market_median, currency_code = get_market_median(
-        role_category, experience_level, country, industry
+    # Look up the categorical components
+    market_median, currency_code, company_score, timing_score, confidence = resolve_categorical(
+        role_category, experience_level, country, parsed.industry,
+        parsed.company_size, salary is not None, data
     )
     
     # Calculate all score components
     scores = {
-        'market': calculate_market_score(salary, market_median, country),
-        'experience': calculate_experience_score(years_experience, salary, market_median, country),
-        'skills': calculate_skill_score(skills),
-        'company': calculate_company_score(company_size, country),
-        'progression': calculate_progression_score(years_in_role, promotion_received),
-        'timing': calculate_timing_score(role_category),
+        'market': calculate_market_score(salary, market_median, country, data),
+        'experience': calculate_experience_score(years_experience, salary, market_median, country, data),
+        'skills': calculate_skill_score(parsed.skills, data),
+        'company': company_score,
+        'progression': calculate_progression_score(parsed.years_in_role, parsed.promotion_received, data),
+        'timing': timing_score,
     }
     
-    # Calculate total score with baseline
-    total_score = sum(scores.values()) + data.SCORE_WEIGHTS['baseline']
-    total_score = clamp(total_score, 0, 100)
+    return build_result(
+        parsed, role_category, experience_level, market_median, currency_code,
+        scores, confidence, fields, data
+    )
+
+
+# Result cache for calculate_result
+RESULT_CACHE_MAX_ENTRIES = 10000
+RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+RESULT_CACHE_TTL = 3600  # seconds
+
+result_cache = LRUCache(RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL)
+
+
+def result_cache_key(parsed):
+    """
+    Build the canonical cache key for a scoring request: the inputs reduced
+    to exactly what the result depends on, so equivalent submissions (e.g.
+    differently-cased titles in the same role category) share one entry.
+    Returns None if the inputs cannot be used as a key.
+    """
+    skills = parsed.skills
+    if skills and not isinstance(skills, str):
+        return None
+    
+    key = (
+        categorize_role(parsed.job_title),
+        parsed.country,
+        parsed.industry,
+        parsed.years_experience,
+        parsed.company_size,
+        tuple(parse_skills(skills)),
+        parsed.salary,
+        parsed.years_in_role,
+        bool(parsed.promotion_received),
+        # Raw values that are rendered into the reason texts
+        str(parsed.raw.get('years_experience', 0)),
+        repr(parsed.raw.get('years_in_role', 0)),
+    )
+    
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def result_etag(parsed, fields=None):
+    """
+    ETag for the result of a scoring request, computed without scoring:
+    a hash of the canonical cache key, the requested fields and
+    data.DATA_VERSION. Returns None if the inputs cannot be used as a key.
+    """
+    key = result_cache_key(parsed)
+    if key is None:
+        return None
+    
+    fields = None if fields is None else sorted(fields)
+    digest = hashlib.sha256(repr((key, fields, data.DATA_VERSION)).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def cached_result(parsed, fields=None):
+    """
+    calculate_result with memoization. Entries are keyed on the canonical
+    inputs and requested fields, and scoped to data.DATA_VERSION, so bumping
+    the data version invalidates the whole cache. Cached results keep their
+    encoded JSON, so a hit costs neither scoring nor serialization.
+    """
+    key = result_cache_key(parsed)
+    if key is None:
+        return calculate_result(parsed, fields)
+    
+    key += (fields if fields is None else frozenset(fields),)
+    result = result_cache.get(key, data.DATA_VERSION)
+    if result is None:
+        result = calculate_result(parsed, fields)
+        result.to_json()  # encode before caching so the entry size includes it
+        result_cache.set(key, result, data.DATA_VERSION)
+    return result
+
+
+def _map_distinct(func, *columns):
+    """
+    Apply func row-wise over parallel columns, evaluating it only once
+    per distinct tuple of arguments.
+    """
+    memo = {}
+    out = []
+    for key in zip(*columns):
+        if key not in memo:
+            memo[key] = func(*key)
+        out.append(memo[key])
+    return out
+
+
+def calculate_batch_scores(inputs_list, fields=None):
+    """
+    Batch scoring - scores many profiles in one pass and returns one result
+    per profile, identical to calling calculate_full_score on each.
+    """
+    parsed_rows = [parse_inputs(inputs) for inputs in inputs_list]
+    return [result.to_dict() for result in calculate_batch_results(parsed_rows, fields)]
+
+
+def calculate_batch_results(parsed_rows, fields=None):
+    """
+    Score a batch of parsed inputs, returning one ScoreResult per row.
+    
+    Works column by column: categorical components (role category, the
+    categorical table cell, skills, progression) are resolved once per
+    distinct value in the batch, and only the salary-dependent components
+    are evaluated per row.
+    """
+    data = snapshots.current()
+    
+    # Input columns
+    titles = [p.job_title for p in parsed_rows]
+    countries = [p.country for p in parsed_rows]
+    industries = [p.industry for p in parsed_rows]
+    years = [p.years_experience for p in parsed_rows]
+    sizes = [p.company_size for p in parsed_rows]
+    salaries = [p.salary for p in parsed_rows]
+    
+    # Categorical columns
+    role_categories = _map_distinct(partial(categorize_role, data=data), titles)
+    levels = _map_distinct(partial(get_experience_level, data=data), years)
+    categorical = _map_distinct(
+        partial(resolve_categorical, data=data), role_categories, levels, countries, industries, sizes,
+        [salary is not None for salary in salaries],
+    )
+    
+    # Score component columns
+    market = [
+        calculate_market_score(salary, cell[0], country, data)
+        for salary, cell, country in zip(salaries, categorical, countries)
+    ]
+    experience = [
+        calculate_experience_score(yrs, salary, cell[0], country, data)
+        for yrs, salary, cell, country in zip(years, salaries, categorical, countries)
+    ]
+    skills = _map_distinct(partial(calculate_skill_score, data=data), [p.skills for p in parsed_rows])
+    progression = _map_distinct(
+        partial(calculate_progression_score, data=data),
+        [p.years_in_role for p in parsed_rows],
+        [p.promotion_received for p in parsed_rows],
+    )
+    
+    results = []
+    for i, parsed in enumerate(parsed_rows):
+        market_median, currency_code, company_score, timing_score, confidence = categorical[i]
+        scores = {
+            'market': market[i],
+            'experience': experience[i],
+            'skills': skills[i],
+            'company': company_score,
+            'progression': progression[i],
+            'timing': timing_score,
+        }
+        results.append(build_result(
+            parsed, role_categories[i], levels[i],
+            market_median, currency_code, scores, confidence, fields, data
+        ))
+    
+    return results
+
+
+def _first_below(points, target):
+    """
+    For a non-increasing piecewise-linear curve given as (x, y) points, return
+    the largest x at which y >= target: None if y is below target everywhere,
+    or float('inf') if it never drops below it.
+    """
+    if points[0][1] < target:
+        return None
     
-    # Get verdict
-    verdict, verdict_code = get_verdict(total_score)
+    for (x0, y0), (x1, y1) in zip(points, points[1:]):
+        if y1 < target:
+            return x0 + (y0 - target) * (x1 - x0) / (y0 - y1)
+    
+    return float('inf')
+
+
+def calculate_salary_sweep(inputs):
+    """
+    Calculate the total score as an exact function of salary.
+    
+    Only the market and experience components depend on salary, and both are
+    clamped linear functions of it, so the score is piecewise linear and
+    non-increasing in salary. Returns the curve's breakpoints (linear in
+    between, constant after the last one; the first point is the limit as
+    salary approaches 0) and the salary range for each verdict, where each
+    range includes its max_salary. This replaces one /api/calculate/ call
+    per slider position. Any salary in inputs is ignored.
+    """
+    data = snapshots.current()
+    parsed = parse_inputs(inputs)
+    country = parsed.country
+    years_experience = parsed.years_experience
+    
+    role_category = categorize_role(parsed.job_title, data)
+    experience_level = get_experience_level(years_experience, data)
+    market_median, currency_code, company_score, timing_score, confidence = resolve_categorical(
+        role_category, experience_level, country, parsed.industry, parsed.company_size, True, data
+    )
     
-    # Calculate confidence
-    confidence = calculate_confidence(salary is not None, country, role_category)
+    # Components in calculate_result's order; only market and experience depend on salary
+    scores = {
+        'market': 0,
+        'experience': 0,
+        'skills': calculate_skill_score(parsed.skills, data),
+        'company': company_score,
+        'progression': calculate_progression_score(parsed.years_in_role, parsed.promotion_received, data),
+        'timing': timing_score,
+    }
+    expected_salary = market_median * EXPERIENCE_PAY_MULTIPLIERS.get(experience_level, 1.0)
     
-    # Calculate salary range
-    min_salary, max_salary = calculate_salary_range(market_median, currency_code)
+    def unclamped_total(salary):
+        if salary > 0:
+            scores['market'] = calculate_market_score(salary, market_median, country, data)
+            scores['experience'] = calculate_experience_score(years_experience, salary, market_median, country, data)
+        else:
+            # The limit as salary approaches 0: the whole gap to the median
+            scores['market'] = data.SCORE_WEIGHTS['market'] if market_median > 0 else 0
+            scores['experience'] = data.SCORE_WEIGHTS['experience'] if expected_salary > 0 else 0
+        return sum_scores(scores, data)
+    
+    # Kinks where each component reaches zero, plus where the total crosses the 0-100 clamp
+    salaries = sorted({0.0} | {x for x in (market_median, expected_salary) if x > 0})
+    points = [(x, unclamped_total(x)) for x in salaries]
+    for bound in (100, 0):
+        crossing = _first_below(points, bound)
+        if crossing not in (None, float('inf')) and crossing not in salaries:
+            salaries = sorted(salaries + [crossing])
+            points = [(x, unclamped_total(x)) for x in salaries]
+    points = [(x, clamp(y, 0, 100)) for x, y in points]
+    
+    # Salary ranges per verdict, from the highest threshold down
+    verdicts = []
+    lower = 0.0
+    thresholds = sorted(data.VERDICT_THRESHOLDS.values(), reverse=True) + [float('-inf')]
+    for threshold in thresholds:
+        upper = _first_below(points, threshold)
+        if upper is None or (verdicts and upper <= lower):
+            continue
+        verdict, verdict_code = get_verdict(threshold, data)
+        verdicts.append({
+            'verdict': verdict,
+            'verdict_code': verdict_code,
+            'min_salary': round(lower, 2),
+            'max_salary': None if upper == float('inf') else round(upper, 2),
+        })
+        if upper == float('inf'):
+            break
+        lower = upper
     
-    # Generate reasons
-    reasons = generate_reasons(scores, inputs)
+    # Score when no salary is given at all
+    scores['market'] = calculate_market_score(None, market_median, country, data)
+    scores['experience'] = calculate_experience_score(years_experience, None, market_median, country, data)
+    without_salary = clamp(sum_scores(scores, data), 0, 100)
     
-    # Build response
-    result = {
+    return {
         'version': '1.0',
-        'score': round(total_score),
-        'verdict': verdict,
-        'verdict_code': verdict_code,
-        'confidence': confidence,
-        'salary_range': {
-            'min': min_salary,
-            'max': max_salary,
-            'currency': currency_code,
-            'formatted_min': format_salary(min_salary, currency_code, country),
-            'formatted_max': format_salary(max_salary, currency_code, country),
-        },
-        'reasons': reasons,
-        'data_updated': data.DATA_UPDATED_DISPLAY,
-        'disclaimer': data.DISCLAIMER_TEXT.strip(),
-        'job_recommendations': None,  # Placeholder for future feature
-        'score_breakdown': {
-            'market': round(scores['market'], 1),
-            'experience': round(scores['experience'], 1),
-            'skills': round(scores['skills'], 1),
-            'company': round(scores['company'], 1),
-            'progression': round(scores['progression'], 1),
-            'timing': round(scores['timing'], 1),
-            'baseline': data.SCORE_WEIGHTS['baseline'],
-        },
+        'currency': currency_code,
+        'curve': [{'salary': round(x, 2), 'score': round(y, 2)} for x, y in points],
+        'verdicts': verdicts,
+        'score_without_salary': round(without_salary),
         'debug': {
             'role_category': role_category,
             'experience_level': experience_level,
             'market_median': round(market_median),
         }
     }
-    
-    return result
+
+
+# Build the categorical table at startup rather than on the first request
+get_categorical_table()
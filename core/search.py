@@ -0,0 +1,222 @@
+"""
+FairPayCheck Blog Search
+Full-text index over blog posts: a tsvector table with a GIN index on
+PostgreSQL, an FTS5 virtual table on SQLite. The index lives in its own
+table keyed by post id, is created by a migration, filled by the
+rebuild_search_index command and updated per post by model signals (see
+core/signals.py). Other databases have no index and fall back to
+icontains matching.
+"""
+
+import html
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.html import escape, strip_tags
+
+from .models import BlogPost
+
+
+INDEX_TABLE = 'core_blogpost_search'
+
+# Snippet highlight markers, swapped for <mark> after the text is escaped
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+MAX_QUERY_LENGTH = 200
+WORD = re.compile(r'\w+')
+
+
+def document_text(post):
+    """Plain text of a post body: HTML tags stripped and entities decoded."""
+    return html.unescape(strip_tags(post.content))
+
+
+def render_snippet(snippet):
+    """Escape a snippet and turn the highlight markers into <mark> tags."""
+    return escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+class PostgresIndex:
+    """Weighted tsvector (title A, excerpt B, body C) with a GIN index."""
+
+    def create(self, cursor):
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {INDEX_TABLE} ('
+            f' post_id bigint PRIMARY KEY REFERENCES core_blogpost (id) ON DELETE CASCADE,'
+            f' body text NOT NULL,'
+            f' document tsvector NOT NULL)'
+        )
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {INDEX_TABLE}_gin ON {INDEX_TABLE} USING GIN (document)'
+        )
+
+    def drop(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {INDEX_TABLE}')
+
+    def upsert(self, cursor, post):
+        body = document_text(post)
+        cursor.execute(
+            f'INSERT INTO {INDEX_TABLE} (post_id, body, document) VALUES (%s, %s,'
+            f" setweight(to_tsvector('english', %s), 'A') ||"
+            f" setweight(to_tsvector('english', %s), 'B') ||"
+            f" setweight(to_tsvector('english', %s), 'C'))"
+            f' ON CONFLICT (post_id) DO UPDATE SET body = EXCLUDED.body, document = EXCLUDED.document',
+            [post.pk, body, post.title, post.excerpt, body],
+        )
+
+    def delete(self, cursor, post_id):
+        cursor.execute(f'DELETE FROM {INDEX_TABLE} WHERE post_id = %s', [post_id])
+
+    def query(self, cursor, text, limit, include_unpublished):
+        cursor.execute(
+            f'SELECT s.post_id, ts_headline(%s, s.body, q, %s)'
+            f' FROM {INDEX_TABLE} s'
+            f' JOIN core_blogpost p ON p.id = s.post_id,'
+            f" websearch_to_tsquery('english', %s) q"
+            f' WHERE s.document @@ q AND (p.is_published OR %s)'
+            f' ORDER BY ts_rank(s.document, q) DESC, p.published_at DESC'
+            f' LIMIT %s',
+            [
+                'english',
+                f'StartSel={MARK_START}, StopSel={MARK_END}, MaxFragments=2, MaxWords=30, MinWords=10',
+                text, include_unpublished, limit,
+            ],
+        )
+        return cursor.fetchall()
+
+
+class SQLiteIndex:
+    """FTS5 table (title, excerpt, body) ranked by BM25, title weighted highest."""
+
+    def create(self, cursor):
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE}'
+            f" USING fts5(title, excerpt, body, tokenize='porter unicode61')"
+        )
+
+    def drop(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {INDEX_TABLE}')
+
+    def upsert(self, cursor, post):
+        self.delete(cursor, post.pk)
+        cursor.execute(
+            f'INSERT INTO {INDEX_TABLE} (rowid, title, excerpt, body) VALUES (%s, %s, %s, %s)',
+            [post.pk, post.title, post.excerpt, document_text(post)],
+        )
+
+    def delete(self, cursor, post_id):
+        cursor.execute(f'DELETE FROM {INDEX_TABLE} WHERE rowid = %s', [post_id])
+
+    def query(self, cursor, text, limit, include_unpublished):
+        # Quote every word so user input cannot use FTS5 query syntax. The last
+        # word may still be being typed, so it also matches as a prefix.
+        words = WORD.findall(text)
+        if not words:
+            return []
+        *complete, last = [f'"{word}"' for word in words]
+        match = ' AND '.join(complete + [f'({last} OR {last}*)'])
+        cursor.execute(
+            f'SELECT {INDEX_TABLE}.rowid, snippet({INDEX_TABLE}, -1, %s, %s, %s, 24)'
+            f' FROM {INDEX_TABLE}'
+            f' JOIN core_blogpost p ON p.id = {INDEX_TABLE}.rowid'
+            f' WHERE {INDEX_TABLE} MATCH %s AND (p.is_published OR %s)'
+            f' ORDER BY bm25({INDEX_TABLE}, 10.0, 4.0, 1.0), p.published_at DESC'
+            f' LIMIT %s',
+            [MARK_START, MARK_END, '…', match, include_unpublished, limit],
+        )
+        return cursor.fetchall()
+
+
+BACKENDS = {
+    'postgresql': PostgresIndex,
+    'sqlite': SQLiteIndex,
+}
+
+
+def get_index(db=connection):
+    """Return the index for a database connection, or None if its database has none."""
+    backend = BACKENDS.get(db.vendor)
+    return backend() if backend else None
+
+
+def create_index(apps, schema_editor):
+    """Migration operation: create the index table (nothing on other databases)."""
+    index = get_index(schema_editor.connection)
+    if index is not None:
+        with schema_editor.connection.cursor() as cursor:
+            index.create(cursor)
+
+
+def drop_index(apps, schema_editor):
+    """Reverse of create_index."""
+    index = get_index(schema_editor.connection)
+    if index is not None:
+        with schema_editor.connection.cursor() as cursor:
+            index.drop(cursor)
+
+
+def index_post(post_id):
+    """Add, update or remove one post in the index."""
+    index = get_index()
+    if index is None:
+        return
+    post = BlogPost.objects.filter(pk=post_id).first()
+    with connection.cursor() as cursor:
+        if post is None:
+            index.delete(cursor, post_id)
+        else:
+            index.upsert(cursor, post)
+
+
+def rebuild():
+    """
+    Index every post from scratch. Returns the number of posts indexed,
+    or None if the database has no index.
+    """
+    index = get_index()
+    if index is None:
+        return None
+    count = 0
+    # One transaction, so searches never see a half-built index
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {INDEX_TABLE}')
+        for post in BlogPost.objects.order_by('pk').iterator(chunk_size=500):
+            index.upsert(cursor, post)
+            count += 1
+    return count
+
+
+def search(text, limit=20, include_unpublished=False):
+    """
+    Ranked search over titles, excerpts and bodies.
+    Returns [(post, snippet_html)], best match first; only published posts
+    unless include_unpublished.
+    """
+    text = text.strip()[:MAX_QUERY_LENGTH]
+    if not text:
+        return []
+
+    index = get_index()
+    if index is None:
+        return contains_search(text, limit, include_unpublished)
+    with connection.cursor() as cursor:
+        rows = index.query(cursor, text, limit, include_unpublished)
+
+    posts = BlogPost.objects.select_related('author').defer('content').in_bulk([pk for pk, _ in rows])
+    return [(posts[pk], render_snippet(snippet)) for pk, snippet in rows if pk in posts]
+
+
+def contains_search(text, limit=20, include_unpublished=False):
+    """
+    Fallback for databases without a full-text index: posts whose title,
+    excerpt or body contains the text, newest first, with the excerpt as
+    the snippet.
+    """
+    posts = BlogPost.objects.select_related('author').defer('content').filter(
+        Q(title__icontains=text) | Q(excerpt__icontains=text) | Q(content__icontains=text)
+    )
+    if not include_unpublished:
+        posts = posts.filter(is_published=True)
+    return [(post, escape(post.excerpt)) for post in posts.order_by('-published_at')[:limit]]
@@ -0,0 +1,98 @@
+"""
+FairPayCheck Signal Handlers
+Invalidate cached pages (core/pagecache.py), regenerate the sitemap files
+(core/sitemaps.py) and update the search index (core/search.py) when blog
+content changes.
+"""
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import pagecache
+from . import search
+from . import sitemaps
+from .models import Author, BlogPost
+
+
+def blog_post_page_keys(slug, author_slug):
+    """Pages that show a post: its own page, the blog list and its author's page."""
+    keys = [pagecache.blog_post_key(slug), pagecache.blog_list_key()]
+    if author_slug:
+        keys.append(pagecache.author_key(author_slug))
+    return keys
+
+
+def invalidate_on_commit(keys):
+    """Drop pages once the change is committed, so they cannot be re-cached from the old rows."""
+    transaction.on_commit(partial(pagecache.invalidate, keys))
+
+
+def _saved_state(sender, instance, fields):
+    """Field values of instance as currently stored, or None if it is new."""
+    if instance.pk is None:
+        return None
+    return sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver(pre_save, sender=BlogPost)
+def remember_blog_post_pages(sender, instance, raw=False, **kwargs):
+    # A changed slug or author leaves the old pages to invalidate as well
+    if not raw:
+        instance._stale_pages = _saved_state(sender, instance, ('slug', 'author__slug'))
+
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+def invalidate_blog_post_pages(sender, instance, **kwargs):
+    # Query the slug rather than instance.author: in a cascade the author row may be gone
+    author_slug = Author.objects.filter(pk=instance.author_id).values_list('slug', flat=True).first()
+    keys = set(blog_post_page_keys(instance.slug, author_slug))
+    previous = getattr(instance, '_stale_pages', None)
+    if previous:
+        keys.update(blog_post_page_keys(previous['slug'], previous['author__slug']))
+        instance._stale_pages = None
+    invalidate_on_commit(keys)
+
+
+@receiver(pre_save, sender=Author)
+def remember_author_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._stale_pages = _saved_state(sender, instance, ('slug',))
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def invalidate_author_pages(sender, instance, **kwargs):
+    # The author's name appears on the blog list and on each of their posts
+    keys = {pagecache.author_key(instance.slug), pagecache.blog_list_key()}
+    previous = getattr(instance, '_stale_pages', None)
+    if previous:
+        keys.add(pagecache.author_key(previous['slug']))
+        instance._stale_pages = None
+    keys.update(
+        pagecache.blog_post_key(slug)
+        for slug in BlogPost.objects.filter(author=instance).values_list('slug', flat=True)
+    )
+    invalidate_on_commit(keys)
+
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+def update_sitemap_for_post(sender, instance, **kwargs):
+    # Rewrites only the sitemap part holding this post; failures are logged, not raised
+    transaction.on_commit(partial(sitemaps.write_sitemaps, [instance.pk]), robust=True)
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def update_sitemap_for_author(sender, instance, **kwargs):
+    transaction.on_commit(partial(sitemaps.write_sitemaps, []), robust=True)
+
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+def update_search_index(sender, instance, **kwargs):
+    transaction.on_commit(partial(search.index_post, instance.pk), robust=True)
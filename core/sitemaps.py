@@ -0,0 +1,217 @@
+"""
+FairPayCheck Sitemaps
+Writes sitemap.xml (plus gzip-compressed parts once the URL count passes
+the 50,000-per-file limit) to disk, streaming rows from the database, so
+crawler hits are served from files.
+
+Layout in SITEMAP_DIR:
+    sitemap.xml, sitemap.xml.gz   the root: a <urlset> with every URL, or a
+                                  <sitemapindex> listing the parts below
+    sitemap-pages.xml.gz          static pages and authors
+    sitemap-posts-<n>.xml.gz      posts with id in [n * MAX, (n + 1) * MAX)
+
+Parts cover fixed id ranges, so publishing a post rewrites only its part
+and the index.
+"""
+
+import gzip
+import os
+import re
+import tempfile
+from contextlib import ExitStack
+from itertools import chain
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .models import Author, BlogPost
+
+
+SITEMAP_MAX_URLS = 50000
+SITEMAP_ROOT = 'sitemap.xml'
+PAGES_PART = 'sitemap-pages.xml.gz'
+PART_NAME = re.compile(r'^sitemap-(pages|posts-\d+)\.xml\.gz$')
+
+URLSET_OPEN = '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+URLSET_CLOSE = '</urlset>\n'
+INDEX_OPEN = '<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+INDEX_CLOSE = '</sitemapindex>\n'
+
+# (path, lastmod, changefreq, priority)
+STATIC_PAGES = (
+    ('/', '2025-12-25', 'monthly', '1.0'),
+    ('/blog/', None, 'weekly', '0.8'),
+)
+
+
+def sitemap_dir():
+    return getattr(settings, 'SITEMAP_DIR', None) or os.path.join(settings.BASE_DIR, 'sitemaps')
+
+
+def site_url():
+    return getattr(settings, 'SITE_URL', 'https://fairpaycheck.com')
+
+
+def post_part_name(number):
+    return f'sitemap-posts-{number}.xml.gz'
+
+
+def published_posts():
+    return BlogPost.objects.filter(is_published=True)
+
+
+def url_entry(loc, lastmod=None, changefreq=None, priority=None):
+    parts = [f'    <url>\n        <loc>{escape(loc)}</loc>\n']
+    if lastmod:
+        parts.append(f'        <lastmod>{lastmod}</lastmod>\n')
+    if changefreq:
+        parts.append(f'        <changefreq>{changefreq}</changefreq>\n')
+    if priority:
+        parts.append(f'        <priority>{priority}</priority>\n')
+    parts.append('    </url>\n')
+    return ''.join(parts)
+
+
+def page_entries():
+    """Static pages and author profiles."""
+    base = site_url()
+    for path, lastmod, changefreq, priority in STATIC_PAGES:
+        yield url_entry(base + path, lastmod, changefreq, priority)
+    for slug in Author.objects.order_by('pk').values_list('slug', flat=True).iterator(chunk_size=2000):
+        yield url_entry(f'{base}/author/{slug}/', None, 'monthly', '0.6')
+
+
+def post_entries(posts):
+    """Blog posts, read with a server-side cursor where the database supports it."""
+    base = site_url()
+    rows = posts.order_by('pk').values_list('slug', 'published_at').iterator(chunk_size=2000)
+    for slug, published_at in rows:
+        yield url_entry(f'{base}/blog/{slug}/', f'{timezone.localtime(published_at):%Y-%m-%d}', 'monthly', '0.7')
+
+
+def _write_atomic(directory, outputs, chunks):
+    """
+    Stream chunks of text into each (name, compress) output. Files are
+    written alongside and renamed into place, so readers never see a
+    partial file.
+    """
+    written = []
+    try:
+        with ExitStack() as stack:
+            files = []
+            for name, compress in outputs:
+                fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+                written.append((tmp_path, name))
+                f = stack.enter_context(os.fdopen(fd, 'wb'))
+                if compress:
+                    f = stack.enter_context(gzip.GzipFile(filename='', mode='wb', fileobj=f, mtime=0))
+                files.append(f)
+            for chunk in chunks:
+                data = chunk.encode()
+                for f in files:
+                    f.write(data)
+        for tmp_path, name in written:
+            os.replace(tmp_path, os.path.join(directory, name))
+    except BaseException:
+        for tmp_path, _ in written:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        raise
+
+
+def _wrap(open_tag, entries, close_tag):
+    yield open_tag
+    yield from entries
+    yield close_tag
+
+
+# The root is written plain and gzip-compressed, and served by content negotiation
+ROOT_OUTPUTS = ((SITEMAP_ROOT + '.gz', True), (SITEMAP_ROOT, False))
+
+
+def _part_lastmods():
+    """{part number: latest updated_at} for every id range holding a published post."""
+    rows = (
+        published_posts()
+        .annotate(part=F('pk') / SITEMAP_MAX_URLS)
+        .values('part')
+        .annotate(lastmod=Max('updated_at'))
+        .order_by('part')
+    )
+    return {row['part']: row['lastmod'] for row in rows}
+
+
+def _existing_parts(directory):
+    return {name for name in os.listdir(directory) if PART_NAME.match(name)}
+
+
+def write_sitemaps(post_ids=None):
+    """
+    Regenerate the sitemap files.
+    With post_ids (incremental update), only the parts holding those posts
+    and the pages part are rewritten when the sitemap is already split;
+    pass an empty list after author changes. Returns the number of URLs.
+    """
+    directory = sitemap_dir()
+    os.makedirs(directory, exist_ok=True)
+
+    authors = Author.objects.count()
+    posts = published_posts().count()
+    total = len(STATIC_PAGES) + authors + posts
+
+    if total <= SITEMAP_MAX_URLS:
+        # Everything fits in one <urlset>
+        entries = chain(page_entries(), post_entries(published_posts()))
+        _write_atomic(directory, ROOT_OUTPUTS, _wrap(URLSET_OPEN, entries, URLSET_CLOSE))
+        for name in _existing_parts(directory):
+            os.unlink(os.path.join(directory, name))
+        return total
+
+    existing = _existing_parts(directory)
+    lastmods = _part_lastmods()
+    if post_ids is None or PAGES_PART not in existing:
+        numbers = set(lastmods)
+    else:
+        numbers = {post_id // SITEMAP_MAX_URLS for post_id in post_ids} & set(lastmods)
+
+    _write_atomic(directory, [(PAGES_PART, True)], _wrap(URLSET_OPEN, page_entries(), URLSET_CLOSE))
+    for number in sorted(numbers):
+        start = number * SITEMAP_MAX_URLS
+        part_posts = published_posts().filter(pk__gte=start, pk__lt=start + SITEMAP_MAX_URLS)
+        _write_atomic(
+            directory, [(post_part_name(number), True)],
+            _wrap(URLSET_OPEN, post_entries(part_posts), URLSET_CLOSE)
+        )
+
+    base = site_url()
+    index = [f'    <sitemap>\n        <loc>{base}/{PAGES_PART}</loc>\n    </sitemap>\n']
+    for number, lastmod in lastmods.items():
+        index.append(
+            f'    <sitemap>\n        <loc>{base}/{post_part_name(number)}</loc>\n'
+            f'        <lastmod>{timezone.localtime(lastmod):%Y-%m-%d}</lastmod>\n    </sitemap>\n'
+        )
+    _write_atomic(directory, ROOT_OUTPUTS, _wrap(INDEX_OPEN, index, INDEX_CLOSE))
+
+    # Ranges whose posts were all deleted or unpublished
+    current = {PAGES_PART} | {post_part_name(number) for number in lastmods}
+    for name in existing - current:
+        os.unlink(os.path.join(directory, name))
+    return total
+
+
+def root_path(compressed):
+    """Path of the root sitemap file, generating the files if they do not exist yet."""
+    path = os.path.join(sitemap_dir(), SITEMAP_ROOT + ('.gz' if compressed else ''))
+    if not os.path.exists(path):
+        write_sitemaps()
+    return path
+
+
+def part_path(name):
+    """Path of a sitemap part file, or None for an unknown name."""
+    if not PART_NAME.match(name):
+        return None
+    path = os.path.join(sitemap_dir(), name)
+    return path if os.path.exists(path) else None
@@ -0,0 +1,204 @@
+"""
+FairPayCheck Market Data Snapshots
+Versioned, hot-reloadable market data. core/data.py provides the built-in
+snapshot; newer versions are loaded from JSON snapshot files on disk.
+Every worker process loads and holds its own copy of the tables (they
+are a few kilobytes, so they are not shared between processes).
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from operator import attrgetter
+
+from . import data as builtin_data
+
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+# Every upper-case constant in core/data.py is a market data table
+TABLE_NAMES = tuple(name for name in vars(builtin_data) if name.isupper() and name != 'DATA_VERSION')
+
+
+class MarketData:
+    """
+    One immutable version of the market data tables.
+    Tables are exposed as attributes with the same names as in core/data.py.
+    """
+
+    def __init__(self, version, tables, source=None):
+        self.__dict__.update(tables)
+        self.DATA_VERSION = version
+        self.source = source
+        self._snapshot = self  # see _MarketDataProxy
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def derived(self, name, builder):
+        """
+        Return a structure computed from this snapshot's tables (matchers,
+        lookup tables), building it on first use. The builder runs with this
+        snapshot pinned so it reads only from it.
+        """
+        value = self._derived.get(name)
+        if value is None:
+            with self._lock:
+                value = self._derived.get(name)
+                if value is None:
+                    with pinned(self):
+                        value = builder()
+                    self._derived[name] = value
+        return value
+
+    def __repr__(self):
+        return f'<MarketData {self.DATA_VERSION} from {self.source or "core.data"}>'
+
+
+def builtin_snapshot():
+    """Build a snapshot from the constants in core/data.py."""
+    tables = {name: getattr(builtin_data, name) for name in TABLE_NAMES}
+    return MarketData(builtin_data.DATA_VERSION, tables)
+
+
+def load_snapshot(path):
+    """
+    Load a snapshot file into a new MarketData owned by this process.
+    Raises ValueError if the file is not a valid snapshot or is missing
+    any table.
+    """
+    with open(path, 'rb') as f:
+        payload = json.load(f)
+
+    if not isinstance(payload, dict) or payload.get('format') != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f'{path}: unsupported snapshot format')
+
+    tables = payload.get('tables', {})
+    missing = [name for name in TABLE_NAMES if name not in tables]
+    if missing or not payload.get('data_version'):
+        raise ValueError(f'{path}: missing tables: {", ".join(missing) or "data_version"}')
+
+    tables = {name: tables[name] for name in TABLE_NAMES}
+    # JSON has no tuples; restore the (min, max) year ranges
+    tables['EXPERIENCE_LEVELS'] = {
+        level: tuple(bounds) for level, bounds in tables['EXPERIENCE_LEVELS'].items()
+    }
+    return MarketData(payload['data_version'], tables, source=str(path))
+
+
+def write_snapshot(path, snapshot):
+    """
+    Write a snapshot file atomically: the new file is written alongside
+    and renamed into place, so readers never see a partial file.
+    """
+    payload = {
+        'format': SNAPSHOT_FORMAT_VERSION,
+        'data_version': snapshot.DATA_VERSION,
+        'tables': {name: getattr(snapshot, name) for name in TABLE_NAMES},
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+# The active snapshot, and the snapshot pinned for the current request (if any)
+_active = builtin_snapshot()
+_pinned = ContextVar('market_data_snapshot', default=None)
+
+
+def current():
+    """Return the snapshot in effect for the current context."""
+    return _pinned.get() or _active
+
+
+def activate(snapshot):
+    """Make snapshot the active one. Requests already pinned keep their snapshot."""
+    global _active
+    _active = snapshot
+    market_data._snapshot = snapshot
+
+
+@contextmanager
+def pinned(snapshot=None):
+    """Pin a snapshot (default: the active one) for the duration of the block."""
+    token = _pinned.set(snapshot or _active)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class _MarketDataProxy:
+    """
+    Module-like view of the current snapshot: market_data.CMI resolves to
+    the CMI table of the snapshot pinned for this request, or the active one.
+
+    This sits on the hot path of every score, so attribute access is built
+    from C-level callables rather than a Python __getattr__. `_current` is
+    the pinned snapshot, or the proxy itself when nothing is pinned, and
+    `_snapshot` is the snapshot an object stands for (the proxy's own
+    follows activate()).
+    """
+
+    __slots__ = ('_snapshot',)
+
+    _current = property(_pinned.get)
+
+
+for _name in TABLE_NAMES + ('DATA_VERSION', 'derived'):
+    setattr(_MarketDataProxy, _name, property(attrgetter(f'_current._snapshot.{_name}')))
+del _name
+
+market_data = _MarketDataProxy()
+market_data._snapshot = _active
+
+
+class SnapshotWatcher:
+    """
+    Watches a snapshot file and activates new versions as they appear.
+    The file is stat()ed at most once per `interval` seconds.
+    """
+
+    def __init__(self, path, interval=30):
+        self.path = path
+        self.interval = interval
+        self._signature = None
+        self._next_check = 0
+        self._lock = threading.Lock()
+
+    def check(self):
+        """Load and activate the snapshot file if it changed since the last check."""
+        now = time.monotonic()
+        if now < self._next_check or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._next_check = now + self.interval
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                return
+
+            signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if signature == self._signature:
+                return
+
+            try:
+                snapshot = load_snapshot(self.path)
+            except (OSError, ValueError) as e:
+                # Keep serving the current snapshot
+                print(f"Market data snapshot error for {self.path}: {e}")
+                return
+
+            self._signature = signature
+            activate(snapshot)
+        finally:
+            self._lock.release()
@@ -0,0 +1,224 @@
+"""
+FairPayCheck Static Files
+In-process static file serving for single-container deployments: small
+assets are held in a bounded in-memory cache, larger ones are streamed
+from disk (with FileResponse under WSGI, so sendfile through
+wsgi.file_wrapper where the server provides it, and with an async
+iterator under ASGI). Pre-compressed variants (.br / .gz files, or gzip
+built in memory for small text assets) are negotiated with Accept-Encoding.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .cache import LRUCache
+
+
+# Files up to this size are kept in memory
+MEMORY_MAX_BYTES = 256 * 1024
+# Loaded files (bodies included) held at most
+CACHE_MAX_ENTRIES = 1024
+CACHE_MAX_BYTES = 32 * 1024 * 1024
+CACHE_TTL = 24 * 3600  # seconds
+# Read size when streaming a large file under ASGI
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Names with a content hash (as written by ManifestStaticFilesStorage) never change
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+STATIC_CACHE_CONTROL = 'public, max-age=86400'
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'application/manifest+json', 'image/svg+xml', 'image/x-icon', 'image/vnd.microsoft.icon')
+# (Accept-Encoding token, file suffix), in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class StaticFile:
+    """One servable file (or encoded variant) with its response headers."""
+
+    __slots__ = ('path', 'size', 'mtime', 'content_type', 'etag', 'body', 'encoding', 'variants', 'cache_control')
+
+    def __init__(self, path, stat, content_type, cache_control, encoding=None, body=None):
+        self.path = path
+        self.size = stat.st_size if body is None else len(body)
+        self.mtime = stat.st_mtime
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.encoding = encoding
+        self.variants = {}
+
+        if body is None and stat.st_size <= MEMORY_MAX_BYTES:
+            with open(path, 'rb') as f:
+                body = f.read()
+        self.body = body
+        if body is not None:
+            self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        else:
+            self.etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}{"-" + encoding if encoding else ""}"'
+
+    def response(self, asynchronous=False):
+        """
+        Response with the file's headers. Large files are streamed; pass
+        asynchronous=True under ASGI, where a sync file iterator would be
+        read into memory before it is sent.
+        """
+        if self.body is not None:
+            response = HttpResponse(self.body, content_type=self.content_type)
+        elif asynchronous:
+            response = StreamingHttpResponse(read_chunks(self.path), content_type=self.content_type)
+        else:
+            response = FileResponse(open(self.path, 'rb'), content_type=self.content_type)
+        response['Content-Length'] = str(self.size)
+        response['ETag'] = self.etag
+        response['Last-Modified'] = http_date(self.mtime)
+        response['Cache-Control'] = self.cache_control
+        if self.encoding:
+            response['Content-Encoding'] = self.encoding
+        return response
+
+
+async def read_chunks(path):
+    """Async iterator over a file's contents, read in a worker thread."""
+    read = sync_to_async(lambda f: f.read(STREAM_CHUNK_SIZE), thread_sensitive=False)
+    f = await sync_to_async(open, thread_sensitive=False)(path, 'rb')
+    try:
+        while chunk := await read(f):
+            yield chunk
+    finally:
+        f.close()
+
+
+def is_normalized(name):
+    """Whether a static name is in its one canonical form (no '.', '..', '//' or leading '/')."""
+    return (
+        bool(name) and '\\' not in name and not name.startswith('/')
+        and '..' not in name.split('/') and posixpath.normpath(name) == name
+    )
+
+
+class StaticFiles:
+    """
+    Resolves URL paths under STATIC_URL to files in the given roots and
+    caches the loaded files, up to CACHE_MAX_BYTES. Only normalized names
+    are served, so each file has one cache entry. With `autorefresh`
+    (DEBUG), files are re-checked on every request so edits show up
+    without a restart.
+    """
+
+    def __init__(self, roots, autorefresh=False):
+        self.roots = [os.path.realpath(root) for root in roots if root]
+        self.autorefresh = autorefresh
+        self._files = LRUCache(CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, CACHE_TTL)
+
+    def find(self, name):
+        """Return the file path for a static name, or None (also for names escaping the roots)."""
+        if not is_normalized(name):
+            return None
+        for root in self.roots:
+            path = os.path.realpath(os.path.join(root, name))
+            if path.startswith(root + os.sep) and os.path.isfile(path):
+                return path
+        return None
+
+    def load(self, name):
+        path = self.find(name)
+        if path is None:
+            return None
+        stat = os.stat(path)
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        cache_control = IMMUTABLE_CACHE_CONTROL if HASHED_NAME.search(name) else STATIC_CACHE_CONTROL
+
+        static_file = StaticFile(path, stat, content_type, cache_control)
+        for encoding, suffix in ENCODINGS:
+            if os.path.isfile(path + suffix):
+                static_file.variants[encoding] = StaticFile(
+                    path + suffix, os.stat(path + suffix), content_type, cache_control, encoding
+                )
+
+        # Compress small text assets in memory when no gzip file was shipped
+        compressible = content_type.startswith(COMPRESSIBLE_TYPES)
+        if compressible and static_file.body is not None and 'gzip' not in static_file.variants:
+            compressed = gzip.compress(static_file.body, compresslevel=9, mtime=0)
+            if len(compressed) < len(static_file.body) * 0.9:
+                static_file.variants['gzip'] = StaticFile(
+                    path, stat, content_type, cache_control, 'gzip', compressed
+                )
+        return static_file
+
+    def get(self, name):
+        """Return the StaticFile for a name, loading it on first use, or None if there is none."""
+        if not is_normalized(name):
+            return None
+        static_file = self._files.get(name, None)
+        if static_file is not None and self.autorefresh:
+            try:
+                stale = os.stat(static_file.path).st_mtime != static_file.mtime
+            except OSError:
+                stale = True
+            if stale:
+                static_file = None
+        if static_file is None:
+            static_file = self.load(name)
+            if static_file is not None:
+                self._files.set(name, static_file, None)
+        return static_file
+
+    def stats(self):
+        """Counters of the loaded file cache (see LRUCache.stats)."""
+        return self._files.stats()
+
+    def serve(self, request, name, asynchronous=False):
+        """Response for a static name, or None if there is no such file (see StaticFile.response)."""
+        static_file = self.get(name)
+        if static_file is None:
+            return None
+
+        selected = static_file
+        if static_file.variants:
+            accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+            for encoding, _ in ENCODINGS:
+                variant = static_file.variants.get(encoding)
+                if variant is not None and re.search(rf'\b{encoding}\b', accept_encoding):
+                    selected = variant
+                    break
+
+        response = selected.response(asynchronous)
+        if static_file.variants:
+            response['Vary'] = 'Accept-Encoding'
+        if request.method not in ('GET', 'HEAD'):
+            return response
+        return get_conditional_response(
+            request, etag=selected.etag, last_modified=int(selected.mtime), response=response
+        )
+
+
+_static_files = None
+
+
+def get_static_files():
+    """
+    The shared StaticFiles: collected files in STATIC_ROOT first, or the
+    source STATICFILES_DIRS first under DEBUG so edits show up directly.
+    """
+    global _static_files
+    if _static_files is None:
+        roots = [settings.STATIC_ROOT]
+        source_dirs = list(getattr(settings, 'STATICFILES_DIRS', []))
+        roots = source_dirs + roots if settings.DEBUG else roots + source_dirs
+        _static_files = StaticFiles(roots, autorefresh=settings.DEBUG)
+    return _static_files
+
+
+def serve(request, name, asynchronous=False):
+    """Serve one static file by name (relative to STATIC_URL); None if not found."""
+    return get_static_files().serve(request, name, asynchronous)
@@ -1,3 +1,1354 @@
-from django.test import TestCase
+import copy
+import gzip
+import json
+import os
+import re
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import resolve
+from django.utils import timezone
+
+from core import (
+    benchmarks, bulk, data, geoip, pagecache, ratelimit, scoring, search, sitemaps, snapshots, staticserve,
+    tracking, useragents,
+)
+from core.cache import LRUCache, estimate_size
+from core.matching import KeywordMatcher, SubstringIndex
+from core.models import Author, BlogPost, PageView, VisitorLog
+from core.ratelimit import (
+    BUCKET_WAYS, CacheLimiter, SharedMemoryLimiter, SlidingWindowLimiter, shared_table_path,
+)
+from core.schema import MAX_SALARY, canonical_query, decode_score_inputs
+from core.snapshots import market_data as data_proxy
+from core.tracking import PageViewEvent, VisitorTracker, write_events
+from core.views import BATCH_MAX_PROFILES, decode_cursor, encode_cursor
+
+
+SCORE_PAYLOAD = {
+    'job_title': 'Software Engineer',
+    'country': 'USA',
+    'industry': 'technology',
+    'years_experience': 5,
+    'company_size': 'small',
+}
+SCORE_QUERY = (
+    'company_size=small&country=USA&industry=technology'
+    '&job_title=Software+Engineer&years_experience=5'
+)
+
+# API tests share one client IP; each test gets its own rate limiter so the suite stays under the limit
+fresh_rate_limiter = mock.patch.object(ratelimit, '_limiter', None)
+
+
+@fresh_rate_limiter
+@mock.patch.object(VisitorTracker, 'put')
+class SharedCacheResponseTests(TestCase):
+    """Responses that shared caches may store must not start a session."""
+
+    def test_score_get_sets_no_cookie(self, put):
+        response = self.client.get(f'/api/calculate/?{SCORE_QUERY}')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertNotIn('Set-Cookie', response.headers)
+        self.assertNotIn('sessionid', response.cookies)
+        self.assertNotIn('Cookie', response.get('Vary', ''))
+        # The hit is still tracked, without a session
+        put.assert_called_once()
+        self.assertIsNone(put.call_args.args[0].page_view_fields['session_key'])
+
+    def test_score_get_redirect_is_not_shared(self, put):
+        # The canonical query sorts the parameters
+        unsorted = '&'.join(reversed(SCORE_QUERY.split('&')))
+        response = self.client.get(f'/api/calculate/?{unsorted}')
+
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response['Location'], f'/api/calculate/?{SCORE_QUERY}')
+        self.assertNotIn('public', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_homepage_sets_no_cookie(self, put):
+        response = self.client.get('/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertNotIn('Set-Cookie', response.headers)
+        self.assertNotIn('Cookie', response.get('Vary', ''))
+        put.assert_called_once()
+
+    def test_uncacheable_page_starts_session(self, put):
+        response = self.client.get('/blog/no-such-post/')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('public', response.get('Cache-Control', ''))
+        self.assertIn('sessionid', response.cookies)
+        self.assertEqual(
+            put.call_args.args[0].page_view_fields['session_key'], response.cookies['sessionid'].value
+        )
+
+
+@fresh_rate_limiter
+@mock.patch.object(VisitorTracker, 'put')
+class RuntimeStatsViewTests(TestCase):
+    def test_staff_only(self, put):
+        response = self.client.get('/admin/runtime-stats/')
+        self.assertEqual(response.status_code, 302)
+
+    def test_reports_rate_limiter(self, put):
+        staff = User.objects.create_user('staff', password='password', is_staff=True)
+        self.client.force_login(staff)
+        before = self.client.get('/admin/runtime-stats/').json()['ratelimit']['allowed']
+        self.client.get(f'/api/calculate/?{SCORE_QUERY}')
+
+        response = self.client.get('/admin/runtime-stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, no-store')
+        stats = response.json()
+        self.assertEqual(stats['ratelimit']['allowed'], before + 1)
+        self.assertIn('hit_rate', stats['useragents'])
+
+    def test_reports_result_cache_and_tracking(self, put):
+        staff = User.objects.create_user('staff', password='password', is_staff=True)
+        self.client.force_login(staff)
+        self.client.post('/api/calculate/', SCORE_PAYLOAD, content_type='application/json')
+        self.client.post('/api/calculate/', SCORE_PAYLOAD, content_type='application/json')
+
+        stats = self.client.get('/admin/runtime-stats/').json()
+        self.assertEqual(stats['result_cache'], scoring.result_cache.stats())
+        self.assertGreaterEqual(stats['result_cache']['hits'], 1)
+        self.assertEqual(stats['tracking'], tracking.stats())
+        self.assertIn('dropped', stats['tracking'])
+        self.assertIs(tracking.get_tracker(), tracking.get_tracker())
+
+
+@fresh_rate_limiter
+@mock.patch.object(VisitorTracker, 'put')
+class ScoreViewRoutingTests(TestCase):
+    """WSGI keeps the sync score view; the ASGI URLconf routes to the async one."""
+
+    def test_wsgi_view_is_sync(self, put):
+        self.assertFalse(iscoroutinefunction(resolve('/api/calculate/').func))
+        response = self.client.post('/api/calculate/', SCORE_PAYLOAD, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(ROOT_URLCONF='fairpaycheck.asgi_urls')
+    async def test_asgi_view_is_async(self, put):
+        self.assertTrue(iscoroutinefunction(resolve('/api/calculate/').func))
+        response = await self.async_client.post('/api/calculate/', SCORE_PAYLOAD, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('score', response.json())
+        # Everything else resolves as in the main URLconf
+        self.assertEqual(resolve('/blog/').url_name, 'blog_list')
+
+    def test_asgi_handler_uses_asgi_urls(self, put):
+        from fairpaycheck.asgi import ASGI_URLCONF, application
+        request, error = application.create_request(
+            {'type': 'http', 'method': 'GET', 'path': '/', 'query_string': b'', 'headers': []}, None
+        )
+        self.assertIsNone(error)
+        self.assertEqual(request.urlconf, ASGI_URLCONF)
+
+
+@fresh_rate_limiter
+@mock.patch.object(VisitorTracker, 'put')
+@mock.patch.object(bulk, 'BULK_CHUNK_SIZE', 5)
+class BulkStreamingTests(TestCase):
+    """Bulk results are sent chunk by chunk, never collected first."""
+
+    ROWS = 12
+    BODY = ''.join(json.dumps(SCORE_PAYLOAD) + '\n' for _ in range(ROWS - 1)) + '{"country": "USA"}\n'
+
+    def post(self, client):
+        return client.post('/api/calculate/bulk/', self.BODY, content_type='application/x-ndjson')
+
+    def check_lines(self, chunks):
+        lines = [json.loads(line) for line in b''.join(chunks).splitlines()]
+        self.assertEqual([line['row'] for line in lines], list(range(1, self.ROWS + 1)))
+        self.assertIn('score', lines[0]['result'])
+        self.assertIn('job_title', lines[-1]['errors'])
+
+    def test_wsgi_stream(self, put):
+        with mock.patch.object(bulk, '_score_chunk', wraps=bulk._score_chunk) as score_chunk:
+            response = self.post(self.client)
+            self.assertFalse(response.is_async)
+            content = iter(response.streaming_content)
+            chunks = [next(content)]
+            self.assertEqual(score_chunk.call_count, 1)
+            chunks += list(content)
+        self.assertEqual(len(chunks), 3)
+        self.check_lines(chunks)
+
+    async def test_asgi_stream(self, put):
+        with mock.patch.object(bulk, '_score_chunk', wraps=bulk._score_chunk) as score_chunk:
+            response = await self.post(self.async_client)
+            self.assertTrue(response.is_async)
+            content = aiter(response.streaming_content)
+            chunks = [await anext(content)]
+            # Only the first chunk has been scored when it is sent
+            self.assertEqual(score_chunk.call_count, 1)
+            chunks += [chunk async for chunk in content]
+        self.assertEqual(len(chunks), 3)
+        self.check_lines(chunks)
+
+
+class ScoreSchemaTests(SimpleTestCase):
+    def decode(self, **fields):
+        return decode_score_inputs({**SCORE_PAYLOAD, **fields})
+
+    def test_whole_number_strings(self):
+        inputs, errors = self.decode(years_experience=' 7 ')
+        self.assertIsNone(errors)
+        self.assertEqual(inputs.years_experience, 7)
+
+        inputs, errors = self.decode(years_experience='0' * 5000 + '12')
+        self.assertIsNone(errors)
+        self.assertEqual(inputs.years_experience, 12)
+
+    def test_oversized_whole_number_is_invalid(self):
+        for value in ('9' * 5000, '61', 10 ** 400, '-1', '1.5'):
+            with self.subTest(value=value):
+                inputs, errors = self.decode(years_experience=value)
+                self.assertIsNone(inputs)
+                self.assertIn('years_experience', errors)
+
+    def test_oversized_salary_is_invalid(self):
+        for value in (10 ** 400, '1e400', 'nan', MAX_SALARY * 2, -1):
+            with self.subTest(value=value):
+                inputs, errors = self.decode(salary=value)
+                self.assertIsNone(inputs)
+                self.assertIn('salary', errors)
+
+    def test_zero_salary_is_not_given(self):
+        for value in (0, 0.0, '0'):
+            with self.subTest(value=value):
+                inputs, errors = self.decode(salary=value)
+                self.assertIsNone(errors)
+                self.assertIsNone(inputs.salary)
+        self.assertEqual(canonical_query(self.decode(salary=0)[0]), canonical_query(self.decode()[0]))
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class LimiterTestMixin:
+    """Window behaviour shared by every limiter backend; make_limiter(limit, window, max_keys, clock)."""
+
+    def test_limit_within_window(self):
+        limiter = self.make_limiter(2, 60, 100, FakeClock(0))
+        self.assertTrue(limiter.hit('a'))
+        self.assertTrue(limiter.hit('a'))
+        self.assertFalse(limiter.hit('a'))
+        self.assertTrue(limiter.hit('b'))
+        self.assertEqual(limiter.stats()['allowed'], 3)
+        self.assertEqual(limiter.stats()['rejections'], 1)
+
+    def test_window_rollover(self):
+        clock = FakeClock(0)
+        limiter = self.make_limiter(2, 60, 100, clock)
+        limiter.hit('a')
+        limiter.hit('a')
+
+        # The previous window still counts in full at its end...
+        clock.now = 60
+        self.assertFalse(limiter.hit('a'))
+        # ...and half of it counts halfway through the next window
+        clock.now = 90
+        self.assertTrue(limiter.hit('a'))
+        self.assertFalse(limiter.hit('a'))
+        # Two windows later nothing is left
+        clock.now = 180
+        self.assertTrue(limiter.hit('a'))
+        self.assertTrue(limiter.hit('a'))
+
+    def test_async_hit(self):
+        limiter = self.make_limiter(2, 60, 100, FakeClock(0))
+
+        async def hit_three_times():
+            return [await limiter.ahit('a') for _ in range(3)]
+        self.assertEqual(async_to_sync(hit_three_times)(), [True, True, False])
+        # Both APIs share the same counts
+        self.assertFalse(limiter.hit('a'))
+        self.assertEqual(limiter.stats()['rejections'], 2)
+
+
+@mock.patch.object(VisitorTracker, 'put')
+class RateLimitMiddlewareTests(TestCase):
+    async def test_async_requests_await_the_limiter(self, put):
+        limiter = ratelimit.get_limiter()
+        with mock.patch.object(limiter, 'ahit', mock.AsyncMock(return_value=False)) as ahit, \
+                mock.patch.object(limiter, 'hit') as hit:
+            response = await self.async_client.get(f'/api/calculate/?{SCORE_QUERY}')
+        self.assertEqual(response.status_code, 429)
+        ahit.assert_awaited_once()
+        hit.assert_not_called()
+
+    def test_sync_requests_call_the_limiter(self, put):
+        limiter = ratelimit.get_limiter()
+        with mock.patch.object(limiter, 'hit', return_value=False) as hit:
+            response = self.client.get(f'/api/calculate/?{SCORE_QUERY}')
+        self.assertEqual(response.status_code, 429)
+        hit.assert_called_once()
+
+
+class SlidingWindowLimiterTests(LimiterTestMixin, SimpleTestCase):
+    def make_limiter(self, limit, window, max_keys, clock):
+        return SlidingWindowLimiter(limit, window, max_keys, clock=clock)
+
+    def test_eviction_past_max_keys(self):
+        limiter = self.make_limiter(1, 60, 2, FakeClock(0))
+        for key in ('a', 'b', 'c'):
+            self.assertTrue(limiter.hit(key))
+        self.assertEqual(limiter.stats()['tracked_keys'], 2)
+        self.assertEqual(limiter.stats()['evictions'], 1)
+        # The least recently seen key was evicted, so its count starts over
+        self.assertTrue(limiter.hit('a'))
+        self.assertFalse(limiter.hit('c'))
+
+    def test_idle_keys_expire(self):
+        clock = FakeClock(0)
+        limiter = self.make_limiter(1, 60, 100, clock)
+        for key in ('a', 'b', 'c'):
+            limiter.hit(key)
+        clock.now = 120
+        limiter.hit('d')
+        self.assertEqual(limiter.stats()['tracked_keys'], 1)
+        self.assertEqual(limiter.stats()['expirations'], 3)
+
+
+class SharedMemoryLimiterTests(LimiterTestMixin, SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.prefix = os.path.join(directory.name, 'ratelimit')
+
+    def make_limiter(self, limit, window, max_keys, clock):
+        return SharedMemoryLimiter(limit, window, max_keys, shared_table_path(self.prefix, max_keys), clock=clock)
+
+    def test_processes_share_counts(self):
+        clock = FakeClock(0)
+        first = self.make_limiter(2, 60, 100, clock)
+        second = self.make_limiter(2, 60, 100, clock)
+        self.assertTrue(first.hit('a'))
+        self.assertTrue(second.hit('a'))
+        self.assertFalse(first.hit('a'))
+        self.assertEqual(second.stats()['tracked_keys'], 1)
+
+        second.clear()
+        self.assertTrue(first.hit('a'))
+
+    def test_eviction_in_full_bucket(self):
+        # One bucket: every key competes for the same BUCKET_WAYS slots
+        limiter = self.make_limiter(1, 60, BUCKET_WAYS, FakeClock(0))
+        for number in range(BUCKET_WAYS + 1):
+            self.assertTrue(limiter.hit(f'key{number}'))
+        self.assertEqual(limiter.stats()['tracked_keys'], BUCKET_WAYS)
+        self.assertEqual(limiter.stats()['evictions'], 1)
+
+    def test_idle_slots_are_reused(self):
+        clock = FakeClock(0)
+        limiter = self.make_limiter(1, 60, BUCKET_WAYS, clock)
+        for number in range(BUCKET_WAYS):
+            limiter.hit(f'key{number}')
+        clock.now = 120
+        self.assertTrue(limiter.hit('new'))
+        self.assertEqual(limiter.stats()['tracked_keys'], 1)
+        self.assertEqual(limiter.stats()['evictions'], 0)
+
+    def test_table_size_is_never_changed(self):
+        self.make_limiter(2, 60, 100, FakeClock(0))
+        path = shared_table_path(self.prefix, 100)
+        size = os.path.getsize(path)
+
+        self.assertNotEqual(shared_table_path(self.prefix, 200), path)
+        with self.assertRaises(ValueError):
+            SharedMemoryLimiter(2, 60, 200, path)
+        self.assertEqual(os.path.getsize(path), size)
+
+
+class CacheLimiterTests(LimiterTestMixin, SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def make_limiter(self, limit, window, max_keys, clock):
+        return CacheLimiter(limit, window, max_keys, clock=clock)
+
+
+class GeoIPDatabaseTests(SimpleTestCase):
+    RANGES_CSV = [
+        '"16777216","16777471","AU","Australia","Queensland","Brisbane","-27.46794","153.02809"',
+        '"8.8.8.0","8.8.8.255","US","United States","California","Mountain View","37.4","-122.08"',
+        # Overlaps the range above, so it is skipped
+        '"8.8.8.128","8.8.9.255","CA","Canada","Ontario","Toronto","43.7","-79.4"',
+        '"9.9.9.0","9.9.9.255","-","-","-","-","0","0"',
+        '"2001:4860::","2001:4860:ffff:ffff:ffff:ffff:ffff:ffff","US","United States","California","Mountain View","37.4","-122.08"',
+    ]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'geoip.bin')
+
+    def test_write_and_lookup(self):
+        counts = geoip.write_database(self.path, geoip.read_ranges(self.RANGES_CSV))
+        # Three ranges kept, one overlap skipped; its location is still stored
+        self.assertEqual(counts, (3, 3, 1))
+
+        database = geoip.GeoIPDatabase(self.path)
+        self.assertEqual(database.lookup('1.0.0.1'), {
+            'country': 'Australia',
+            'country_code': 'AU',
+            'city': 'Brisbane',
+            'region': 'Queensland',
+            'latitude': -27.4679,
+            'longitude': 153.0281,
+        })
+        for ip_address in ('8.8.8.0', '8.8.8.255', '::ffff:8.8.8.8', '2001:4860:4860::8888'):
+            with self.subTest(ip_address=ip_address):
+                self.assertEqual(database.lookup(ip_address)['country_code'], 'US')
+
+        for ip_address in ('8.8.9.1', '9.9.9.9', '1.0.1.0', '0.0.0.0', '10.0.0.1', '::1', 'not an ip'):
+            with self.subTest(ip_address=ip_address):
+                self.assertIsNone(database.lookup(ip_address))
+
+    def test_empty_database(self):
+        self.assertEqual(geoip.write_database(self.path, []), (0, 0, 0))
+        self.assertIsNone(geoip.GeoIPDatabase(self.path).lookup('8.8.8.8'))
+
+    def test_invalid_range(self):
+        with self.assertRaises(ValueError):
+            list(geoip.read_ranges(['"8.8.8.255","8.8.8.0","US","United States","","","",""']))
+        with self.assertRaises(ValueError):
+            list(geoip.read_ranges(['"8.8.8.0","::1","US","United States","","","",""']))
+
+    def test_not_a_database(self):
+        with open(self.path, 'wb') as f:
+            f.write(bytes(geoip.HEADER.size))
+        with self.assertRaises(ValueError):
+            geoip.GeoIPDatabase(self.path)
+
+
+class StaticFilesTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        os.mkdir(os.path.join(directory.name, 'js'))
+        self.write(directory.name, 'js/app.js', b'console.log(1);\n' * 100)
+        self.write(directory.name, 'big.bin', os.urandom(staticserve.MEMORY_MAX_BYTES + 1))
+        self.root = directory.name
+        self.static_files = staticserve.StaticFiles([self.root])
+        self.factory = RequestFactory()
+
+    def write(self, root, name, content):
+        with open(os.path.join(root, name), 'wb') as f:
+            f.write(content)
+
+    def test_serves_from_memory_with_gzip_variant(self):
+        request = self.factory.get('/static/js/app.js', HTTP_ACCEPT_ENCODING='gzip')
+        response = self.static_files.serve(request, 'js/app.js')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+        etag = response['ETag']
+        response = self.static_files.serve(
+            self.factory.get('/static/js/app.js', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag), 'js/app.js'
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.static_files.stats()['entries'], 1)
+
+    def test_cache_control_and_encodings(self):
+        self.write(self.root, 'js/app.0123456789ab.js', b'console.log(2);\n' * 100)
+        self.write(self.root, 'js/vendor.js', b'var v;\n' * 100)
+        self.write(self.root, 'js/vendor.js.br', b'brotli')
+
+        plain = self.static_files.serve(self.factory.get('/static/js/app.js'), 'js/app.js')
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(plain.content, b'console.log(1);\n' * 100)
+        self.assertEqual(plain['Cache-Control'], staticserve.STATIC_CACHE_CONTROL)
+
+        hashed = self.static_files.serve(self.factory.get('/static/js/app.0123456789ab.js'), 'js/app.0123456789ab.js')
+        self.assertEqual(hashed['Cache-Control'], staticserve.IMMUTABLE_CACHE_CONTROL)
+
+        # A precompressed variant shipped next to the file is preferred
+        request = self.factory.get('/static/js/vendor.js', HTTP_ACCEPT_ENCODING='gzip, br')
+        response = self.static_files.serve(request, 'js/vendor.js')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(response.content, b'brotli')
+
+        self.assertIsNone(self.static_files.serve(self.factory.get('/static/missing.js'), 'missing.js'))
+
+    def test_aliases_are_not_served(self):
+        aliases = ('js//app.js', 'js/./app.js', 'js/../js/app.js', './js/app.js', '/js/app.js', 'js/app.js/', '../js/app.js')
+        for name in aliases:
+            with self.subTest(name=name):
+                self.assertIsNone(self.static_files.serve(self.factory.get('/'), name))
+        self.assertEqual(self.static_files.stats()['entries'], 0)
+
+    def test_cache_is_bounded(self):
+        for number in range(20):
+            self.write(self.root, f'{number}.txt', bytes(1000))
+        with mock.patch.object(staticserve, 'CACHE_MAX_BYTES', 5000):
+            static_files = staticserve.StaticFiles([self.root])
+        for number in range(20):
+            self.assertIsNotNone(static_files.get(f'{number}.txt'))
+        stats = static_files.stats()
+        self.assertLessEqual(stats['bytes'], 5000)
+        self.assertGreater(stats['evictions'], 0)
+
+    def test_large_file_streams_asynchronously(self):
+        request = self.factory.get('/static/big.bin')
+        self.assertIsInstance(self.static_files.serve(request, 'big.bin'), staticserve.FileResponse)
+
+        response = self.static_files.serve(request, 'big.bin', asynchronous=True)
+        self.assertTrue(response.is_async)
+
+        async def collect():
+            return [chunk async for chunk in response]
+        chunks = async_to_sync(collect)()
+        self.assertGreater(len(chunks), 1)
+        with open(os.path.join(self.root, 'big.bin'), 'rb') as f:
+            self.assertEqual(b''.join(chunks), f.read())
+
+
+class SalarySweepTests(SimpleTestCase):
+    """calculate_salary_sweep agrees with calculate_result at every salary."""
+
+    PROFILES = (
+        SCORE_PAYLOAD,
+        # Its total without a salary rounds differently unless summed in calculate_result's order
+        {**SCORE_PAYLOAD, 'country': 'India', 'years_experience': 15, 'skills': 'python', 'promotion_received': True},
+        {**SCORE_PAYLOAD, 'job_title': 'Nurse', 'industry': 'healthcare', 'years_experience': 1, 'company_size': 'large'},
+        {**SCORE_PAYLOAD, 'years_experience': 30, 'skills': 'python, aws, kubernetes', 'years_in_role': 6},
+    )
+
+    def decode(self, profile):
+        parsed, errors = decode_score_inputs(profile)
+        self.assertIsNone(errors)
+        return parsed
+
+    def interpolate(self, curve, salary):
+        for start, end in zip(curve, curve[1:]):
+            if salary <= end['salary']:
+                fraction = (salary - start['salary']) / (end['salary'] - start['salary'])
+                return start['score'] + fraction * (end['score'] - start['score'])
+        return curve[-1]['score']
+
+    def verdict_at(self, verdicts, salary):
+        for verdict in verdicts:
+            if verdict['max_salary'] is None or salary <= verdict['max_salary']:
+                return verdict['verdict_code']
+
+    def test_matches_calculate_result(self):
+        for profile in self.PROFILES:
+            sweep = scoring.calculate_salary_sweep(self.decode(profile))
+            self.assertEqual(sweep['score_without_salary'], scoring.calculate_result(self.decode(profile)).score)
+
+            median = sweep['debug']['market_median']
+            for step in range(1, 60):
+                salary = round(median * step / 20) + 0.37
+                with self.subTest(profile=profile, salary=salary):
+                    result = scoring.calculate_result(self.decode({**profile, 'salary': salary}))
+                    self.assertEqual(self.verdict_at(sweep['verdicts'], salary), result.verdict_code)
+                    # Curve scores are rounded to 2 places
+                    self.assertLessEqual(abs(self.interpolate(sweep['curve'], salary) - result.score), 0.51)
+
+    def test_salary_in_inputs_is_ignored(self):
+        with_salary = scoring.calculate_salary_sweep(self.decode({**SCORE_PAYLOAD, 'salary': 50000}))
+        self.assertEqual(with_salary, scoring.calculate_salary_sweep(self.decode(SCORE_PAYLOAD)))
+
+    def test_curve_and_verdicts_are_ordered(self):
+        for profile in self.PROFILES:
+            sweep = scoring.calculate_salary_sweep(self.decode(profile))
+            salaries = [point['salary'] for point in sweep['curve']]
+            scores = [point['score'] for point in sweep['curve']]
+            self.assertEqual(salaries, sorted(salaries))
+            self.assertEqual(scores, sorted(scores, reverse=True))
+            # Verdict ranges tile the salary axis from 0 up
+            verdicts = sweep['verdicts']
+            self.assertEqual(verdicts[0]['min_salary'], 0)
+            self.assertIsNone(verdicts[-1]['max_salary'])
+            for lower, upper in zip(verdicts, verdicts[1:]):
+                self.assertEqual(lower['max_salary'], upper['min_salary'])
+
+
+@fresh_rate_limiter
+@mock.patch.object(VisitorTracker, 'put')
+class SalarySweepViewTests(TestCase):
+    def test_sweep(self, put):
+        response = self.client.post('/api/calculate/sweep/', SCORE_PAYLOAD, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), scoring.calculate_salary_sweep(scoring.parse_inputs(SCORE_PAYLOAD)))
+
+    def test_invalid_inputs(self, put):
+        response = self.client.post('/api/calculate/sweep/', {'country': 'USA'}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('job_title', response.json()['errors'])
+
+
+@fresh_rate_limiter
+@mock.patch.object(VisitorTracker, 'put')
+class BatchScoringTests(TestCase):
+    """Batch scoring returns exactly what scoring each profile on its own does."""
+
+    def test_matches_full_score(self, put):
+        corpus = benchmarks.generate_corpus(size=300, seed=7)
+        # Values outside the categorical table take the direct path
+        corpus.append({**SCORE_PAYLOAD, 'country': 'Atlantis', 'industry': 'piracy', 'company_size': 'huge'})
+        self.assertEqual(
+            scoring.calculate_batch_scores(corpus),
+            [scoring.calculate_full_score(inputs) for inputs in corpus],
+        )
+        self.assertEqual(
+            scoring.calculate_batch_scores(corpus, ['score', 'verdict']),
+            [scoring.calculate_full_score(inputs, ['score', 'verdict']) for inputs in corpus],
+        )
+
+    def test_endpoint_reports_invalid_profiles_inline(self, put):
+        profiles = [SCORE_PAYLOAD, {'country': 'USA'}, 'not a profile', {**SCORE_PAYLOAD, 'salary': 90000}]
+        response = self.client.post(
+            '/api/calculate/batch/', {'profiles': profiles}, content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['count'], 4)
+        results = body['results']
+        self.assertEqual(results[0], scoring.calculate_full_score(SCORE_PAYLOAD))
+        self.assertIn('job_title', results[1]['errors'])
+        self.assertEqual(results[2], {'error': 'Profile must be a JSON object'})
+        self.assertEqual(results[3]['score'], scoring.calculate_full_score(profiles[3])['score'])
+
+    def test_endpoint_rejects_bad_batches(self, put):
+        for body in ({'profiles': {}}, [SCORE_PAYLOAD], {'profiles': [SCORE_PAYLOAD] * (BATCH_MAX_PROFILES + 1)}):
+            with self.subTest(body=str(body)[:40]):
+                response = self.client.post('/api/calculate/batch/', body, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+
+
+class KeywordMatcherTests(SimpleTestCase):
+    def test_best_rank(self):
+        matcher = KeywordMatcher([('he', 3), ('she', 1), ('his', 2), ('hers', 0), ('', 5)])
+        self.assertEqual(matcher.best_rank('ushers'), 0)
+        self.assertEqual(matcher.best_rank('she'), 1)
+        self.assertEqual(matcher.best_rank('this'), 2)
+        self.assertEqual(matcher.best_rank('the'), 3)
+        self.assertIsNone(matcher.best_rank('xyz'))
+        self.assertIsNone(matcher.best_rank(''))
+        self.assertTrue(matcher.search('ahead'))
+
+    def test_repeated_keyword_keeps_lowest_rank(self):
+        matcher = KeywordMatcher([('data', 4), ('data', 2)])
+        self.assertEqual(matcher.best_rank('big data'), 2)
+
+    def test_categorize_role_matches_keyword_scan(self):
+        def scan(title):
+            for category, keywords in data.ROLE_KEYWORDS.items():
+                if any(keyword in title.lower() for keyword in keywords):
+                    return category
+            return 'default'
+
+        keywords = [k for ks in data.ROLE_KEYWORDS.values() for k in ks]
+        titles = ['', 'Astronaut', 'Chief Happiness Officer']
+        titles += [f'Senior {k.title()} II' for k in keywords]
+        # Titles containing keywords of several categories
+        titles += [f'{a} / {b}' for a, b in zip(keywords, reversed(keywords))]
+        for title in titles:
+            with self.subTest(title=title):
+                self.assertEqual(scoring.categorize_role(title), scan(title))
+
+
+class PartialSkillTests(SimpleTestCase):
+    def test_substring_index(self):
+        index = SubstringIndex([('python', 1), ('typescript', 0), ('pytorch', 2)])
+        self.assertEqual(index.best_rank('pyt'), 1)
+        self.assertEqual(index.best_rank('script'), 0)
+        self.assertEqual(index.best_rank('t'), 0)
+        self.assertEqual(index.best_rank('torch'), 2)
+        self.assertIsNone(index.best_rank('rust'))
+
+    def test_find_partial_skill_matches_skill_scan(self):
+        def scan(token):
+            for known in data.SKILL_PREMIUMS:
+                if known in token or token in known:
+                    return known
+            return None
+
+        # parse_skills never yields empty tokens
+        tokens = ['x', 'cobol', 'senior java developer']
+        for skill in data.SKILL_PREMIUMS:
+            tokens += [skill[:2], skill[1:-1], f'{skill} expert', f'advanced {skill}']
+        for token in filter(None, tokens):
+            with self.subTest(token=token):
+                self.assertEqual(scoring.find_partial_skill(token), scan(token))
+
+    def test_partial_matches_score_less_than_exact(self):
+        self.assertLess(scoring.calculate_skill_score('pytho'), scoring.calculate_skill_score('python'))
+        self.assertEqual(scoring.calculate_skill_score('python expert'), scoring.calculate_skill_score('pytho'))
+
+
+class CategoricalTableTests(SimpleTestCase):
+    def direct(self, role, level, country, industry, size, salary_provided):
+        median, currency_code = scoring.get_market_median(role, level, country, industry)
+        return (
+            median,
+            currency_code,
+            scoring.calculate_company_score(size, country),
+            scoring.calculate_timing_score(role),
+            scoring.calculate_confidence(salary_provided, country, role),
+        )
+
+    def test_cells_match_direct_computation(self):
+        table = scoring.get_categorical_table()
+        for role in table.roles:
+            for level in table.levels:
+                for country in table.countries:
+                    for industry in table.industries[::3]:
+                        for size in table.sizes:
+                            for salary_provided in (False, True):
+                                key = (role, level, country, industry, size, salary_provided)
+                                self.assertEqual(table.lookup(*key), self.direct(*key), key)
+
+    def test_values_outside_the_table_are_computed(self):
+        table = scoring.get_categorical_table()
+        self.assertIsNotNone(table.lookup('engineering', 'mid', 'USA', 'technology', 'small', True))
+        for key in (
+            ('engineering', 'mid', 'Atlantis', 'technology', 'small', True),
+            ('engineering', 'mid', 'USA', 'piracy', 'small', True),
+            ('engineering', 'mid', 'USA', 'technology', 'huge', False),
+            ('engineering', 'mid', 'USA', ['technology'], 'small', False),
+        ):
+            with self.subTest(key=key):
+                self.assertIsNone(table.lookup(*key))
+                if isinstance(key[3], str):
+                    self.assertEqual(scoring.resolve_categorical(*key), self.direct(*key))
+
+
+class LRUCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = LRUCache(max_entries=3, max_bytes=10 ** 6, ttl=60, clock=self.clock)
+
+    def test_evicts_least_recently_used(self):
+        for key in 'abc':
+            self.cache.set(key, key.upper(), 1)
+        self.assertEqual(self.cache.get('a', 1), 'A')
+        self.cache.set('d', 'D', 1)
+
+        self.assertIsNone(self.cache.get('b', 1))
+        self.assertEqual([self.cache.get(key, 1) for key in 'acd'], ['A', 'C', 'D'])
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_byte_limit(self):
+        value = 'x' * 1000
+        cache = LRUCache(max_entries=100, max_bytes=3 * estimate_size(value), ttl=60)
+        for key in range(5):
+            cache.set(key, value, 1)
+        self.assertEqual(cache.stats()['entries'], 3)
+        self.assertLessEqual(cache.stats()['bytes'], cache.max_bytes)
+        # Values larger than the whole cache are not stored
+        cache.set('big', value * 4, 1)
+        self.assertIsNone(cache.get('big', 1))
+
+    def test_entries_expire(self):
+        self.cache.set('a', 'A', 1)
+        self.clock.now = 59
+        self.assertEqual(self.cache.get('a', 1), 'A')
+        self.clock.now = 60
+        self.assertIsNone(self.cache.get('a', 1))
+        self.assertEqual(self.cache.stats()['expirations'], 1)
+
+    def test_new_version_drops_everything(self):
+        self.cache.set('a', 'A', 1)
+        self.cache.set('b', 'B', 1)
+        self.assertIsNone(self.cache.get('a', 2))
+        self.assertIsNone(self.cache.get('b', 1))
+        stats = self.cache.stats()
+        self.assertEqual((stats['entries'], stats['invalidations']), (0, 1))
+
+
+@mock.patch.object(scoring, 'result_cache', new_callable=lambda: LRUCache(100, 10 ** 6, 60))
+class CachedResultTests(SimpleTestCase):
+    def parse(self, **fields):
+        return scoring.parse_inputs({**SCORE_PAYLOAD, **fields})
+
+    def test_equivalent_inputs_share_an_entry(self, result_cache):
+        first = scoring.cached_result(self.parse(job_title='Software Engineer'))
+        second = scoring.cached_result(self.parse(job_title='software developer'))
+        self.assertIs(first, second)
+        self.assertEqual(first.to_dict(), scoring.calculate_result(self.parse()).to_dict())
+        self.assertEqual(result_cache.stats()['hits'], 1)
+
+    def test_different_inputs_and_fields_do_not(self, result_cache):
+        base = scoring.cached_result(self.parse())
+        self.assertIsNot(scoring.cached_result(self.parse(salary=90000)), base)
+        self.assertIsNot(scoring.cached_result(self.parse(), frozenset({'score'})), base)
+        self.assertEqual(result_cache.stats()['hits'], 0)
+
+    def test_unhashable_inputs_have_no_key(self, result_cache):
+        self.assertIsNone(scoring.result_cache_key(self.parse(company_size=['small'])))
+        self.assertIsNone(scoring.result_etag(self.parse(company_size=['small'])))
+
+
+@fresh_rate_limiter
+@mock.patch.object(VisitorTracker, 'put')
+class FieldsProjectionTests(TestCase):
+    def post(self, payload, path='/api/calculate/'):
+        return self.client.post(path, payload, content_type='application/json')
+
+    def test_projection_is_a_subset_of_the_full_result(self, put):
+        full = self.post(SCORE_PAYLOAD).json()
+        for fields in (['score'], ['verdict_code', 'debug'], 'score, salary_range'):
+            with self.subTest(fields=fields):
+                response = self.post({**SCORE_PAYLOAD, 'fields': fields})
+                self.assertEqual(response.status_code, 200)
+                names = fields if isinstance(fields, list) else [f.strip() for f in fields.split(',')]
+                self.assertEqual(response.json(), {key: full[key] for key in ['version'] + names})
+
+    def test_query_string_fields(self, put):
+        response = self.post(SCORE_PAYLOAD, '/api/calculate/?fields=score,verdict')
+        self.assertEqual(set(response.json()), {'version', 'score', 'verdict'})
+
+    def test_invalid_fields(self, put):
+        for fields in ('score,salary', ['score', 1], {'score': True}):
+            with self.subTest(fields=fields):
+                response = self.post({**SCORE_PAYLOAD, 'fields': fields})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('fields', response.json()['error'])
+
+
+class MarketDataSnapshotTests(SimpleTestCase):
+    def setUp(self):
+        self.addCleanup(snapshots.activate, snapshots.current())
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, 'market.json')
+
+    def modified(self, version):
+        """A copy of the built-in data with every software engineering median doubled."""
+        builtin = snapshots.builtin_snapshot()
+        tables = {name: copy.deepcopy(getattr(builtin, name)) for name in snapshots.TABLE_NAMES}
+        medians = tables['ROLE_MEDIANS_USD']['engineering']
+        for level in medians:
+            medians[level] *= 2
+        return snapshots.MarketData(version, tables)
+
+    def test_write_and_load(self):
+        snapshot = self.modified('2099-01')
+        snapshots.write_snapshot(self.path, snapshot)
+        loaded = snapshots.load_snapshot(self.path)
+
+        self.assertEqual(loaded.DATA_VERSION, '2099-01')
+        for name in snapshots.TABLE_NAMES:
+            self.assertEqual(getattr(loaded, name), getattr(snapshot, name), name)
+        self.assertEqual(os.listdir(self.dir.name), ['market.json'])
+
+    def test_load_rejects_invalid_files(self):
+        for payload in ([], {'format': 99}, {'format': snapshots.SNAPSHOT_FORMAT_VERSION, 'tables': {}}):
+            with self.subTest(payload=payload):
+                with open(self.path, 'w') as f:
+                    json.dump(payload, f)
+                with self.assertRaises(ValueError):
+                    snapshots.load_snapshot(self.path)
+
+    def test_activate_rebuilds_derived_tables(self):
+        parsed = scoring.parse_inputs(SCORE_PAYLOAD)
+        before = scoring.calculate_result(parsed).debug[2]
+
+        snapshots.activate(self.modified('2099-01'))
+        self.assertEqual(data_proxy.DATA_VERSION, '2099-01')
+        self.assertEqual(scoring.calculate_result(parsed).debug[2], before * 2)
+
+    def test_pinned_requests_keep_their_snapshot(self):
+        parsed = scoring.parse_inputs(SCORE_PAYLOAD)
+        with snapshots.pinned():
+            before = scoring.calculate_result(parsed).debug[2]
+            snapshots.activate(self.modified('2099-01'))
+            self.assertEqual(scoring.calculate_result(parsed).debug[2], before)
+            self.assertNotEqual(data_proxy.DATA_VERSION, '2099-01')
+        self.assertEqual(data_proxy.DATA_VERSION, '2099-01')
+
+    def test_watcher_activates_new_files(self):
+        watcher = snapshots.SnapshotWatcher(self.path, interval=0)
+        watcher.check()  # no file yet
+        original = snapshots.current()
+
+        snapshots.write_snapshot(self.path, self.modified('2099-01'))
+        watcher.check()
+        self.assertEqual(snapshots.current().DATA_VERSION, '2099-01')
+
+        # A broken file keeps the current snapshot
+        with open(self.path, 'w') as f:
+            f.write('{')
+        with mock.patch('builtins.print'):
+            watcher.check()
+        self.assertEqual(snapshots.current().DATA_VERSION, '2099-01')
+        self.assertIsNot(snapshots.current(), original)
+
+
+@fresh_rate_limiter
+@mock.patch.object(VisitorTracker, 'put')
+class BulkScoringTests(TestCase):
+    CSV = (
+        'job_title,country,industry,years_experience,company_size,skills,salary\n'
+        'Software Engineer,USA,technology,5,small,"python, aws",\n'
+        'Nurse,USA,healthcare,2,large,,65000\n'
+        ',USA,technology,5,small,,\n'
+    )
+
+    def lines(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_csv(self, put):
+        lines = self.lines(self.client.post('/api/calculate/bulk/', self.CSV, content_type='text/csv'))
+
+        self.assertEqual([line['row'] for line in lines], [1, 2, 3])
+        # Blank cells count as absent
+        self.assertEqual(lines[0]['result'], scoring.calculate_full_score({
+            **SCORE_PAYLOAD, 'skills': 'python, aws',
+        }))
+        self.assertEqual(lines[1]['result']['score'], scoring.calculate_full_score({
+            **SCORE_PAYLOAD, 'job_title': 'Nurse', 'industry': 'healthcare', 'years_experience': 2,
+            'company_size': 'large', 'salary': 65000,
+        })['score'])
+        self.assertIn('job_title', lines[2]['errors'])
+
+    def test_multipart_upload_with_fields(self, put):
+        upload = SimpleUploadedFile('profiles.csv', self.CSV.encode(), content_type='application/octet-stream')
+        lines = self.lines(self.client.post('/api/calculate/bulk/?fields=score', {'file': upload}))
+        self.assertEqual(set(lines[0]['result']), {'version', 'score'})
+
+    def test_ndjson_errors_are_inline(self, put):
+        body = '\n'.join([json.dumps(SCORE_PAYLOAD), '{"job_title":', '', '[1, 2]', json.dumps(SCORE_PAYLOAD)])
+        lines = self.lines(self.client.post('/api/calculate/bulk/', body, content_type='application/x-ndjson'))
+
+        self.assertEqual([line['row'] for line in lines], [1, 2, 3, 4])
+        self.assertEqual(lines[1]['error'], 'Invalid JSON')
+        self.assertEqual(lines[2]['error'], 'Row must be a JSON object')
+        self.assertEqual(lines[3]['result'], lines[0]['result'])
+
+    @mock.patch.object(bulk, 'BULK_MAX_ROWS', 2)
+    def test_row_limit(self, put):
+        lines = self.lines(self.client.post('/api/calculate/bulk/', self.CSV, content_type='text/csv'))
+        self.assertEqual([line.get('row') for line in lines], [1, 2, None])
+        self.assertIn('Row limit', lines[-1]['error'])
+
+    def test_unreadable_input_ends_the_stream(self, put):
+        body = self.CSV.encode() + b'\xff\xfe,USA\n'
+        lines = self.lines(self.client.post('/api/calculate/bulk/', body, content_type='text/csv'))
+        self.assertIn('Could not read input', lines[-1]['error'])
+
+    def test_unsupported_format(self, put):
+        response = self.client.post('/api/calculate/bulk/', self.CSV, content_type='text/plain')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/calculate/bulk/?format=csv', self.CSV, content_type='text/plain')
+        self.assertEqual(response.status_code, 200)
+
+
+def create_author(slug='jane-doe', **fields):
+    return Author.objects.create(
+        slug=slug, **{
+            'name': 'Jane Doe', 'bio': 'Compensation analyst.', 'expertise': 'Pay, Hiring',
+            'linkedin_url': 'https://www.linkedin.com/in/jane-doe', **fields,
+        }
+    )
+
+
+def create_post(author, slug, **fields):
+    return BlogPost.objects.create(
+        author=author, slug=slug, **{
+            'title': f'Post {slug}', 'excerpt': 'An excerpt.', 'content': '<p>Salary negotiation basics.</p>',
+            'featured_image': 'https://example.com/image.png', 'meta_title': f'Post {slug}',
+            'meta_description': 'A post.', **fields,
+        }
+    )
+
+
+class BlogTestCase(TestCase):
+    """Blog fixtures, with generated sitemaps written to a temporary directory."""
+
+    def setUp(self):
+        cache.clear()
+        sitemap_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(sitemap_dir.cleanup)
+        settings = self.settings(SITEMAP_DIR=sitemap_dir.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        tracking = mock.patch.object(VisitorTracker, 'put')
+        tracking.start()
+        self.addCleanup(tracking.stop)
+        fresh_rate_limiter.start()
+        self.addCleanup(fresh_rate_limiter.stop)
+
+
+class SearchTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        author = create_author()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.raise_post = create_post(
+                author, 'raise', title='How to ask for a raise',
+                content='<p>Timing matters when you negotiate &amp; ask.</p>',
+            )
+            self.offer_post = create_post(
+                author, 'offer', title='Reading an offer letter',
+                content='<p>Before you ask for a raise, read the offer.</p>',
+            )
+            create_post(author, 'draft', title='Raise draft', is_published=False)
+
+    def test_ranked_results_with_snippets(self):
+        results = search.search('raise')
+        self.assertEqual([post.slug for post, _ in results], ['raise', 'offer'])
+        self.assertIn('<mark>', results[1][1])
+        # Entities are decoded before indexing and escaped again in snippets
+        self.assertEqual(search.search('negotiate')[0][1].count('&amp;'), 1)
+
+    def test_unpublished_posts(self):
+        self.assertNotIn('draft', [post.slug for post, _ in search.search('draft')])
+        self.assertIn('draft', [post.slug for post, _ in search.search('draft', include_unpublished=True)])
+
+    def test_prefix_and_query_syntax(self):
+        self.assertEqual([post.slug for post, _ in search.search('negoti')], ['raise'])
+        for text in ('raise"', 'raise OR', 'NEAR(raise', '*', '   '):
+            with self.subTest(text=text):
+                search.search(text)
+
+    def test_index_follows_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.offer_post.title = 'Reading a contract'
+            self.offer_post.content = '<p>Clauses to check.</p>'
+            self.offer_post.save()
+            self.raise_post.delete()
+        self.assertEqual(search.search('raise'), [])
+        self.assertEqual([post.slug for post, _ in search.search('contract')], ['offer'])
+
+    def test_rebuild_command(self):
+        BlogPost.objects.filter(slug='offer').update(title='Salary bands explained')
+        self.assertEqual(search.search('bands'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 3 blog posts', out.getvalue())
+        self.assertEqual([post.slug for post, _ in search.search('bands')], ['offer'])
+
+    def test_databases_without_an_index_use_icontains(self):
+        with mock.patch.dict(search.BACKENDS, clear=True):
+            self.assertIsNone(search.get_index())
+            results = search.search('OFFER')
+            self.assertEqual([post.slug for post, _ in results], ['offer'])
+            self.assertEqual(results[0][1], 'An excerpt.')
+            search.index_post(self.raise_post.pk)
+
+    def test_search_api(self):
+        response = self.client.get('/api/search/', {'q': 'raise', 'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['count'], 1)
+        self.assertEqual(body['results'][0]['url'], '/blog/raise/')
+        self.assertEqual(self.client.get('/api/search/').status_code, 400)
+
+
+class PageCacheTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = create_author()
+        self.post = create_post(self.author, 'negotiating')
+
+    def test_pages_are_served_from_the_cache(self):
+        for url in ('/blog/', '/blog/negotiating/', '/author/jane-doe/'):
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                self.assertEqual(first.status_code, 200)
+                self.assertEqual(first['Cache-Control'], pagecache.PAGE_CACHE_CONTROL)
+                with self.assertNumQueries(0):
+                    second = self.client.get(url)
+                self.assertEqual(second.content, first.content)
+
+                not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+                self.assertEqual(not_modified.status_code, 304)
+
+    def test_unknown_pages_are_cached_as_not_found(self):
+        self.assertEqual(self.client.get('/blog/missing/').status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/blog/missing/').status_code, 404)
+
+    def test_saving_a_post_invalidates_its_pages(self):
+        for url in ('/blog/', '/blog/negotiating/', '/author/jane-doe/'):
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = 'Negotiating a raise'
+            self.post.save()
+
+        for url in ('/blog/', '/blog/negotiating/', '/author/jane-doe/'):
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Negotiating a raise')
+
+    def test_changed_slug_invalidates_the_old_page(self):
+        self.client.get('/blog/negotiating/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.slug = 'negotiating-a-raise'
+            self.post.save()
+
+        self.assertEqual(self.client.get('/blog/negotiating/').status_code, 404)
+        self.assertEqual(self.client.get('/blog/negotiating-a-raise/').status_code, 200)
+
+    def test_renaming_the_author_invalidates_their_posts(self):
+        self.client.get('/blog/negotiating/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.name = 'Jane Smith'
+            self.author.save()
+
+        self.assertContains(self.client.get('/blog/negotiating/'), 'Jane Smith')
+
+
+class SitemapTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = create_author()
+        self.posts = [create_post(self.author, f'post-{n}') for n in range(5)]
+        create_post(self.author, 'draft', is_published=False)
+
+    def read(self, name):
+        path = os.path.join(sitemaps.sitemap_dir(), name)
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(path, 'rt') as f:
+            return f.read()
+
+    def locations(self, xml):
+        return re.findall(r'<loc>(.*?)</loc>', xml)
+
+    def test_single_urlset(self):
+        self.assertEqual(sitemaps.write_sitemaps(), 2 + 1 + 5)
+        xml = self.read('sitemap.xml')
+        self.assertIn('<urlset', xml)
+        self.assertEqual(self.read('sitemap.xml.gz'), xml)
+        self.assertEqual(self.locations(xml), [
+            'https://fairpaycheck.com/', 'https://fairpaycheck.com/blog/',
+            'https://fairpaycheck.com/author/jane-doe/',
+        ] + [f'https://fairpaycheck.com/blog/post-{n}/' for n in range(5)])
+
+    @mock.patch.object(sitemaps, 'SITEMAP_MAX_URLS', 3)
+    def test_split_into_parts(self):
+        sitemaps.write_sitemaps()
+        parts = sorted(name for name in os.listdir(sitemaps.sitemap_dir()) if name.startswith('sitemap-'))
+        index = self.read('sitemap.xml')
+        self.assertIn('<sitemapindex', index)
+        post_parts = [name for name in parts if name != sitemaps.PAGES_PART]
+        self.assertEqual(
+            self.locations(index),
+            [f'https://fairpaycheck.com/{name}' for name in [sitemaps.PAGES_PART] + post_parts],
+        )
+
+        posts = [loc for name in post_parts for loc in self.locations(self.read(name))]
+        self.assertEqual(sorted(posts), sorted(f'https://fairpaycheck.com/blog/post-{n}/' for n in range(5)))
+
+        # Back under the limit, the parts are removed
+        with mock.patch.object(sitemaps, 'SITEMAP_MAX_URLS', 50000):
+            sitemaps.write_sitemaps()
+        self.assertEqual(sorted(os.listdir(sitemaps.sitemap_dir())), ['sitemap.xml', 'sitemap.xml.gz'])
+
+    @mock.patch.object(sitemaps, 'SITEMAP_MAX_URLS', 3)
+    def test_incremental_update_rewrites_one_part(self):
+        sitemaps.write_sitemaps()
+        post = self.posts[0]
+        part = sitemaps.post_part_name(post.pk // 3)
+        untouched = {
+            name: os.stat(os.path.join(sitemaps.sitemap_dir(), name)).st_mtime_ns
+            for name in os.listdir(sitemaps.sitemap_dir())
+            if name.startswith('sitemap-posts-') and name != part
+        }
+
+        BlogPost.objects.filter(pk=post.pk).update(slug='renamed')
+        sitemaps.write_sitemaps([post.pk])
+        self.assertIn('https://fairpaycheck.com/blog/renamed/', self.locations(self.read(part)))
+        for name, mtime in untouched.items():
+            self.assertEqual(os.stat(os.path.join(sitemaps.sitemap_dir(), name)).st_mtime_ns, mtime)
+
+    def test_views(self):
+        response = self.client.get('/sitemap.xml', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)).decode(), self.read('sitemap.xml'))
+
+        response = self.client.get('/sitemap.xml')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertIn(b'/blog/post-0/', b''.join(response.streaming_content))
+        self.assertEqual(self.client.get('/sitemap-posts-9.xml.gz').status_code, 404)
+
+
+@mock.patch('core.views.BLOG_PAGE_SIZE', 3)
+class BlogPaginationTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        author = create_author()
+        published_at = timezone.now()
+        for n in range(8):
+            post = create_post(author, f'post-{n}')
+            # Posts 4 and 5 share a timestamp across a page boundary; the id breaks the tie
+            hours = 4 if n in (4, 5) else 8 - n
+            BlogPost.objects.filter(pk=post.pk).update(published_at=published_at - timedelta(hours=hours))
+        create_post(author, 'draft', is_published=False)
+
+    def page(self, query=''):
+        response = self.client.get(f'/blog/{query}')
+        self.assertEqual(response.status_code, 200)
+        html = response.content.decode()
+        slugs = re.findall(r'href="/blog/(post-\d+)/"', html)
+        older = re.search(r'href="\?before=([^"]+)"', html)
+        newer = re.search(r'href="\?after=([^"]+)"', html)
+        return list(dict.fromkeys(slugs)), older and older.group(1), newer and newer.group(1)
+
+    def test_pages_backwards_and_forwards(self):
+        slugs, older, newer = self.page()
+        self.assertEqual(slugs, ['post-7', 'post-6', 'post-5'])
+        self.assertIsNone(newer)
+
+        slugs, older, newer = self.page(f'?before={older}')
+        self.assertEqual(slugs, ['post-4', 'post-3', 'post-2'])
+        slugs, last_older, last_newer = self.page(f'?before={older}')
+        self.assertEqual(slugs, ['post-1', 'post-0'])
+        self.assertIsNone(last_older)
+
+        # And back again
+        slugs, _, newer = self.page(f'?after={last_newer}')
+        self.assertEqual(slugs, ['post-4', 'post-3', 'post-2'])
+        slugs, _, newer = self.page(f'?after={newer}')
+        self.assertEqual(slugs, ['post-7', 'post-6', 'post-5'])
+        self.assertIsNone(newer)
+
+    def test_cursor_round_trip(self):
+        post = BlogPost.objects.get(slug='post-3')
+        self.assertEqual(decode_cursor(encode_cursor(post)), (post.published_at, post.pk))
+
+    def test_malformed_cursors(self):
+        for cursor in ('abc', '1.x', '99999999999999999999999.1'):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get(f'/blog/?before={cursor}').status_code, 404)
+
+
+class VisitorTrackingTests(TestCase):
+    def event(self, ip_address, url='/', seconds_ago=0):
+        event = PageViewEvent(
+            ip_address,
+            {'user_agent': 'Mozilla/5.0', 'device_type': 'desktop', 'landing_page': url},
+            {'url': url, 'method': 'GET', 'ip_address': ip_address},
+        )
+        event.timestamp = self.now - timedelta(seconds=seconds_ago)
+        return event
+
+    def setUp(self):
+        self.now = timezone.now()
+
+    def test_write_events_counts(self):
+        VisitorLog.objects.create(ip_address='10.0.0.1', total_visits=4, total_page_views=6)
+        events = [
+            self.event('10.0.0.1', '/a', 30), self.event('10.0.0.2', '/b', 20),
+            self.event('10.0.0.1', '/c', 10), self.event('10.0.0.2', '/d', 5), self.event('10.0.0.2', '/e', 1),
+        ]
+        write_events(events, geolocate=lambda ip: {'country': 'Testland', 'country_code': 'TL'})
+
+        existing = VisitorLog.objects.get(ip_address='10.0.0.1')
+        self.assertEqual((existing.total_visits, existing.total_page_views), (6, 8))
+        self.assertIsNone(existing.country_code)
+        new = VisitorLog.objects.get(ip_address='10.0.0.2')
+        # Starts at one visit; every further request adds a visit and a page view
+        self.assertEqual((new.total_visits, new.total_page_views), (3, 3))
+        self.assertEqual((new.landing_page, new.country_code), ('/b', 'TL'))
+        self.assertEqual(
+            sorted(PageView.objects.filter(visitor=new).values_list('url', 'country_code')),
+            [('/b', 'TL'), ('/d', 'TL'), ('/e', 'TL')],
+        )
+
+    def test_timestamps_come_from_the_events(self):
+        VisitorLog.objects.create(ip_address='10.0.0.1')
+        events = [self.event('10.0.0.1', '/a', 600), self.event('10.0.0.2', '/b', 300),
+                  self.event('10.0.0.1', '/c', 120)]
+        write_events(events)
+
+        self.assertEqual(
+            dict(PageView.objects.values_list('url', 'timestamp')),
+            {event.page_view_fields['url']: event.timestamp for event in events},
+        )
+        # Each visitor's last visit is its own latest request, not the batch's
+        self.assertEqual(
+            dict(VisitorLog.objects.values_list('ip_address', 'last_visit')),
+            {'10.0.0.1': events[2].timestamp, '10.0.0.2': events[1].timestamp},
+        )
+
+    @mock.patch.object(VisitorTracker, '_start')
+    def test_queue(self, start):
+        tracker = VisitorTracker(batch_size=2, flush_interval=1, max_queued=3)
+        self.assertTrue(all(tracker.put(self.event(f'10.0.0.{n}')) for n in range(3)))
+        self.assertFalse(tracker.put(self.event('10.0.0.9')))
+
+        tracker.flush()
+        stats = tracker.stats()
+        self.assertEqual(
+            {key: stats[key] for key in ('queued', 'enqueued', 'dropped', 'written', 'flushes', 'errors')},
+            {'queued': 0, 'enqueued': 3, 'dropped': 1, 'written': 3, 'flushes': 2, 'errors': 0},
+        )
+        self.assertEqual(PageView.objects.count(), 3)
+
+    @mock.patch.object(VisitorTracker, '_start')
+    def test_failed_batches_are_logged(self, start):
+        tracker = VisitorTracker(batch_size=10, flush_interval=1, max_queued=10)
+        tracker.put(self.event('10.0.0.1'))
+        with mock.patch('core.tracking.write_events', side_effect=RuntimeError('database is down')):
+            with self.assertLogs('core.tracking', 'ERROR') as logs:
+                tracker.flush()
+        self.assertIn('1 page views lost', logs.output[0])
+        self.assertEqual(tracker.stats()['errors'], 1)
+
+
+@mock.patch.object(useragents, 'ua_cache', new_callable=lambda: LRUCache(100, 10 ** 6, 60))
+class UserAgentTests(SimpleTestCase):
+    CHROME = (
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+        '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+    )
+    IPHONE = (
+        'Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 '
+        '(KHTML, like Gecko) Version/17.1 Mobile/15E148 Safari/604.1'
+    )
+
+    def test_describe_matches_parsing(self, ua_cache):
+        for user_agent in (self.CHROME, self.IPHONE, 'curl/8.4.0', ''):
+            with self.subTest(user_agent=user_agent):
+                self.assertEqual(useragents.describe(user_agent), useragents.parse_fields(user_agent))
+        self.assertEqual(useragents.describe(self.CHROME)['device_type'], 'Desktop')
+        self.assertTrue(useragents.describe(self.IPHONE)['is_mobile'])
+
+    def test_crawlers_are_not_parsed(self, ua_cache):
+        before = useragents.stats()['crawler_matches']
+        with mock.patch.object(useragents, 'parse_fields') as parse_fields:
+            for user_agent in ('Googlebot/2.1 (+http://www.google.com/bot.html)', 'Mozilla/5.0 HeadlessChrome/120'):
+                self.assertIs(useragents.describe(user_agent), useragents.CRAWLER_FIELDS)
+        parse_fields.assert_not_called()
+        self.assertEqual(useragents.stats()['crawler_matches'], before + 2)
+
+    def test_repeated_user_agents_are_parsed_once(self, ua_cache):
+        with mock.patch.object(useragents, 'parse_fields', wraps=useragents.parse_fields) as parse_fields:
+            for _ in range(3):
+                useragents.describe(self.CHROME)
+            # Very long strings are not cached
+            long_user_agent = self.CHROME + ' x' * useragents.UA_CACHE_MAX_LENGTH
+            for _ in range(2):
+                useragents.describe(long_user_agent)
+        self.assertEqual(parse_fields.call_count, 3)
+        stats = useragents.stats()
+        self.assertEqual((stats['entries'], stats['hits'], stats['misses']), (1, 2, 1))
@@ -0,0 +1,279 @@
+"""
+FairPayCheck Visitor Tracking
+Write-behind queue for visitor and page view records. Requests only put
+an event on a bounded in-process queue; a background thread writes the
+events in batches (bulk_create for new rows, one grouped UPDATE per
+distinct count change) every `batch_size` events or `flush_interval`
+seconds, and flushes what is left when the process exits.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from . import geoip
+
+logger = logging.getLogger(__name__)
+
+class PageViewEvent:
+    """One tracked request: the visitor fields to use if the IP is new, and the page view fields."""
+
+    __slots__ = ('ip_address', 'visitor_fields', 'page_view_fields', 'timestamp')
+
+    def __init__(self, ip_address, visitor_fields, page_view_fields):
+        self.ip_address = ip_address
+        self.visitor_fields = visitor_fields
+        self.page_view_fields = page_view_fields
+        self.timestamp = timezone.now()
+
+
+class VisitorTracker:
+    """
+    Bounded queue of PageViewEvents and the thread that writes them.
+
+    put() never blocks: when the queue is full the event is dropped and
+    counted. The writer thread starts with the first event. geolocate(ip)
+    returns VisitorLog location fields or None, and is called for new
+    visitors from the writer thread, off the request path.
+    """
+
+    def __init__(self, batch_size, flush_interval, max_queued, geolocate=None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.geolocate = geolocate
+        self._queue = queue.Queue(max_queued)
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.flushes = 0
+        self.errors = 0
+
+    def put(self, event):
+        """Queue an event for writing; returns False if it was dropped."""
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None and not self._stopping.is_set():
+                self._thread = threading.Thread(target=self._run, name='visitor-tracking', daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        try:
+            while not self._stopping.is_set():
+                batch = self._collect()
+                if batch:
+                    self.write(batch)
+            # Shutting down: write whatever is still queued
+            while batch := self._drain(self.batch_size):
+                self.write(batch)
+        finally:
+            connection.close()
+
+    def _collect(self):
+        """Wait for events; return a batch once it is full or flush_interval has passed since its first event."""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stopping.is_set():
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self):
+        """Write every queued event now, in the calling thread."""
+        while batch := self._drain(self.batch_size):
+            self.write(batch)
+
+    def close(self, timeout=10):
+        """Stop the writer thread after it has written the queued events."""
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        else:
+            self.flush()
+
+    def write(self, events):
+        """Write a batch of events; a failed batch is counted and dropped."""
+        close_old_connections()
+        try:
+            write_events(events, self.geolocate)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            logger.exception('Visitor tracking error, %d page views lost', len(events))
+        else:
+            with self._lock:
+                self.written += len(events)
+                self.flushes += 1
+
+    def stats(self):
+        """Return a snapshot of the queue counters."""
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'max_queued': self._queue.maxsize,
+                'enqueued': self.enqueued,
+                'dropped': self.dropped,
+                'written': self.written,
+                'flushes': self.flushes,
+                'errors': self.errors,
+            }
+
+
+def create_visitors(events_by_ip, geolocate=None):
+    """
+    Create VisitorLogs for IPs that have none, from their first event.
+    Returns the set of IPs this call created.
+    """
+    from .models import VisitorLog
+
+    new_logs = []
+    for ip_address, events in events_by_ip.items():
+        visitor_log = VisitorLog(ip_address=ip_address, **events[0].visitor_fields)
+        if geolocate and not visitor_log.country:
+            location = geolocate(ip_address)
+            if location:
+                for field, value in location.items():
+                    setattr(visitor_log, field, value)
+        new_logs.append(visitor_log)
+
+    try:
+        with transaction.atomic():
+            VisitorLog.objects.bulk_create(new_logs)
+        return set(events_by_ip)
+    except IntegrityError:
+        # Another process created some of them first; fall back to one at a time
+        created_ips = set()
+        for visitor_log in new_logs:
+            try:
+                with transaction.atomic():
+                    visitor_log.save(force_insert=True)
+                created_ips.add(visitor_log.ip_address)
+            except IntegrityError:
+                pass
+        return created_ips
+
+
+def write_events(events, geolocate=None):
+    """
+    Apply a batch of page view events: create missing visitors, bump visit
+    and page view counts with one UPDATE per distinct increment, and
+    bulk-insert the page views. Counts match what recording the requests
+    one by one would give: a new visitor starts at one visit, and every
+    further request adds a visit and a page view. Each visitor's last_visit
+    and each page view's timestamp are taken from the events, not from the
+    time the batch is written.
+    """
+    from .models import PageView, VisitorLog
+
+    events_by_ip = defaultdict(list)
+    for event in events:
+        events_by_ip[event.ip_address].append(event)
+    ips = list(events_by_ip)
+
+    existing = set(VisitorLog.objects.filter(ip_address__in=ips).values_list('ip_address', flat=True))
+    missing = {ip: batch for ip, batch in events_by_ip.items() if ip not in existing}
+    created = create_visitors(missing, geolocate) if missing else set()
+
+    # (visits added, page views added) -> IPs
+    increments = defaultdict(list)
+    for ip_address, batch in events_by_ip.items():
+        visits = len(batch) - 1 if ip_address in created else len(batch)
+        increments[(visits, len(batch))].append(ip_address)
+
+    for (visits, page_views), group in increments.items():
+        # Each IP's own latest request, in the same UPDATE
+        last_visits = [
+            When(ip_address=ip_address, then=Value(max(event.timestamp for event in events_by_ip[ip_address])))
+            for ip_address in group
+        ]
+        VisitorLog.objects.filter(ip_address__in=group).update(
+            total_visits=F('total_visits') + visits,
+            total_page_views=F('total_page_views') + page_views,
+            last_visit=Case(*last_visits, default=F('last_visit')),
+        )
+
+    visitors = VisitorLog.objects.only('id', 'ip_address', 'country_code', 'device_type').in_bulk(
+        ips, field_name='ip_address'
+    )
+    page_views = []
+    for event in events:
+        visitor_log = visitors.get(event.ip_address)
+        if visitor_log is None:
+            continue
+        page_views.append(PageView(
+            visitor=visitor_log,
+            timestamp=event.timestamp,
+            country_code=visitor_log.country_code,
+            device_type=visitor_log.device_type,
+            **event.page_view_fields,
+        ))
+    PageView.objects.bulk_create(page_views)
+
+
+_tracker = None
+_lock = threading.Lock()
+
+
+def get_tracker():
+    """
+    The tracker for the VISITOR_TRACKING settings, created on first use and
+    shared by the process. New visitors are geolocated with core.geoip.
+    """
+    global _tracker
+    if _tracker is None:
+        with _lock:
+            if _tracker is None:
+                _tracker = VisitorTracker(
+                    batch_size=getattr(settings, 'VISITOR_TRACKING_BATCH_SIZE', 200),
+                    flush_interval=getattr(settings, 'VISITOR_TRACKING_FLUSH_MS', 1000) / 1000,
+                    max_queued=getattr(settings, 'VISITOR_TRACKING_MAX_QUEUED', 10000),
+                    geolocate=geoip.lookup,
+                )
+    return _tracker
+
+
+def stats():
+    """Counters of this process's tracking queue (queued, enqueued, dropped, written...)."""
+    return get_tracker().stats()
@@ -2,25 +2,31 @@
 Core app URL configuration.
 """
 
-from django.urls import path
+from django.urls import path, re_path
 from django.views.generic import TemplateView
-from django.http import FileResponse
-from django.conf import settings
-import os
-from . import views
+from django.http import Http404
+from . import staticserve, views
 
 
 def favicon_view(request):
-    """Serve favicon.ico directly without redirect."""
-    favicon_path = os.path.join(settings.STATICFILES_DIRS[0], 'images', 'favicon.ico')
-    return FileResponse(open(favicon_path, 'rb'), content_type='image/x-icon')
+    """Serve favicon.ico directly without redirect, from the static file cache."""
+    response = staticserve.serve(request, 'images/favicon.ico')
+    if response is None:
+        raise Http404
+    return response
 
 
 urlpatterns = [
     path('', views.index_view, name='index'),
+    path('data/bootstrap.json', views.bootstrap_view, name='bootstrap'),
     path('api/calculate/', views.calculate_score_api, name='calculate_score'),
+    path('api/calculate/batch/', views.calculate_batch_api, name='calculate_batch'),
+    path('api/calculate/sweep/', views.calculate_sweep_api, name='calculate_sweep'),
+    path('api/calculate/bulk/', views.calculate_bulk_api, name='calculate_bulk'),
+    path('api/search/', views.search_api, name='search'),
     path('robots.txt', TemplateView.as_view(template_name='robots.txt', content_type='text/plain'), name='robots'),
     path('sitemap.xml', views.sitemap_view, name='sitemap'),
+    re_path(r'^(?P<name>sitemap-[a-z0-9-]+\.xml\.gz)$', views.sitemap_part_view, name='sitemap_part'),
     path('favicon.ico', favicon_view, name='favicon'),
     
     # Blog URLs
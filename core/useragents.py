@@ -0,0 +1,113 @@
+"""
+FairPayCheck User Agents
+Visitor fields derived from a User-Agent header. Known crawlers are
+recognized by one compiled pattern before any parsing; other strings are
+parsed once and kept in a bounded LRU cache, since a small set of user
+agents makes up almost all traffic.
+"""
+
+import re
+
+from user_agents import parse
+
+from .cache import LRUCache
+
+
+# Bot user agents to exclude
+BOT_KEYWORDS = (
+    'bot', 'crawler', 'spider', 'scraper', 'headless',
+    'googlebot', 'bingbot', 'slurp', 'duckduckbot', 'baiduspider',
+)
+# Matched against the lowercased string: re.IGNORECASE would disable the literal prefilter
+BOT_PATTERN = re.compile('|'.join(map(re.escape, BOT_KEYWORDS)))
+
+UA_CACHE_MAX_ENTRIES = 4096
+UA_CACHE_MAX_BYTES = 4 * 1024 * 1024
+UA_CACHE_TTL = 24 * 3600  # seconds
+# Longer strings are parsed every time rather than cached (keys are not counted in the byte limit)
+UA_CACHE_MAX_LENGTH = 512
+
+# Fields for user agents matched by BOT_PATTERN, which are not parsed
+CRAWLER_FIELDS = {
+    'browser': None,
+    'browser_version': None,
+    'device_type': 'Unknown',
+    'os': None,
+    'os_version': None,
+    'is_bot': True,
+    'is_mobile': False,
+}
+
+ua_cache = LRUCache(UA_CACHE_MAX_ENTRIES, UA_CACHE_MAX_BYTES, UA_CACHE_TTL)
+crawler_matches = 0
+
+
+def get_device_type(user_agent):
+    """Determine device type from a parsed user agent"""
+    if user_agent.is_mobile:
+        return 'Mobile'
+    elif user_agent.is_tablet:
+        return 'Tablet'
+    elif user_agent.is_pc:
+        return 'Desktop'
+    else:
+        return 'Unknown'
+
+
+def is_bot(user_agent_string, browser='', device_type=''):
+    """
+    Check if user agent is a bot
+    Detects bots by:
+    1. User agent string containing known bot keywords
+    2. Browser name containing 'bot' or 'spider'
+    3. Device type being 'Unknown'
+    """
+    if BOT_PATTERN.search(user_agent_string.lower()):
+        return True
+
+    browser_lower = browser.lower() if browser else ''
+    if 'bot' in browser_lower or 'spider' in browser_lower:
+        return True
+
+    return device_type == 'Unknown'
+
+
+def parse_fields(user_agent_string):
+    """Parse a user agent string into VisitorLog fields (uncached)"""
+    user_agent = parse(user_agent_string)
+    device_type = get_device_type(user_agent)
+    browser = user_agent.browser.family
+    return {
+        'browser': browser,
+        'browser_version': user_agent.browser.version_string,
+        'device_type': device_type,
+        'os': user_agent.os.family,
+        'os_version': user_agent.os.version_string,
+        'is_bot': is_bot(user_agent_string, browser, device_type),
+        'is_mobile': user_agent.is_mobile,
+    }
+
+
+def describe(user_agent_string):
+    """
+    VisitorLog fields for a user agent string: browser, browser_version,
+    device_type, os, os_version, is_bot and is_mobile. The returned dict
+    is shared; copy it before changing it.
+    """
+    global crawler_matches
+    if BOT_PATTERN.search(user_agent_string.lower()):
+        crawler_matches += 1
+        return CRAWLER_FIELDS
+    if len(user_agent_string) > UA_CACHE_MAX_LENGTH:
+        return parse_fields(user_agent_string)
+
+    fields = ua_cache.get(user_agent_string, None)
+    if fields is None:
+        fields = parse_fields(user_agent_string)
+        ua_cache.set(user_agent_string, fields, None)
+    return fields
+
+
+def stats():
+    """Counters of the user agent cache (hits, misses, hit_rate, evictions...) and crawler matches."""
+    return {'crawler_matches': crawler_matches, **ua_cache.stats()}
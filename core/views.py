@@ -3,39 +3,261 @@ FairPayCheck Views
 Handles page rendering and API endpoints.
 """
 
+import hashlib
 import json
-from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
+import os
+from datetime import datetime, timedelta, timezone as dt_timezone
+from urllib.parse import urlencode
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.handlers.asgi import ASGIRequest
+from django.shortcuts import get_object_or_404
+from django.db.models import Q
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponsePermanentRedirect, JsonResponse, StreamingHttpResponse,
+)
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 
-from . import data
+from . import bulk
+from . import pagecache
+from . import ratelimit
+from . import schema
 from . import scoring
+from . import search
+from . import sitemaps
+from . import snapshots
+from . import tracking
+from . import useragents
 from .models import BlogPost, Author
+from .snapshots import market_data as data
 
 
-def index_view(request):
-    """Render the main FairPayCheck page."""
+# Maximum number of profiles accepted by the batch endpoint
+BATCH_MAX_PROFILES = 1000
+
+# Search results per request
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+
+# Posts per blog listing page (the page script shows them 6 at a time)
+BLOG_PAGE_SIZE = 24
+CURSOR_EPOCH = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+
+# Bootstrap data URLs name the data version, so their content never changes
+BOOTSTRAP_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Stale bootstrap URLs and the homepage are revalidated with their ETag
+REVALIDATE_CACHE_CONTROL = 'public, max-age=300'
+# GET scores are a pure function of the query and the data version
+SCORE_CACHE_CONTROL = 'public, max-age=3600'
+# Redirects to the canonical query are kept out of shared caches
+SCORE_REDIRECT_CACHE_CONTROL = 'private, max-age=3600'
+
+
+def invalid_inputs_response(errors):
+    """400 response for a payload rejected by the request schema."""
+    return JsonResponse({
+        'error': schema.error_message(errors),
+        'errors': errors,
+        'version': '1.0'
+    }, status=400)
+
+
+def parse_fields(value):
+    """
+    Parse the optional `fields` projection, given as a list or a
+    comma-separated string of top-level result keys.
+    Returns (fields, error); fields is None when no projection was requested.
+    """
+    if value is None or value == '':
+        return None, None
+    
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, list) or not all(isinstance(f, str) for f in value):
+        return None, 'Invalid fields. Must be a list or comma-separated string'
+    
+    fields = frozenset(f.strip() for f in value if f.strip())
+    unknown = fields.difference(scoring.RESULT_FIELDS)
+    if unknown:
+        return None, (
+            f'Unknown fields: {", ".join(sorted(unknown))}. '
+            f'Must be any of: {", ".join(scoring.RESULT_FIELDS)}'
+        )
+    
+    return fields, None
+
+
+def cached_content_response(request, content, content_type, cache_control):
+    """
+    Serve prebuilt (body, etag) content, answering a matching
+    If-None-Match with 304 Not Modified.
+    """
+    body, etag = content
+    response = HttpResponse(body, content_type=content_type)
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+def _with_etag(body):
+    return body, f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def build_bootstrap_data():
+    """Serialize the tables the homepage script needs; built once per data version."""
+    return _with_etag(json.dumps({
+        'data_version': data.DATA_VERSION,
+        'country_currencies': data.COUNTRY_CURRENCIES,
+        'role_skill_suggestions': data.ROLE_SKILL_SUGGESTIONS,
+        'role_keywords': data.ROLE_KEYWORDS,
+    }).encode())
+
+
+def build_index_page():
+    """Render the homepage once per data version; it has no per-request content."""
     context = {
         'countries': data.COUNTRIES,
         'industries': data.INDUSTRIES,
         'company_sizes': data.COMPANY_SIZES,
-        'country_currencies': json.dumps(data.COUNTRY_CURRENCIES),
-        'role_skill_suggestions': json.dumps(data.ROLE_SKILL_SUGGESTIONS),
-        'role_keywords': json.dumps(data.ROLE_KEYWORDS),
+        'bootstrap_url': f"{reverse('bootstrap')}?{urlencode({'v': data.DATA_VERSION})}",
     }
-    return render(request, 'index.html', context)
+    return _with_etag(render_to_string('index.html', context).encode())
+
+
+def index_view(request):
+    """Render the main FairPayCheck page."""
+    return cached_content_response(
+        request,
+        data.derived('index_page', build_index_page),
+        'text/html; charset=utf-8',
+        REVALIDATE_CACHE_CONTROL,
+    )
+
+
+@require_http_methods(["GET", "HEAD"])
+def bootstrap_view(request):
+    """
+    Market data used by the homepage script (currencies, role keywords,
+    skill suggestions). The homepage links here with ?v=<DATA_VERSION>, so
+    that URL is cached as immutable; other versions get a short cache.
+    """
+    if request.GET.get('v') == data.DATA_VERSION:
+        cache_control = BOOTSTRAP_CACHE_CONTROL
+    else:
+        cache_control = REVALIDATE_CACHE_CONTROL
+    return cached_content_response(
+        request,
+        data.derived('bootstrap_data', build_bootstrap_data),
+        'application/json',
+        cache_control,
+    )
 
 
 @csrf_exempt
-@require_http_methods(["POST"])
+@require_http_methods(["GET", "HEAD", "POST"])
 def calculate_score_api(request):
     """
     API endpoint for calculating salary fairness score.
-    Accepts JSON POST data and returns scoring results.
+    Accepts JSON POST data and returns scoring results. An optional `fields`
+    list (in the body or query string) limits the response to those keys.
+    The same inputs can be sent as GET query parameters; see
+    score_get_response.
+    """
+    return score_api_response(request)
+
+
+@csrf_exempt
+@require_http_methods(["GET", "HEAD", "POST"])
+async def acalculate_score_api(request):
+    """
+    calculate_score_api for the ASGI entry point (see fairpaycheck/asgi_urls.py).
+    Scoring is CPU-light and does no I/O, so it runs directly on the event
+    loop; under WSGI the sync view avoids the async_to_sync round trip.
+    """
+    return score_api_response(request)
+
+
+def score_api_response(request):
+    """Response for calculate_score_api and acalculate_score_api."""
+    try:
+        if request.method == 'POST':
+            # Parse JSON body
+            try:
+                body = json.loads(request.body)
+            except json.JSONDecodeError:
+                return JsonResponse({
+                    'error': 'Invalid JSON in request body',
+                    'version': '1.0'
+                }, status=400)
+        else:
+            body = request.GET.dict()
+        
+        parsed, errors = schema.decode_score_inputs(body)
+        if errors:
+            return invalid_inputs_response(errors)
+        
+        # Optional response projection, from the body or the query string
+        fields, error = parse_fields(body.get('fields', request.GET.get('fields')))
+        if error:
+            return JsonResponse({
+                'error': error,
+                'version': '1.0'
+            }, status=400)
+        
+        if request.method != 'POST':
+            return score_get_response(request, parsed, fields)
+        
+        # Calculate score
+        result = scoring.cached_result(parsed, fields)
+        
+        return HttpResponse(result.to_json(), content_type='application/json')
+    
+    except Exception as e:
+        return JsonResponse({
+            'error': 'An error occurred while processing your request.',
+            'version': '1.0',
+            'debug_error': str(e)  # Remove in production
+        }, status=500)
+
+
+def score_get_response(request, parsed, fields):
+    """
+    Cacheable response for a GET score request. Queries that are not in
+    canonical form (sorted, normalized values, defaults omitted) redirect
+    to it, so a CDN keeps one entry per distinct input. The ETag is known
+    before scoring, so revalidations are answered without scoring.
+    """
+    query = schema.canonical_query(parsed, fields)
+    if request.META.get('QUERY_STRING', '') != query:
+        response = HttpResponsePermanentRedirect(f'{request.path}?{query}')
+        response['Cache-Control'] = SCORE_REDIRECT_CACHE_CONTROL
+        return response
+    
+    etag = scoring.result_etag(parsed, fields)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        result = scoring.cached_result(parsed, fields)
+        response = HttpResponse(result.to_json(), content_type='application/json')
+    if etag:
+        response['ETag'] = etag
+    response['Cache-Control'] = SCORE_CACHE_CONTROL
+    return response
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def calculate_batch_api(request):
+    """
+    Batch API endpoint for scoring many profiles in one call.
+    Accepts JSON POST data of the form {"profiles": [...]} and returns one
+    result per profile, in order. Invalid profiles get an inline error
+    instead of failing the whole batch.
     """
     try:
-        # Parse JSON body
         try:
             body = json.loads(request.body)
         except json.JSONDecodeError:
@@ -44,36 +266,135 @@ def calculate_score_api(request):
                 'version': '1.0'
             }, status=400)
         
-        # Validate required fields
-        required_fields = ['job_title', 'country', 'industry', 'years_experience', 'company_size']
-        missing_fields = [f for f in required_fields if not body.get(f)]
+        profiles = body.get('profiles') if isinstance(body, dict) else None
+        if not isinstance(profiles, list):
+            return JsonResponse({
+                'error': 'Request body must contain a "profiles" list',
+                'version': '1.0'
+            }, status=400)
         
-        if missing_fields:
+        if len(profiles) > BATCH_MAX_PROFILES:
             return JsonResponse({
-                'error': f'Missing required fields: {", ".join(missing_fields)}',
+                'error': f'Too many profiles. Maximum per batch is {BATCH_MAX_PROFILES}',
                 'version': '1.0'
             }, status=400)
         
-        # Validate country
-        valid_countries = [c['value'] for c in data.COUNTRIES]
-        if body.get('country') not in valid_countries:
+        fields, error = parse_fields(body.get('fields', request.GET.get('fields')))
+        if error:
             return JsonResponse({
-                'error': f'Invalid country. Must be one of: {", ".join(valid_countries)}',
+                'error': error,
                 'version': '1.0'
             }, status=400)
         
-        # Validate company size
-        valid_sizes = ['small', 'medium', 'large']
-        if body.get('company_size') not in valid_sizes:
+        # Validate each profile, scoring only the valid ones
+        decode = schema.get_schema().decode
+        errors = {}
+        valid = []
+        for index, profile in enumerate(profiles):
+            if not isinstance(profile, dict):
+                errors[index] = json.dumps({'error': 'Profile must be a JSON object'})
+                continue
+            parsed, profile_errors = decode(profile)
+            if profile_errors:
+                errors[index] = json.dumps({
+                    'error': schema.error_message(profile_errors),
+                    'errors': profile_errors,
+                })
+            else:
+                valid.append(parsed)
+        
+        scored = iter(scoring.calculate_batch_results(valid, fields))
+        results = [
+            errors[index] if index in errors else next(scored).to_json()
+            for index in range(len(profiles))
+        ]
+        
+        return HttpResponse(
+            f'{{"version": "1.0", "count": {len(results)}, "results": [{", ".join(results)}]}}',
+            content_type='application/json'
+        )
+    
+    except Exception as e:
+        return JsonResponse({
+            'error': 'An error occurred while processing your request.',
+            'version': '1.0',
+            'debug_error': str(e)  # Remove in production
+        }, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def calculate_bulk_api(request):
+    """
+    Bulk API endpoint for scoring large CSV or NDJSON files.
+    Accepts the file as the raw request body (Content-Type text/csv or
+    application/x-ndjson) or as a multipart upload in the "file" field.
+    CSV files need a header row with the scoring field names. Rows are read
+    and scored in chunks, and results stream back as NDJSON, one line per
+    row, with validation errors reported inline.
+    Optional query parameters: format=csv|ndjson, fields=...
+    """
+    fields, error = parse_fields(request.GET.get('fields'))
+    if error:
+        return JsonResponse({
+            'error': error,
+            'version': '1.0'
+        }, status=400)
+    
+    if request.content_type == 'multipart/form-data':
+        source = request.FILES.get('file')
+        if source is None:
             return JsonResponse({
-                'error': f'Invalid company_size. Must be one of: {", ".join(valid_sizes)}',
+                'error': 'Missing "file" upload',
+                'version': '1.0'
+            }, status=400)
+        detected = bulk.detect_format(source.content_type, source.name)
+    else:
+        source = request
+        detected = bulk.detect_format(request.content_type)
+    
+    input_format = request.GET.get('format') or detected
+    if input_format == 'csv':
+        rows = bulk.read_csv(source)
+    elif input_format == 'ndjson':
+        rows = bulk.read_ndjson(source)
+    else:
+        return JsonResponse({
+            'error': 'Unsupported input format. Send CSV or NDJSON, or set format=csv|ndjson',
+            'version': '1.0'
+        }, status=400)
+    
+    # Pin the snapshot now: the stream is consumed after the request middleware has returned
+    if isinstance(request, ASGIRequest):
+        stream = bulk.ascore_rows(rows, fields, snapshots.current())
+    else:
+        stream = bulk.score_rows(rows, fields, snapshots.current())
+    return StreamingHttpResponse(stream, content_type='application/x-ndjson')
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def calculate_sweep_api(request):
+    """
+    API endpoint returning the score as a function of salary.
+    Accepts the same JSON POST data as calculate_score_api (salary is
+    ignored) and returns the piecewise-linear score curve and the salary
+    range of each verdict, so the salary slider needs a single call.
+    """
+    try:
+        try:
+            body = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({
+                'error': 'Invalid JSON in request body',
                 'version': '1.0'
             }, status=400)
         
-        # Calculate score
-        result = scoring.calculate_full_score(body)
+        parsed, errors = schema.decode_score_inputs(body)
+        if errors:
+            return invalid_inputs_response(errors)
         
-        return JsonResponse(result)
+        return JsonResponse(scoring.calculate_salary_sweep(parsed))
     
     except Exception as e:
         return JsonResponse({
@@ -83,46 +404,185 @@ def calculate_score_api(request):
         }, status=500)
 
 
-def blog_list_view(request):
-    """Render the blog listing page."""
-    posts = BlogPost.objects.filter(is_published=True).order_by('-published_at')
+@require_http_methods(["GET"])
+def search_api(request):
+    """
+    Full-text search over published blog posts.
+    Query parameters: q (required), limit (1-50, default 10).
+    Returns ranked results with highlighted snippets (HTML, <mark> tags).
+    """
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({
+            'error': 'Missing search query (q)',
+            'version': '1.0'
+        }, status=400)
+    
+    try:
+        limit = min(max(int(request.GET.get('limit', SEARCH_DEFAULT_LIMIT)), 1), SEARCH_MAX_LIMIT)
+    except ValueError:
+        return JsonResponse({
+            'error': f'Invalid limit. Must be a number from 1 to {SEARCH_MAX_LIMIT}',
+            'version': '1.0'
+        }, status=400)
+    
+    results = [
+        {
+            'title': post.title,
+            'url': post.get_absolute_url(),
+            'excerpt': post.excerpt,
+            'snippet': snippet,
+            'author': post.author.name if post.author else None,
+            'published_at': post.published_at.isoformat(),
+        }
+        for post, snippet in search.search(query, limit)
+    ]
+    return JsonResponse({
+        'version': '1.0',
+        'query': query,
+        'count': len(results),
+        'results': results,
+    })
+
+
+def encode_cursor(post):
+    """Keyset pagination cursor for a post: published_at in microseconds, and id."""
+    delta = post.published_at - CURSOR_EPOCH
+    return f'{delta // timedelta(microseconds=1)}.{post.pk}'
+
+
+def decode_cursor(value):
+    """Return (published_at, id) for a cursor; raises Http404 if it is malformed."""
+    microseconds, _, pk = value.partition('.')
+    try:
+        return CURSOR_EPOCH + timedelta(microseconds=int(microseconds)), int(pk)
+    except (ValueError, OverflowError):
+        raise Http404
+
+
+def render_blog_list(before=None, after=None):
+    """
+    Render one page of the blog listing, newest first. `before` / `after`
+    are cursors of the post the page continues from (older / newer).
+    Each page is one index range scan, however deep it is.
+    """
+    posts = (
+        BlogPost.objects.filter(is_published=True)
+        .select_related('author')
+        .defer('content', 'author__bio', 'author__expertise')
+    )
+    if after:
+        published_at, pk = decode_cursor(after)
+        posts = posts.filter(
+            Q(published_at__gt=published_at) | Q(published_at=published_at, id__gt=pk)
+        ).order_by('published_at', 'id')
+    else:
+        posts = posts.order_by('-published_at', '-id')
+        if before:
+            published_at, pk = decode_cursor(before)
+            posts = posts.filter(
+                Q(published_at__lt=published_at) | Q(published_at=published_at, id__lt=pk)
+            )
+    
+    # One extra row tells whether there is a further page in this direction
+    posts = list(posts[:BLOG_PAGE_SIZE + 1])
+    more = len(posts) > BLOG_PAGE_SIZE
+    posts = posts[:BLOG_PAGE_SIZE]
+    if after:
+        posts.reverse()
+    
+    older_cursor = newer_cursor = None
+    if posts:
+        if after or more:
+            older_cursor = encode_cursor(posts[-1])
+        if before or (after and more):
+            newer_cursor = encode_cursor(posts[0])
+    
     context = {
         'posts': posts,
+        'older_cursor': older_cursor,
+        'newer_cursor': newer_cursor,
+        'is_first_page': not (before or after),
     }
-    return render(request, 'blog_list.html', context)
+    last_modified = max((post.updated_at for post in posts), default=timezone.now())
+    return pagecache.build_page(render_to_string('blog_list.html', context), last_modified)
+
+
+def blog_list_view(request):
+    """
+    Render the blog listing page. The first page is cached (see
+    core/pagecache.py); older pages are reached with ?before=<cursor>.
+    """
+    before = request.GET.get('before')
+    after = request.GET.get('after')
+    if before or after:
+        return pagecache.page_response(request, render_blog_list(before, after))
+    return pagecache.cached_page(request, pagecache.blog_list_key(), render_blog_list)
 
 
 def blog_detail_view(request, slug):
-    """Render a single blog post with Article schema."""
-    post = get_object_or_404(BlogPost, slug=slug, is_published=True)
-    context = {
-        'post': post,
-    }
-    return render(request, 'blog_detail.html', context)
+    """Render a single blog post with Article schema (cached)."""
+    def render_page():
+        post = get_object_or_404(BlogPost, slug=slug, is_published=True)
+        html = render_to_string('blog_detail.html', {'post': post})
+        return pagecache.build_page(html, post.updated_at)
+    
+    return pagecache.cached_page(request, pagecache.blog_post_key(slug), render_page)
 
 
 def sitemap_view(request):
-    """Generate dynamic sitemap including blog posts."""
-    posts = BlogPost.objects.filter(is_published=True).order_by('-published_at')
-    authors = Author.objects.all()
-    context = {
-        'posts': posts,
-        'authors': authors,
-    }
-    return render(request, 'sitemap.xml', context, content_type='application/xml')
+    """
+    Serve the sitemap root (see core/sitemaps.py) from disk, gzip-compressed
+    when the client accepts it. The files are regenerated when content changes.
+    """
+    compressed = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    response = FileResponse(open(sitemaps.root_path(compressed), 'rb'), content_type='application/xml')
+    if compressed:
+        response['Content-Encoding'] = 'gzip'
+    response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def sitemap_part_view(request, name):
+    """Serve one gzip-compressed sitemap part listed in the sitemap index."""
+    path = sitemaps.part_path(name)
+    if path is None:
+        raise Http404
+    return FileResponse(open(path, 'rb'), content_type='application/gzip')
 
 
 def author_detail_view(request, slug):
-    """Render author profile page with Person schema for E-E-A-T."""
-    author = get_object_or_404(Author, slug=slug)
-    # Get latest 5 posts by this author
-    posts = BlogPost.objects.filter(
-        author=author, 
-        is_published=True
-    ).order_by('-published_at')[:5]
-    context = {
-        'author': author,
-        'posts': posts,
-    }
-    return render(request, 'author_detail.html', context)
+    """Render author profile page with Person schema for E-E-A-T (cached)."""
+    def render_page():
+        author = get_object_or_404(Author, slug=slug)
+        # Get latest 5 posts by this author
+        posts = BlogPost.objects.filter(
+            author=author, 
+            is_published=True
+        ).order_by('-published_at')[:5]
+        context = {
+            'author': author,
+            'posts': posts,
+        }
+        # Author has no modification time; the page is rebuilt whenever it changes
+        return pagecache.build_page(render_to_string('author_detail.html', context), timezone.now())
+    
+    return pagecache.cached_page(request, pagecache.author_key(slug), render_page)
+
 
+@staff_member_required
+def runtime_stats_view(request):
+    """
+    In-process counters of the rate limiter, the scoring result cache, the
+    visitor tracking queue and the user agent cache, for staff. Each worker
+    process keeps its own; the response names the worker.
+    """
+    response = JsonResponse({
+        'pid': os.getpid(),
+        'ratelimit': ratelimit.stats(),
+        'result_cache': scoring.result_cache.stats(),
+        'tracking': tracking.stats(),
+        'useragents': useragents.stats(),
+    })
+    response['Cache-Control'] = 'private, no-store'
+    return response
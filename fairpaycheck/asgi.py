@@ -2,6 +2,8 @@
 ASGI config for fairpaycheck project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests are resolved against fairpaycheck.asgi_urls, which routes to the
+async variants of views that have one.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
@@ -9,8 +11,24 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fairpaycheck.settings')
 
-application = get_asgi_application()
+ASGI_URLCONF = 'fairpaycheck.asgi_urls'
+
+
+class FairPayCheckASGIHandler(ASGIHandler):
+    """ASGIHandler that resolves every request against ASGI_URLCONF."""
+
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = ASGI_URLCONF
+        return request, error_response
+
+
+# As get_asgi_application(), with the handler above
+django.setup(set_prefix=False)
+application = FairPayCheckASGIHandler()
@@ -0,0 +1,13 @@
+"""
+URL configuration for the ASGI entry point (fairpaycheck/asgi.py).
+The same URLs as fairpaycheck.urls, with the async variants of the views
+that have one, so they run on the event loop instead of a worker thread.
+"""
+from django.urls import path, include
+
+from core import views as core_views
+
+urlpatterns = [
+    path('api/calculate/', core_views.acalculate_score_api, name='calculate_score'),
+    path('', include('fairpaycheck.urls')),
+]
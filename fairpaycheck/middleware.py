@@ -1,53 +1,76 @@
 """
-Rate Limiting Middleware for FairPayCheck API
-Simple in-memory IP-based rate limiting (30 requests per minute)
+FairPayCheck Middleware
+API rate limiting (see core/ratelimit.py), in-process static file
+serving, market data snapshot pinning and visitor tracking. Each runs
+natively under both WSGI and ASGI.
 """
 
-import time
-import requests
-from collections import defaultdict
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
 from django.http import JsonResponse
-from django.utils import timezone
 from django.utils.deprecation import MiddlewareMixin
-from user_agents import parse
+
+from core import ratelimit, snapshots, staticserve, tracking, useragents
 
 
 class RateLimitMiddleware:
     """
     Simple rate limiting middleware.
-    Limits API endpoints to 30 requests per minute per IP.
+    Limits API endpoints to 30 requests per minute per IP (settings.RATE_LIMIT
+    per RATE_LIMIT_WINDOW seconds), tracking at most RATE_LIMIT_MAX_CLIENTS
+    IPs. settings.RATE_LIMIT_BACKEND picks where the counts live (see
+    core/ratelimit.py). Under ASGI the limiter is called through ahit(), so
+    cache round-trips and file locks do not block the event loop.
     """
     
+    sync_capable = True
+    async_capable = True
+    
     def __init__(self, get_response):
         self.get_response = get_response
-        self.requests = defaultdict(list)
-        self.rate_limit = 30  # requests
-        self.time_window = 60  # seconds
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        self.rate_limit = getattr(settings, 'RATE_LIMIT', 30)  # requests
+        self.time_window = getattr(settings, 'RATE_LIMIT_WINDOW', 60)  # seconds
+        self.limiter = ratelimit.get_limiter()
     
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        
+        response = self.check_rate_limit(request)
+        if response is None:
+            response = self.get_response(request)
+        return response
+    
+    async def __acall__(self, request):
+        response = await self.acheck_rate_limit(request)
+        if response is None:
+            response = await self.get_response(request)
+        return response
+    
+    def check_rate_limit(self, request):
+        """Record an API request; return a 429 response if the IP is over the limit."""
         # Only rate limit API endpoints
         if request.path.startswith('/api/'):
-            client_ip = self.get_client_ip(request)
-            current_time = time.time()
-            
-            # Clean old requests outside the time window
-            self.requests[client_ip] = [
-                req_time for req_time in self.requests[client_ip]
-                if current_time - req_time < self.time_window
-            ]
-            
-            # Check if rate limit exceeded
-            if len(self.requests[client_ip]) >= self.rate_limit:
-                return JsonResponse({
-                    'error': 'Rate limit exceeded. Please try again later.',
-                    'retry_after': self.time_window
-                }, status=429)
-            
-            # Record this request
-            self.requests[client_ip].append(current_time)
+            if not self.limiter.hit(self.get_client_ip(request)):
+                return self.rate_limited_response()
         
-        response = self.get_response(request)
-        return response
+        return None
+    
+    async def acheck_rate_limit(self, request):
+        """Async version of check_rate_limit"""
+        if request.path.startswith('/api/'):
+            if not await self.limiter.ahit(self.get_client_ip(request)):
+                return self.rate_limited_response()
+        
+        return None
+    
+    def rate_limited_response(self):
+        return JsonResponse({
+            'error': 'Rate limit exceeded. Please try again later.',
+            'retry_after': self.time_window
+        }, status=429)
     
     def get_client_ip(self, request):
         """Extract client IP from request headers."""
@@ -59,98 +82,185 @@ class RateLimitMiddleware:
         return ip
 
 
+class StaticFilesMiddleware:
+    """
+    Serves STATIC_URL (and /favicon.ico) in-process before the rest of the
+    middleware runs, so asset requests skip sessions, rate limiting and
+    visitor tracking. See core/staticserve.py.
+    """
+    
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        self.prefix = settings.STATIC_URL
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        
+        response = self.serve(request)
+        if response is None:
+            response = self.get_response(request)
+        return response
+    
+    async def __acall__(self, request):
+        # Hot assets are answered from memory; large ones stream from the file through an async iterator
+        response = self.serve(request, asynchronous=True)
+        if response is None:
+            response = await self.get_response(request)
+        return response
+    
+    def serve(self, request, asynchronous=False):
+        """Response for a static file request, or None to pass the request on."""
+        if request.method not in ('GET', 'HEAD') or not request.path.startswith(self.prefix):
+            return None
+        return staticserve.serve(request, request.path[len(self.prefix):], asynchronous)
+
+
+class MarketDataMiddleware:
+    """
+    Pins one market data snapshot for the whole request, so a data refresh
+    never mixes two versions within a response. New snapshot files
+    (settings.MARKET_DATA_SNAPSHOT) are picked up between requests.
+    """
+    
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        path = getattr(settings, 'MARKET_DATA_SNAPSHOT', None)
+        self.watcher = None
+        if path:
+            self.watcher = snapshots.SnapshotWatcher(
+                path, getattr(settings, 'MARKET_DATA_CHECK_INTERVAL', 30)
+            )
+            self.watcher.check()
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        
+        if self.watcher:
+            self.watcher.check()
+        
+        with snapshots.pinned():
+            return self.get_response(request)
+    
+    async def __acall__(self, request):
+        if self.watcher:
+            self.watcher.check()
+        
+        # The pin is a context variable, so it follows this request's task across awaits
+        with snapshots.pinned():
+            return await self.get_response(request)
+
+
 class VisitorTrackingMiddleware(MiddlewareMixin):
     """
     Middleware to track visitors and page views
     Captures IP, geolocation, device info, and logs all page views
     """
     
-    # Bot user agents to exclude
-    BOT_USER_AGENTS = [
-        'bot', 'crawler', 'spider', 'scraper', 'headless',
-        'googlebot', 'bingbot', 'slurp', 'duckduckbot', 'baiduspider'
-    ]
+    # Paths that are not page views: admin, static files, media and page data
+    UNTRACKED_PATHS = ('/admin/', '/static/', '/media/', '/data/')
+    # Tracked without starting a session (see should_create_session)
+    SESSIONLESS_PATHS = ('/api/',)
     
-    def process_request(self, request):
-        """Process incoming request to track visitor"""
-        # Import here to avoid circular imports
-        from core.models import VisitorLog, PageView
-        
-        # Skip tracking for admin, static files, and media
-        if request.path.startswith(('/admin/', '/static/', '/media/')):
-            return None
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.tracker = tracking.get_tracker()
+    
+    async def __acall__(self, request):
+        # Track on the event loop instead of running process_response in a worker thread
+        response = await self.get_response(request)
+        await self.aprocess_response(request, response)
+        return response
+    
+    def process_response(self, request, response):
+        """
+        Track the visitor once the response is known. The visitor and page
+        view records are written in batches by self.tracker, off the request path.
+        """
+        # Skip tracking for admin, static files, media and page data
+        if request.path.startswith(self.UNTRACKED_PATHS):
+            return response
         
         # Get IP address
         ip_address = self.get_client_ip(request)
         if not ip_address:
-            return None
+            return response
         
         # Get or create session
-        if not request.session.session_key:
+        if self.should_create_session(request, response):
             request.session.create()
-        session_key = request.session.session_key
-        
-        # Parse user agent
-        user_agent_string = request.META.get('HTTP_USER_AGENT', '')
-        user_agent = parse(user_agent_string)
-        
-        # Get device type and browser first
-        device_type = self.get_device_type(user_agent)
-        browser = user_agent.browser.family
         
-        # Check if bot - also check browser name and device type
-        is_bot = self.is_bot(user_agent_string, browser, device_type)
-        
-        # Get or create visitor log
-        visitor_log, created = VisitorLog.objects.get_or_create(
-            ip_address=ip_address,
-            defaults={
-                'session_key': session_key,
-                'user_agent': user_agent_string,
-                'browser': browser,
-                'browser_version': user_agent.browser.version_string,
-                'device_type': device_type,
-                'os': user_agent.os.family,
-                'os_version': user_agent.os.version_string,
-                'is_bot': is_bot,
-                'is_mobile': user_agent.is_mobile,
-                'referrer': request.META.get('HTTP_REFERER'),
-                'landing_page': request.path,
-            }
-        )
+        self.tracker.put(self.get_page_view_event(request, ip_address))
+        return response
+    
+    async def aprocess_response(self, request, response):
+        """Async version of process_response, using the async session API"""
+        if request.path.startswith(self.UNTRACKED_PATHS):
+            return response
         
-        # Fetch geolocation data if not already set
-        if created and not visitor_log.country:
-            self.update_geolocation(visitor_log, ip_address)
+        ip_address = self.get_client_ip(request)
+        if not ip_address:
+            return response
         
-        # Update visitor log if not created
-        if not created:
-            visitor_log.increment_visit()
-            visitor_log.last_visit = timezone.now()
-            visitor_log.save(update_fields=['last_visit', 'total_visits'])
+        if self.should_create_session(request, response):
+            await request.session.acreate()
         
-        # Create page view record
-        PageView.objects.create(
-            visitor=visitor_log,
-            url=request.path,
-            page_title=self.get_page_title(request),
-            method=request.method,
-            ip_address=ip_address,
-            user_agent=user_agent_string,
-            referrer=request.META.get('HTTP_REFERER'),
-            session_key=session_key,
-            country_code=visitor_log.country_code,
-            device_type=visitor_log.device_type,
+        # Queueing never blocks, so it is safe on the event loop
+        self.tracker.put(self.get_page_view_event(request, ip_address))
+        return response
+    
+    def should_create_session(self, request, response):
+        """
+        Whether to start a session for a visitor without one. Never on API
+        paths or on responses shared caches may store (Cache-Control: public),
+        since the session cookie would be cached and handed to everyone.
+        """
+        if request.session.session_key or request.path.startswith(self.SESSIONLESS_PATHS):
+            return False
+        return 'public' not in response.get('Cache-Control', '')
+    
+    def get_page_view_event(self, request, ip_address):
+        """The tracking event for this request"""
+        session_key = request.session.session_key
+        return tracking.PageViewEvent(
+            ip_address,
+            self.get_visitor_defaults(request, session_key),
+            self.get_page_view_fields(request, ip_address, session_key),
         )
-        
-        # Increment total page views
-        visitor_log.total_page_views += 1
-        visitor_log.save(update_fields=['total_page_views'])
-        
-        # Attach visitor to request for later use
-        request.visitor = visitor_log
-        
-        return None
+    
+    def get_visitor_defaults(self, request, session_key):
+        """Fields for a new VisitorLog, from the request's (cached) user agent details"""
+        user_agent_string = request.META.get('HTTP_USER_AGENT', '')
+        return {
+            'session_key': session_key,
+            'user_agent': user_agent_string,
+            **useragents.describe(user_agent_string),
+            'referrer': request.META.get('HTTP_REFERER'),
+            'landing_page': request.path,
+        }
+    
+    def get_page_view_fields(self, request, ip_address, session_key):
+        """Fields for the PageView record of this request (the visitor's are added when it is written)"""
+        return {
+            'url': request.path,
+            'page_title': self.get_page_title(request),
+            'method': request.method,
+            'ip_address': ip_address,
+            'user_agent': request.META.get('HTTP_USER_AGENT', ''),
+            'referrer': request.META.get('HTTP_REFERER'),
+            'session_key': session_key,
+        }
     
     def get_client_ip(self, request):
         """
@@ -171,42 +281,6 @@ class VisitorTrackingMiddleware(MiddlewareMixin):
             )
         return ip
     
-    def get_device_type(self, user_agent):
-        """Determine device type from user agent"""
-        if user_agent.is_mobile:
-            return 'Mobile'
-        elif user_agent.is_tablet:
-            return 'Tablet'
-        elif user_agent.is_pc:
-            return 'Desktop'
-        else:
-            return 'Unknown'
-    
-    def is_bot(self, user_agent_string, browser='', device_type=''):
-        """
-        Check if user agent is a bot
-        Detects bots by:
-        1. User agent string containing known bot keywords
-        2. Browser name containing 'bot' or 'spider'
-        3. Device type being 'Unknown'
-        """
-        user_agent_lower = user_agent_string.lower()
-        browser_lower = browser.lower() if browser else ''
-        
-        # Check user agent for known bot patterns
-        if any(bot in user_agent_lower for bot in self.BOT_USER_AGENTS):
-            return True
-        
-        # Check if browser name contains 'bot' or 'spider'
-        if 'bot' in browser_lower or 'spider' in browser_lower:
-            return True
-        
-        # Mark as bot if device type is Unknown
-        if device_type == 'Unknown':
-            return True
-        
-        return False
-    
     def get_page_title(self, request):
         """Extract page title from path"""
         path = request.path.strip('/')
@@ -216,35 +290,3 @@ class VisitorTrackingMiddleware(MiddlewareMixin):
             return 'API'
         else:
             return path.replace('/', ' - ').title()
-    
-    def update_geolocation(self, visitor_log, ip_address):
-        """
-        Get geolocation data from IP address using ip-api.com (free)
-        Rate limit: 45 requests per minute
-        """
-        try:
-            # Skip localhost/private IPs
-            if ip_address in ['127.0.0.1', '::1'] or ip_address.startswith('192.168.') or ip_address.startswith('10.'):
-                return
-            
-            # Call free geolocation API
-            response = requests.get(
-                f'http://ip-api.com/json/{ip_address}',
-                timeout=2
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                if data.get('status') == 'success':
-                    visitor_log.country = data.get('country')
-                    visitor_log.country_code = data.get('countryCode')
-                    visitor_log.city = data.get('city')
-                    visitor_log.region = data.get('regionName')
-                    visitor_log.latitude = data.get('lat')
-                    visitor_log.longitude = data.get('lon')
-                    visitor_log.save()
-        except Exception as e:
-            # Silently fail - don't break the request
-            print(f"Geolocation error for {ip_address}: {e}")
-
@@ -54,12 +54,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'fairpaycheck.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'fairpaycheck.middleware.MarketDataMiddleware',
     'fairpaycheck.middleware.RateLimitMiddleware',
     'fairpaycheck.middleware.VisitorTrackingMiddleware',
 ]
@@ -146,9 +148,29 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'staticfiles')]
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+# Served in-process by StaticFilesMiddleware (core/staticserve.py). Files named
+# with a content hash (ManifestStaticFilesStorage) get immutable cache headers,
+# and .br / .gz files placed next to an asset are served to clients accepting them.
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Market data snapshot (see core/snapshots.py). When set, workers load this
+# file and pick up new versions written to it without a restart.
+MARKET_DATA_SNAPSHOT = os.getenv("MARKET_DATA_SNAPSHOT")
+MARKET_DATA_CHECK_INTERVAL = 30  # seconds between file checks
+
+# Blog and author page cache (see core/pagecache.py). Pages are invalidated
+# by model signals in the process that saves them, so with several workers
+# CACHES should point at a shared backend; the timeout bounds staleness
+# otherwise.
+PAGE_CACHE_TIMEOUT = 600  # seconds
+
+# Generated sitemap files (see core/sitemaps.py), served from disk. The
+# default directory is git-ignored; point SITEMAP_DIR at a writable runtime
+# volume in read-only deployments.
+SITE_URL = 'https://fairpaycheck.com'
+SITEMAP_DIR = os.getenv("SITEMAP_DIR", os.path.join(BASE_DIR, 'sitemaps'))
+
 # Session settings
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 SESSION_COOKIE_AGE = 86400 * 30  # 30 days
@@ -159,3 +181,29 @@ if not DEBUG:
     X_FRAME_OPTIONS = 'DENY'
     SECURE_CONTENT_TYPE_NOSNIFF = True
 
+
+# API rate limiting (see core/ratelimit.py): RATE_LIMIT requests per
+# RATE_LIMIT_WINDOW seconds per IP. At most RATE_LIMIT_MAX_CLIENTS IPs are
+# tracked; idle ones are dropped.
+RATE_LIMIT = 30
+RATE_LIMIT_WINDOW = 60  # seconds
+RATE_LIMIT_MAX_CLIENTS = 100000
+# Where the counts live: 'memory' (per worker process), 'shared' (a
+# shared-memory table for all workers on this host, 24 bytes per client) or
+# 'cache' (a CACHES alias, e.g. Redis, for several hosts).
+# RATE_LIMIT_OPTIONS takes {'path': ...} for 'shared' (a file name prefix; the
+# table size is appended), {'alias': ...} for 'cache'.
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_OPTIONS = {}
+
+# Visitor tracking (see core/tracking.py): page views are queued and written
+# in batches of VISITOR_TRACKING_BATCH_SIZE, or after VISITOR_TRACKING_FLUSH_MS.
+# Beyond VISITOR_TRACKING_MAX_QUEUED pending events, new ones are dropped.
+VISITOR_TRACKING_BATCH_SIZE = 200
+VISITOR_TRACKING_FLUSH_MS = 1000
+VISITOR_TRACKING_MAX_QUEUED = 10000
+
+# Offline IP geolocation database (see core/geoip.py), built with
+# `python manage.py build_geoip_database <ranges.csv>`. Visitors are not
+# geolocated while the file is missing.
+GEOIP_DATABASE = os.getenv("GEOIP_DATABASE", os.path.join(BASE_DIR, 'geoip.bin'))
@@ -16,15 +16,14 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from django.conf import settings
-from django.conf.urls.static import static
+
+from core import views as core_views
 
 urlpatterns = [
+    path('admin/runtime-stats/', core_views.runtime_stats_view, name='runtime_stats'),
     path('admin/', admin.site.urls),
     path('', include('core.urls')),
 ]
 
-# Serve static files during development
-if settings.DEBUG:
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATICFILES_DIRS[0])
+# Static files are served by fairpaycheck.middleware.StaticFilesMiddleware
 
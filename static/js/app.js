@@ -8,7 +8,8 @@
     // Configuration
     const API_ENDPOINT = '/api/calculate/';
     const LOADING_DELAY = 5000;
-    const CURRENCIES = window.COUNTRY_CURRENCIES || {
+    // Market data tables; replaced by the versioned bootstrap resource once it loads
+    let CURRENCIES = window.COUNTRY_CURRENCIES || {
         'USA': { symbol: '$', code: 'USD' },
         'UK': { symbol: '£', code: 'GBP' },
         'Germany': { symbol: '€', code: 'EUR' },
@@ -16,8 +17,8 @@
         'Australia': { symbol: 'A$', code: 'AUD' },
         'India': { symbol: '₹', code: 'INR' }
     };
-    const ROLE_SKILL_SUGGESTIONS = window.ROLE_SKILL_SUGGESTIONS || {};
-    const ROLE_KEYWORDS = window.ROLE_KEYWORDS || {};
+    let ROLE_SKILL_SUGGESTIONS = window.ROLE_SKILL_SUGGESTIONS || {};
+    let ROLE_KEYWORDS = window.ROLE_KEYWORDS || {};
 
     const VERDICT_CLASSES = {
         'likely_underpaid': 'underpaid',
@@ -753,6 +754,26 @@
         });
     }
 
+    // ==========================================
+    // Bootstrap Data
+    // ==========================================
+    function loadBootstrapData() {
+        if (!window.BOOTSTRAP_URL) return;
+
+        fetch(window.BOOTSTRAP_URL)
+            .then(response => {
+                if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                return response.json();
+            })
+            .then(data => {
+                CURRENCIES = data.country_currencies || CURRENCIES;
+                ROLE_SKILL_SUGGESTIONS = data.role_skill_suggestions || ROLE_SKILL_SUGGESTIONS;
+                ROLE_KEYWORDS = data.role_keywords || ROLE_KEYWORDS;
+                updateCurrency();
+            })
+            .catch(error => console.error('Bootstrap data error:', error));
+    }
+
     // ==========================================
     // Initialization
     // ==========================================
@@ -765,6 +786,7 @@
         initJobTitleAutocomplete();
         updateExperienceDisplay();
         updateCurrency();
+        loadBootstrapData();
 
         Analytics.track('page_load');
         console.log('FairPayCheck initialized');